@@ -1,8 +1,10 @@
 import streamlit as st
 import asyncio
+import atexit
 import threading
 import time
 from datetime import datetime
+from typing import List
 import sys
 import os
 
@@ -13,8 +15,14 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config.config import ConfigManager, TradingConfig
 from modules.data_models import DataStore
 from modules.binance_connector import BinanceConnector
+from modules.candle_cache import CandleDiskCache
+from modules.resampler import CandleResampler
+from modules.candle_store import interval_to_ms
+from modules.shared_store import SharedCandleWriter
 from modules.technical_analysis import TechnicalAnalyzer
+from modules.analysis_executor import ProcessAnalysisExecutor
 from modules.trading_strategy import TradingStrategy
+from modules.market_scanner import MarketScanner
 from ui.components import *
 from utils.logger import setup_logger
 
@@ -27,14 +35,76 @@ class TradingBot:
     def __init__(self):
         self.config_manager = ConfigManager()
         self.data_store = DataStore()
-        self.binance_connector = BinanceConnector(self.data_store)
+        
+        # Đặt nến vào shared memory để worker phân tích (executor "process") đọc không cần copy
+        analysis_config = self.config_manager.get_analysis_config()
+        self.shm_config = self.config_manager.get_shared_memory_config()
+        self.use_shared_memory = self.shm_config["enabled"] or analysis_config["executor"] == "process"
+        self.shared_writer = None
+        self._open_shared_memory()
+        
+        data_feed = self.config_manager.get_data_feed_config()
+        self.http_config = self.config_manager.get_http_config()
+        self.binance_connector = BinanceConnector(
+            self.data_store,
+            base_url=data_feed["base_url"],
+            stream_url=data_feed["stream_url"],
+            http_config={key: value for key, value in self.http_config.items() if key != "use_uvloop"}
+        )
+        cache_config = self.config_manager.get_cache_config()
+        self.disk_cache = CandleDiskCache(
+            cache_config["directory"],
+            flush_interval=cache_config["flush_interval"]
+        ) if cache_config["enabled"] else None
+        self.resampler = None
         self.technical_analyzer = TechnicalAnalyzer(self.data_store)
-        self.trading_strategy = TradingStrategy(self.data_store, self.config_manager, self.technical_analyzer)
+        
+        # Phân tích trên nhiều tiến trình (cần shared memory để worker đọc nến)
+        self.analysis_executor = None
+        if analysis_config["executor"] == "process":
+            if self.shared_writer:
+                self.analysis_executor = ProcessAnalysisExecutor(
+                    self.data_store, self.technical_analyzer, self.shared_writer,
+                    max_workers=analysis_config["max_workers"]
+                )
+            else:
+                logger.error("Executor process cần shared memory, chạy phân tích trong tiến trình chính")
+        self.trading_strategy = TradingStrategy(
+            self.data_store, self.config_manager, self.technical_analyzer, self.analysis_executor
+        )
+        
+        # Chế độ quét toàn thị trường: thay danh sách tokens bằng mọi perpetual từ exchangeInfo
+        scanner_config = self.config_manager.get_scanner_config()
+        self.scanner = MarketScanner(
+            self.data_store, self.binance_connector, self.technical_analyzer, self.trading_strategy,
+            self.config_manager, top_k=scanner_config["top_k"], quote_asset=scanner_config["quote_asset"],
+            max_symbols=scanner_config["max_symbols"]
+        ) if scanner_config["enabled"] else None
         
         self.is_running = False
         self.background_task = None
         self.loop = None
         
+    def _open_shared_memory(self):
+        """Tạo segment shared memory cho buffer nến (prefix đang được tiến trình khác dùng thì bỏ qua)"""
+        if self.shared_writer is not None or not self.use_shared_memory:
+            return
+        try:
+            self.shared_writer = SharedCandleWriter(self.shm_config["prefix"])
+            self.shared_writer.attach(self.data_store)
+            atexit.register(self.shared_writer.close)
+        except Exception as e:
+            logger.error(f"Không tạo được shared memory: {e}")
+            self.shared_writer = None
+    
+    def _close_shared_memory(self):
+        """Đưa nến về bộ nhớ thường và xóa các segment"""
+        if self.shared_writer is None:
+            return
+        atexit.unregister(self.shared_writer.close)
+        self.shared_writer.detach(self.data_store)
+        self.shared_writer = None
+    
     async def start_async(self):
         """Khởi động bot async"""
         try:
@@ -45,22 +115,91 @@ class TradingBot:
             trading_config = self.config_manager.get_trading_config()
             symbols = trading_config.tokens
             timeframes = trading_config.timeframes
+            history_lookback = self.config_manager.get_history_lookback()
+            
+            # Scanner: mọi perpetual, chỉ giữ lượng nến nhẹ (200 nến mỗi series, không tải lịch sử sâu)
+            if self.scanner and await self.scanner.discover():
+                symbols = self.scanner.symbols
+                history_lookback = {}
+            self.data_store.ensure_lookback_capacity(history_lookback)
             
-            # Chạy data fetcher
-            await self.binance_connector.run_data_fetcher(symbols, timeframes)
+            # Nạp nến từ cache đĩa, sau đó chỉ tải phần còn thiếu từ Binance
+            if self.disk_cache:
+                loaded = self.disk_cache.load(self.data_store, symbols, timeframes)
+                self.data_store.add_log(f"Đã nạp {loaded} nến từ cache")
+                self.disk_cache.attach(self.data_store)
+            
+            # Tạo nến khung lớn tại chỗ từ nến nguồn (mặc định 1m): chỉ nguồn cần realtime từ sàn
+            data_feed = self.config_manager.get_data_feed_config()
+            history_timeframes, live_timeframes = timeframes, None
+            source = data_feed.get("resample_source")
+            derived = CandleResampler.derivable_timeframes(source, timeframes) if source in timeframes else []
+            if derived:
+                self.resampler = CandleResampler(self.data_store, source, derived)
+                self.resampler.attach()
+                # Tải nến nguồn từ đầu bucket lớn nhất (1d: 1440 nến 1m) để bucket đang hình thành được ghi ngay
+                history_lookback = {
+                    **history_lookback,
+                    source: max(history_lookback.get(source) or 0, self.resampler.source_lookback_days())
+                }
+                self.data_store.ensure_lookback_capacity(history_lookback)
+                live_timeframes = [timeframe for timeframe in timeframes if timeframe not in derived]
+                if not data_feed["resample_seed_history"]:
+                    history_timeframes = live_timeframes
+                self.data_store.add_log(f"Tạo {', '.join(derived)} từ nến {source}")
+            
+            # Chạy data fetcher (WebSocket hoặc REST polling)
+            await self.binance_connector.run_data_fetcher(
+                symbols,
+                history_timeframes,
+                use_websocket=data_feed["mode"] == "websocket",
+                history_lookback=history_lookback,
+                live_timeframes=live_timeframes,
+                active_timeframes=self.active_live_timeframes
+            )
             
         except Exception as e:
             logger.error(f"Lỗi khởi động bot: {e}")
             self.data_store.add_log(f"Lỗi khởi động bot: {str(e)}")
     
+    def active_live_timeframes(self) -> List[str]:
+        """Timeframe cần lấy từ sàn cho chế độ giao dịch hiện tại (khung tạo từ 1m cần nến nguồn)"""
+        trading_mode = self.config_manager.get_trading_config().trading_mode
+        needed = set()
+        for timeframe in self.config_manager.get_timeframes_for_mode(trading_mode):
+            if self.resampler and timeframe in self.resampler.target_timeframes:
+                needed.add(self.resampler.source_timeframe)
+            else:
+                needed.add(timeframe)
+        return sorted(needed, key=interval_to_ms)
+    
+    def _new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """Tạo event loop, dùng uvloop nếu được bật và đã cài đặt"""
+        if self.http_config.get("use_uvloop"):
+            try:
+                import uvloop
+                return uvloop.new_event_loop()
+            except ImportError:
+                pass
+        return asyncio.new_event_loop()
+    
     def start_background_task(self):
         """Khởi động task nền"""
         if self.background_task and self.background_task.is_alive():
             return
         
+        # Shared memory được xóa khi dừng bot, tạo lại khi khởi động lại
+        self._open_shared_memory()
+        if self.analysis_executor:
+            if self.shared_writer:
+                self.analysis_executor.shared_writer = self.shared_writer
+            else:
+                logger.error("Không có shared memory, chạy phân tích trong tiến trình chính")
+                self.analysis_executor = self.trading_strategy.analysis_executor = None
+        
         def run_async_loop():
             try:
-                self.loop = asyncio.new_event_loop()
+                self.loop = self._new_event_loop()
                 asyncio.set_event_loop(self.loop)
                 self.loop.run_until_complete(self.start_async())
             except Exception as e:
@@ -78,8 +217,34 @@ class TradingBot:
         self.is_running = False
         if self.loop:
             asyncio.run_coroutine_threadsafe(self.binance_connector.stop(), self.loop)
+        if self.disk_cache:
+            self.data_store.remove_candle_listener(self.disk_cache.enqueue)
+            self.disk_cache.stop()
+        if self.resampler:
+            self.resampler.detach()
+            self.resampler = None
+        if self.analysis_executor:
+            self.analysis_executor.shutdown()
+        self._close_shared_memory()
         self.data_store.add_log("Bot đã được dừng")
     
+    def get_chart_data(self, symbol: str, timeframe: str, count: int = 200):
+        """(nến, chuỗi chỉ báo) của count nến cuối để vẽ biểu đồ, chỉ báo đọc từ IndicatorHistory"""
+        try:
+            df = self.data_store.get_market_data(symbol, timeframe)
+            if df is None or len(df) == 0:
+                return None, None
+            df = df.tail(count).reset_index(drop=True)
+            trading_mode = self.config_manager.get_trading_config().trading_mode
+            indicators = self.technical_analyzer.get_indicator_dataframe(
+                symbol, timeframe, self.config_manager.get_indicators_config(trading_mode),
+                start=df['timestamp'].iloc[0].to_pydatetime()
+            )
+            return df, indicators
+        except Exception as e:
+            logger.error(f"Lỗi lấy dữ liệu biểu đồ {symbol} {timeframe}: {e}")
+            return None, None
+    
     def run_analysis(self):
         """Chạy phân tích và tạo đề xuất"""
         try:
@@ -90,7 +255,10 @@ class TradingBot:
             # Debug log
             self.data_store.add_log(f"🎯 Config hiện tại - Mode: {trading_mode}, Vốn: {trading_config.available_capital}")
             
-            self.trading_strategy.run_strategy_analysis(symbols, trading_mode)
+            if self.scanner and self.scanner.symbols:
+                self.scanner.scan(trading_mode)
+            else:
+                self.trading_strategy.run_strategy_analysis(symbols, trading_mode)
             
         except Exception as e:
             logger.error(f"Lỗi chạy phân tích: {e}")
@@ -149,6 +317,16 @@ def main():
     # Hiển thị giá token
     render_token_watchlist(bot.data_store.current_prices)
     
+    # Biểu đồ giá với chuỗi chỉ báo
+    trading_config = bot.config_manager.get_trading_config()
+    chart_symbol, chart_timeframe = render_chart_controls(
+        bot.scanner.symbols if bot.scanner and bot.scanner.symbols else trading_config.tokens,
+        trading_config.timeframes
+    )
+    chart_df, chart_indicators = bot.get_chart_data(chart_symbol, chart_timeframe)
+    render_price_chart(chart_symbol, chart_df, chart_indicators)
+    render_indicator_panel(chart_indicators)
+    
     st.markdown("---")
     
     # Cấu hình người dùng
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Benchmark các đường xử lý dữ liệu của Bot Trading AI
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Thêm thư mục gốc vào Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from modules.data_models import MarketData, DataStore
+from modules.candle_store import interval_to_ms
+
+def _timeit(func, repeat: int = 3) -> float:
+    """Chạy func nhiều lần và trả về thời gian tốt nhất (giây)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _synthetic_market_data(count: int, symbol: str = "BTCUSDT", timeframe: str = "1m") -> list:
+    """Tạo danh sách MarketData giả lập"""
+    rng = np.random.default_rng(42)
+    closes = 50000 + np.cumsum(rng.normal(0, 20, count))
+    start = datetime(2024, 1, 1)
+    return [
+        MarketData(
+            symbol=symbol,
+            timeframe=timeframe,
+            timestamp=start + timedelta(minutes=i),
+            open=float(closes[i] - 5),
+            high=float(closes[i] + 10),
+            low=float(closes[i] - 10),
+            close=float(closes[i]),
+            volume=float(100 + i % 50)
+        )
+        for i in range(count)
+    ]
+
+def _legacy_add_market_data(store: dict, data: MarketData):
+    """Đường cũ: pd.concat từng dòng rồi tail(1000)"""
+    df = store.get((data.symbol, data.timeframe), pd.DataFrame())
+    new_row = {
+        'timestamp': data.timestamp,
+        'open': data.open,
+        'high': data.high,
+        'low': data.low,
+        'close': data.close,
+        'volume': data.volume
+    }
+    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+    if len(df) > 1000:
+        df = df.tail(1000).reset_index(drop=True)
+    store[(data.symbol, data.timeframe)] = df
+
+def bench_candle_store():
+    """So sánh DataStore (ring buffer) với đường pd.concat cũ"""
+    print("💾 Benchmark candle store (add_market_data)")
+    print(f"{'Nến':>8} | {'pd.concat (s)':>14} | {'Ring buffer (s)':>16} | {'Nhanh hơn':>10}")
+
+    for count in (200, 1000, 3000):
+        candles = _synthetic_market_data(count)
+
+        def run_legacy():
+            store = {}
+            for candle in candles:
+                _legacy_add_market_data(store, candle)
+
+        def run_ring_buffer():
+            data_store = DataStore()
+            for candle in candles:
+                data_store.add_market_data(candle)
+            data_store.get_market_data("BTCUSDT", "1m")
+
+        legacy_time = _timeit(run_legacy, repeat=1)
+        ring_time = _timeit(run_ring_buffer)
+        print(f"{count:>8} | {legacy_time:>14.4f} | {ring_time:>16.4f} | {legacy_time / ring_time:>9.1f}x")
+
+def _synthetic_klines(count: int, interval_ms: int = 60_000) -> list:
+    """Tạo klines thô giống response /fapi/v1/klines"""
+    rng = np.random.default_rng(7)
+    closes = 50000 + np.cumsum(rng.normal(0, 20, count))
+    start = 1_704_067_200_000
+    klines = []
+    for i in range(count):
+        open_time = start + i * interval_ms
+        close = closes[i]
+        klines.append([
+            open_time, f"{close - 5:.2f}", f"{close + 10:.2f}", f"{close - 10:.2f}", f"{close:.2f}",
+            f"{100 + i % 50:.3f}", open_time + interval_ms - 1, "0", 10, "0", "0", "0"
+        ])
+    return klines
+
+def bench_kline_ingest():
+    """So sánh parse_klines_data + add_market_data với add_klines_batch"""
+    from modules.binance_connector import BinanceConnector
+
+    print("\n📥 Benchmark nạp klines lịch sử (200 nến mỗi series)")
+    print(f"{'Series':>8} | {'Từng nến (s)':>13} | {'Theo khối (s)':>14} | {'Nhanh hơn':>10}")
+
+    klines = _synthetic_klines(200)
+    for series in (7, 70, 700):
+        keys = [(f"SYM{i // 7}USDT", f"tf{i % 7}") for i in range(series)]
+
+        def run_per_candle():
+            data_store = DataStore()
+            connector = BinanceConnector(data_store)
+            for symbol, timeframe in keys:
+                for market_data in connector.parse_klines_data(klines, symbol, timeframe):
+                    data_store.add_market_data(market_data)
+
+        def run_batch():
+            data_store = DataStore()
+            for symbol, timeframe in keys:
+                data_store.add_klines_batch(symbol, timeframe, klines)
+
+        per_candle_time = _timeit(run_per_candle, repeat=1)
+        batch_time = _timeit(run_batch)
+        print(f"{series:>8} | {per_candle_time:>13.4f} | {batch_time:>14.4f} | {per_candle_time / batch_time:>9.1f}x")
+
+def _peak_memory(func) -> int:
+    """Bộ nhớ cấp phát lớn nhất (byte) trong một lần chạy func"""
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_kline_decode():
+    """So sánh giải mã payload klines: json chuẩn với decode_klines (orjson nếu có)"""
+    import json
+    from modules.candle_store import klines_to_columns
+    from modules.fast_json import decode_klines, orjson
+
+    print("\n🧮 Benchmark giải mã payload /fapi/v1/klines (100 response mỗi lần đo)")
+    decoder_name = "decode_klines" + (" (orjson)" if orjson is not None else " (json)")
+    print(f"{'Nến':>8} | {'json (s)':>10} | {decoder_name + ' (s)':>26} | {'Peak json (KB)':>15} | {'Peak decode (KB)':>17}")
+
+    for count in (100, 500, 1500):
+        # Binance trả JSON không có khoảng trắng
+        body = json.dumps(_synthetic_klines(count), separators=(',', ':')).encode()
+
+        json_time = _timeit(lambda: [klines_to_columns(json.loads(body)) for _ in range(100)])
+        decode_time = _timeit(lambda: [decode_klines(body) for _ in range(100)])
+        json_peak = _peak_memory(lambda: klines_to_columns(json.loads(body)))
+        decode_peak = _peak_memory(lambda: decode_klines(body))
+        print(f"{count:>8} | {json_time:>10.4f} | {decode_time:>26.4f} | "
+              f"{json_peak / 1024:>15.0f} | {decode_peak / 1024:>17.0f}")
+
+def _start_mock_server(symbol_count: int, latency: float):
+    """Chạy server giả lập Binance trong tiến trình riêng, trả về (process, base_url)"""
+    import socket
+    import subprocess
+    import urllib.request
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "utils.binance_mock_server", "--port", str(port),
+         "--symbols", str(symbol_count), "--latency", str(latency)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base_url}/fapi/v1/ping", timeout=1).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Không khởi động được server giả lập")
+
+def bench_connector_throughput():
+    """Đo thông lượng BinanceConnector với server giả lập (độ trễ 10ms mỗi request)"""
+    import asyncio
+    from modules.binance_connector import BinanceConnector
+    from utils.binance_mock_server import make_symbols
+
+    print("\n🌐 Benchmark BinanceConnector với server giả lập (1m + 1h, 200 nến, latency 10ms)")
+    print(f"{'Symbols':>8} | {'Lịch sử (s)':>12} | {'Request/s':>10} | {'Cập nhật giá (s)':>17} | "
+          f"{'p50 (ms)':>9} | {'p99 (ms)':>9}")
+
+    async def run(base_url: str, symbols: list):
+        connector = BinanceConnector(DataStore(), base_url=base_url)
+        await connector.start()
+        try:
+            start = time.perf_counter()
+            await connector.fetch_historical_data(symbols, ["1m", "1h"])
+            history_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await connector.update_current_prices(symbols)
+            price_time = time.perf_counter() - start
+            return history_time, price_time, connector.metrics.summary()["/fapi/v1/klines"]
+        finally:
+            await connector.stop()
+
+    for count in (10, 100, 500):
+        # Mỗi lần đo dùng server mới để weight theo phút bắt đầu từ 0
+        process, base_url = _start_mock_server(count, latency=0.01)
+        try:
+            history_time, price_time, klines = asyncio.run(run(base_url, make_symbols(count)))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{count:>8} | {history_time:>12.3f} | {klines['requests'] / history_time:>10.0f} | "
+              f"{price_time:>17.3f} | {klines['p50_ms']:>9.1f} | {klines['p99_ms']:>9.1f}")
+
+def bench_scheduler():
+    """Chi phí lập lịch làm mới nến theo thời điểm đóng nến khi có hàng nghìn key"""
+    from modules.scheduler import CandleCloseScheduler
+
+    print("\n⏱️ Benchmark CandleCloseScheduler (mô phỏng 1 ngày, tick 500ms)")
+    print(f"{'Keys':>8} | {'Lần đến hạn':>12} | {'Tổng (s)':>9} | {'µs/lần':>8}")
+
+    timeframes = ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
+    start_ms = 1_704_067_200_000
+    for symbol_count in (10, 100, 1000):
+        keys = [(f"SYM{i}USDT", timeframe) for i in range(symbol_count) for timeframe in timeframes]
+
+        def run():
+            scheduler = CandleCloseScheduler(now_ms=start_ms)
+            scheduler.set_keys(keys, now_ms=start_ms)
+            fired = 0
+            for now_ms in range(start_ms, start_ms + 86_400_000, 500):
+                fired += len(scheduler.pop_due(now_ms))
+            return fired
+
+        fired = run()
+        elapsed = _timeit(run, repeat=1)
+        print(f"{len(keys):>8} | {fired:>12} | {elapsed:>9.3f} | {elapsed / fired * 1e6:>8.2f}")
+
+def bench_streaming_indicators():
+    """Chi phí cập nhật chỉ báo mỗi nến: tính lại cả series bằng pandas so với streaming O(1)"""
+    from modules.technical_analysis import TechnicalAnalyzer
+    from modules.streaming_indicators import StreamingIndicatorEngine
+
+    print("\n📈 Benchmark chỉ báo mỗi lần cập nhật nến (200 cập nhật)")
+    print(f"{'Nến':>8} | {'pandas (ms/lần)':>16} | {'Streaming (µs/lần)':>19} | {'Nhanh hơn':>10}")
+
+    indicators_config = {'rsi_period': 14, 'ma_fast': 10, 'ma_slow': 20,
+                         'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9}
+    rng = np.random.default_rng(3)
+    updates = 200
+    for count in (200, 1000, 5000):
+        closes = 100 + np.cumsum(rng.normal(0, 1, count + updates))
+        timestamps = 1_704_067_200_000 + np.arange(count + updates, dtype=np.int64) * 60_000
+        values = np.vstack([closes, closes + 1, closes - 1, closes, np.ones_like(closes)])
+
+        def run(streaming: bool):
+            data_store = DataStore(max_candles=count + updates)
+            data_store.add_candles_block("BTCUSDT", "1m", timestamps[:count], values[:, :count])
+            analyzer = TechnicalAnalyzer(data_store, use_streaming=False)
+            engine = StreamingIndicatorEngine(data_store, indicators_config)
+            engine.attach()
+            engine.get_indicators("BTCUSDT", "1m")
+            start = time.perf_counter()
+            for i in range(count, count + updates):
+                data_store.upsert_candle("BTCUSDT", "1m", int(timestamps[i]), *values[:, i])
+                if streaming:
+                    engine.get_indicators("BTCUSDT", "1m")
+                else:
+                    analyzer.analyze_symbol_timeframe("BTCUSDT", "1m", indicators_config)
+            return (time.perf_counter() - start) / updates
+
+        batch_time = run(False)
+        streaming_time = run(True)
+        print(f"{count:>8} | {batch_time * 1e3:>16.3f} | {streaming_time * 1e6:>19.1f} | "
+              f"{batch_time / streaming_time:>9.0f}x")
+
+def bench_vectorized_analysis():
+    """Phân tích toàn bộ watchlist: vòng lặp pandas từng symbol so với một lượt trên ma trận giá"""
+    from modules.technical_analysis import TechnicalAnalyzer
+
+    print("\n🧮 Benchmark phân tích nhiều symbol (1000 nến 1m mỗi symbol)")
+    print(f"{'Symbols':>8} | {'Từng symbol (s)':>16} | {'Vector hóa (ms)':>16} | {'Nhanh hơn':>10}")
+
+    indicators_config = {'rsi_period': 14, 'ma_fast': 20, 'ma_slow': 50,
+                         'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9}
+    rng = np.random.default_rng(5)
+    for symbol_count in (10, 100, 300):
+        data_store = DataStore(max_candles=1000)
+        symbols = [f"SYM{i}USDT" for i in range(symbol_count)]
+        timestamps = 1_704_067_200_000 + np.arange(1000, dtype=np.int64) * 60_000
+        for symbol in symbols:
+            closes = 100 + np.cumsum(rng.normal(0, 1, 1000))
+            data_store.add_candles_block(symbol, "1m", timestamps,
+                                         np.vstack([closes, closes + 1, closes - 1, closes, np.ones(1000)]))
+        analyzer = TechnicalAnalyzer(data_store, use_streaming=False)
+
+        loop_time = _timeit(lambda: analyzer.analyze_all_symbols(symbols, ["1m"], indicators_config,
+                                                                 vectorized=False), repeat=1)
+        vector_time = _timeit(lambda: analyzer.analyze_all_symbols(symbols, ["1m"], indicators_config))
+        print(f"{symbol_count:>8} | {loop_time:>16.3f} | {vector_time * 1e3:>16.1f} | {loop_time / vector_time:>9.0f}x")
+
+def bench_indicator_cache():
+    """Các lượt phân tích liên tiếp khi chỉ khung 1m có nến mới: có và không có cache chỉ báo"""
+    from modules.technical_analysis import TechnicalAnalyzer
+
+    print("\n🗃️ Benchmark cache chỉ báo (100 symbols × 1m/4h/1d, 5 lượt, chỉ 1m thay đổi)")
+    print(f"{'Chế độ':>10} | {'Tổng (s)':>9} | {'Hit':>6} | {'Miss':>6} | {'Tỉ lệ hit':>9}")
+
+    indicators_config = {'rsi_period': 14, 'ma_fast': 20, 'ma_slow': 50,
+                         'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9}
+    timeframes = ["1m", "4h", "1d"]
+    rng = np.random.default_rng(9)
+    data_store = DataStore(max_candles=500)
+    symbols = [f"SYM{i}USDT" for i in range(100)]
+    for symbol in symbols:
+        for timeframe in timeframes:
+            closes = 100 + np.cumsum(rng.normal(0, 1, 500))
+            timestamps = 1_704_067_200_000 + np.arange(500, dtype=np.int64) * interval_to_ms(timeframe)
+            data_store.add_candles_block(symbol, timeframe, timestamps,
+                                         np.vstack([closes, closes + 1, closes - 1, closes, np.ones(500)]))
+
+    for cached in (False, True):
+        analyzer = TechnicalAnalyzer(data_store, use_streaming=False)
+        if not cached:
+            analyzer.cache.maxsize = 0
+        start = time.perf_counter()
+        for _ in range(5):
+            for symbol in symbols:
+                buffer = data_store.get_candle_buffer(symbol, "1m")
+                close = float(buffer.column('close', 1)[0])
+                data_store.upsert_candle(symbol, "1m", buffer.last_timestamp(), close, close, close, close, 1.0)
+            analyzer.analyze_all_symbols(symbols, timeframes, indicators_config, vectorized=False)
+        elapsed = time.perf_counter() - start
+        stats = analyzer.cache.stats()
+        print(f"{'Cache' if cached else 'Không':>10} | {elapsed:>9.3f} | {stats['hits']:>6} | "
+              f"{stats['misses']:>6} | {stats['hit_rate']:>8.0%}")
+
+def bench_indicator_kernels():
+    """Từng chỉ báo trên một series: pandas rolling/ewm so với kernel NumPy"""
+    from modules import indicator_kernels as kernels
+
+    backend = "numba" if kernels.njit is not None else "NumPy"
+    print(f"\n🧪 Benchmark kernel chỉ báo ({backend}) so với pandas, µs mỗi lần gọi")
+    print(f"{'Chỉ báo':>10} | {'Nến':>6} | {'pandas':>9} | {'Kernel':>9} | {'Nhanh hơn':>10}")
+
+    def pandas_rsi(close: pd.Series):
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        return 100 - 100 / (1 + gain / loss)
+
+    def pandas_macd(close: pd.Series):
+        macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+        signal = macd.ewm(span=9).mean()
+        return macd, signal, macd - signal
+
+    def pandas_bollinger(close: pd.Series):
+        middle = close.rolling(20).mean()
+        std = close.rolling(20).std()
+        return middle + 2 * std, middle, middle - 2 * std
+
+    cases = [
+        ("RSI", pandas_rsi, lambda close: kernels.rsi(close, 14)),
+        ("SMA", lambda close: close.rolling(20).mean(), lambda close: kernels.sma(close, 20)),
+        ("EMA", lambda close: close.ewm(span=26).mean(), lambda close: kernels.ema(close, 26)),
+        ("MACD", pandas_macd, lambda close: kernels.macd(close)),
+        ("Bollinger", pandas_bollinger, lambda close: kernels.bollinger(close)),
+    ]
+    rng = np.random.default_rng(11)
+    for name, pandas_func, kernel_func in cases:
+        for count in (200, 500, 1000):
+            values = 100 + np.cumsum(rng.normal(0, 1, count))
+            series = pd.Series(values)
+            kernel_func(values)  # Biên dịch numba (nếu có) trước khi đo
+            pandas_time = _timeit(lambda: [pandas_func(series) for _ in range(100)]) / 100
+            kernel_time = _timeit(lambda: [kernel_func(values) for _ in range(100)]) / 100
+            print(f"{name:>10} | {count:>6} | {pandas_time * 1e6:>9.1f} | {kernel_time * 1e6:>9.1f} | "
+                  f"{pandas_time / kernel_time:>9.1f}x")
+
+def bench_indicator_registry():
+    """DAG chỉ báo: số nút và thời gian khi thêm chỉ báo, so với mỗi chỉ báo tự tính riêng"""
+    from modules.indicator_registry import BASE_INDICATORS, INDICATORS, IndicatorGraph
+
+    config = {"rsi_period": 14, "ma_fast": 10, "ma_slow": 20, "macd_fast": 12, "macd_slow": 26,
+              "macd_signal": 9, "atr_period": 14, "adx_period": 14, "stoch_period": 14, "stoch_smooth": 3}
+    count = 1000
+    rng = np.random.default_rng(21)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    columns = {
+        "timestamp": 1_700_000_000_000 + np.arange(count, dtype=np.float64) * 60_000,
+        "open": close + rng.normal(0, 0.1, count),
+        "high": close + rng.random(count),
+        "low": close - rng.random(count),
+        "close": close,
+        "volume": rng.random(count) * 100,
+    }
+
+    print(f"\n🧪 Benchmark DAG chỉ báo ({count} nến), µs mỗi series")
+    print(f"{'Tập chỉ báo':>14} | {'Nút DAG':>8} | {'Nút riêng':>9} | {'DAG':>9} | {'Riêng lẻ':>9}")
+    for label, names in (("4 gốc", BASE_INDICATORS), ("tất cả", tuple(INDICATORS))):
+        graph = IndicatorGraph(config, names)
+        separate = [IndicatorGraph(config, (name,)) for name in names]
+        graph_time = _timeit(lambda: [graph.evaluate(columns) for _ in range(100)]) / 100
+        separate_time = _timeit(lambda: [[item.evaluate(columns) for item in separate] for _ in range(100)]) / 100
+        print(f"{label:>14} | {graph.node_count:>8} | {graph.declared_nodes:>9} | "
+              f"{graph_time * 1e6:>9.1f} | {separate_time * 1e6:>9.1f}")
+
+def bench_process_executor():
+    """Một lượt phân tích toàn bộ series: trong tiến trình chính so với ProcessPoolExecutor qua shared memory"""
+    import os
+    from modules.analysis_executor import ProcessAnalysisExecutor
+    from modules.shared_store import SharedCandleWriter
+    from modules.technical_analysis import TechnicalAnalyzer
+
+    workers = os.cpu_count() or 1
+    print(f"\n🧵 Benchmark executor nhiều tiến trình ({workers} worker, 1000 nến mỗi series)")
+    print(f"{'Series':>8} | {'Tuần tự (s)':>12} | {'Process (s)':>12} | {'Nhanh hơn':>10}")
+
+    configs = [{'rsi_period': 14, 'ma_fast': 10, 'ma_slow': 20, 'bb_std': std} for std in (2, 2.5)]
+    rng = np.random.default_rng(9)
+    timestamps = 1_704_067_200_000 + np.arange(1000, dtype=np.int64) * 60_000
+    for symbol_count in (100, 300):
+        data_store = DataStore(max_candles=1000)
+        writer = SharedCandleWriter(f"bench_exec_{symbol_count}")
+        writer.attach(data_store)
+        symbols = [f"SYM{i}USDT" for i in range(symbol_count)]
+        timeframes = ["1m", "5m", "15m"]
+        for symbol in symbols:
+            for timeframe in timeframes:
+                closes = 100 + np.cumsum(rng.normal(0, 1, 1000))
+                data_store.add_candles_block(symbol, timeframe, timestamps,
+                                             np.vstack([closes, closes + 1, closes - 1, closes, rng.random(1000)]))
+        analyzer = TechnicalAnalyzer(data_store, use_streaming=False)
+        executor = ProcessAnalysisExecutor(data_store, analyzer, writer)
+        try:
+            series = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+            inline_time = _timeit(lambda: [analyzer.calculate_indicators(symbol, timeframe, configs[0])
+                                           for symbol, timeframe in series], repeat=1)
+            # Lượt đầu khởi động worker; đổi cấu hình để mỗi lượt phân tích lại mọi series
+            executor.submit(symbols, timeframes, configs[1])
+            executor.wait()
+            executor.submit(symbols, timeframes, configs[0])
+            executor.wait()
+            process_time = executor.last_pass_seconds
+        finally:
+            executor.shutdown()
+            writer.close()
+        print(f"{len(series):>8} | {inline_time:>12.3f} | {process_time:>12.3f} | {inline_time / process_time:>9.1f}x")
+
+def bench_signal_matrix():
+    """Tín hiệu đa khung thời gian: dict chuỗi từng symbol so với SignalMatrix một lượt"""
+    from datetime import datetime
+    from config.config import ConfigManager
+    from modules.data_models import TechnicalIndicators
+    from modules.technical_analysis import TechnicalAnalyzer
+    from modules.trading_strategy import TradingStrategy
+
+    print("\n🚦 Benchmark tín hiệu đa khung thời gian (Scalp, 3 khung)")
+    print(f"{'Symbols':>8} | {'Dict (ms)':>10} | {'Ma trận (ms)':>13} | {'Nhanh hơn':>10}")
+
+    config_manager = ConfigManager()
+    timeframes = config_manager.get_timeframes_for_mode("scalp")
+    rng = np.random.default_rng(13)
+    for symbol_count in (30, 300):
+        data_store = DataStore()
+        symbols = [f"SYM{i}USDT" for i in range(symbol_count)]
+        for symbol in symbols:
+            data_store.update_price(symbol, 100 + rng.normal())
+            for timeframe in timeframes:
+                ma_fast, ma_slow, macd, signal = 100 + rng.normal(0, 1, 4)
+                data_store.add_indicators(TechnicalIndicators(
+                    symbol, timeframe, datetime.now(), rsi=rng.uniform(10, 90), ma_fast=ma_fast, ma_slow=ma_slow,
+                    macd=macd - 100, macd_signal=signal - 100, macd_histogram=macd - signal,
+                    bb_upper=101.0, bb_middle=100.0, bb_lower=99.0
+                ))
+        analyzer = TechnicalAnalyzer(data_store)
+        strategy = TradingStrategy(data_store, config_manager, analyzer)
+
+        def per_symbol():
+            for symbol in symbols:
+                analysis = analyzer.get_multi_timeframe_analysis(symbol, timeframes, "Scalp")
+                strategy.scalp_decisions(strategy._signal_matrix(symbol, analysis))
+
+        def one_pass():
+            strategy.scalp_decisions(analyzer.get_signal_matrix(symbols, timeframes, "Scalp"))
+
+        dict_time = _timeit(per_symbol)
+        matrix_time = _timeit(one_pass)
+        print(f"{symbol_count:>8} | {dict_time * 1e3:>10.2f} | {matrix_time * 1e3:>13.2f} | {dict_time / matrix_time:>9.1f}x")
+
+def bench_market_scanner():
+    """Chu kỳ quét toàn thị trường (300 perpetual × 3 khung Scalp, 200 nến): CPU mỗi chu kỳ"""
+    from config.config import ConfigManager
+    from modules.market_scanner import MarketScanner
+    from modules.technical_analysis import TechnicalAnalyzer
+    from modules.trading_strategy import TradingStrategy
+
+    print("\n🔭 Benchmark scanner toàn thị trường (mục tiêu < 1 s CPU mỗi chu kỳ)")
+    print(f"{'Chu kỳ':>22} | {'Series tính lại':>15} | {'CPU (ms)':>9} | {'Top-K':>6}")
+
+    config_manager = ConfigManager()
+    timeframes = config_manager.get_timeframes_for_mode("scalp")
+    data_store = DataStore()
+    analyzer = TechnicalAnalyzer(data_store)
+    strategy = TradingStrategy(data_store, config_manager, analyzer)
+    scanner = MarketScanner(data_store, None, analyzer, strategy, config_manager, top_k=10)
+    scanner.symbols = [f"SYM{i:04d}USDT" for i in range(300)]
+
+    rng = np.random.default_rng(17)
+    count = 200
+    timestamps = 1_704_067_200_000 + np.arange(count, dtype=np.int64) * 60_000
+    for symbol in scanner.symbols:
+        for timeframe in timeframes:
+            closes = 100 + np.cumsum(rng.normal(0, 1, count))
+            data_store.add_candles_block(symbol, timeframe, timestamps,
+                                         np.vstack([closes, closes + 1, closes - 1, closes, np.ones(count)]))
+        data_store.update_price(symbol, float(closes[-1]))
+
+    def report(label: str):
+        scanner.scan("Scalp")
+        print(f"{label:>22} | {scanner.last_analyzed:>15} | {scanner.last_cycle_cpu * 1e3:>9.1f} | {len(scanner.top):>6}")
+
+    report("Lần đầu (mọi series)")
+    for cycle in range(3):
+        # Mỗi series có một nến mới
+        next_time = timestamps[-1:] + (cycle + 1) * 60_000
+        for symbol in scanner.symbols:
+            for timeframe in timeframes:
+                close = 100 + rng.normal(0, 5)
+                data_store.add_candles_block(symbol, timeframe, next_time,
+                                             np.array([[close], [close + 1], [close - 1], [close], [1.0]]))
+        report(f"Nến mới #{cycle + 1}")
+    report("Không có nến mới")
+
+def bench_backtester():
+    """Backtest một năm nến 1m của một symbol cho Scalp và Swing"""
+    from config.config import ConfigManager
+    from modules.backtester import Backtester
+    from modules.technical_analysis import TechnicalAnalyzer
+    from modules.trading_strategy import TradingStrategy
+
+    print("\n⏪ Benchmark backtest 1 năm nến 1m (mục tiêu vài giây mỗi chế độ)")
+    print(f"{'Chế độ':>8} | {'Nến':>8} | {'Tín hiệu':>8} | {'Lệnh':>6} | {'Win rate':>8} | {'Thời gian (s)':>13}")
+
+    config_manager = ConfigManager()
+    data_store = DataStore()
+    strategy = TradingStrategy(data_store, config_manager, TechnicalAnalyzer(data_store))
+    backtester = Backtester(config_manager, strategy)
+
+    rng = np.random.default_rng(23)
+    count = 365 * 1440
+    timestamps = 1_704_067_200_000 + np.arange(count, dtype=np.int64) * 60_000
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, count)))
+    opens = np.concatenate([closes[:1], closes[:-1]])
+    wick = np.abs(rng.normal(0, 0.0005, (2, count)))
+    values = np.vstack([opens, np.maximum(opens, closes) * (1 + wick[0]),
+                        np.minimum(opens, closes) * (1 - wick[1]), closes, np.ones(count)])
+
+    for mode in ("Scalp", "Swing"):
+        result = backtester.run(timestamps, values, mode, "SYNUSDT")
+        print(f"{mode:>8} | {result.candles:>8} | {result.signals:>8} | {result.trades:>6} | "
+              f"{result.win_rate:>8.1%} | {result.seconds:>13.2f}")
+
+def main():
+    """Chạy tất cả benchmark"""
+    print("🚀 Starting Bot Trading AI Benchmarks\n")
+    bench_candle_store()
+    bench_kline_ingest()
+    bench_kline_decode()
+    bench_scheduler()
+    bench_indicator_kernels()
+    bench_indicator_registry()
+    bench_streaming_indicators()
+    bench_vectorized_analysis()
+    bench_process_executor()
+    bench_signal_matrix()
+    bench_market_scanner()
+    bench_backtester()
+    bench_indicator_cache()
+    bench_connector_throughput()
+    print("\n🎉 Benchmarks completed!")
+
+if __name__ == "__main__":
+    main()
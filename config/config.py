@@ -67,7 +67,11 @@ class ConfigManager:
                     "ma_slow": 20,
                     "macd_fast": 12,
                     "macd_slow": 26,
-                    "macd_signal": 9
+                    "macd_signal": 9,
+                    "atr_period": 14,
+                    "adx_period": 14,
+                    "stoch_period": 14,
+                    "stoch_smooth": 3
                 },
                 "swing": {
                     "rsi_period": 14,
@@ -75,13 +79,55 @@ class ConfigManager:
                     "ma_slow": 50,
                     "macd_fast": 12,
                     "macd_slow": 26,
-                    "macd_signal": 9
+                    "macd_signal": 9,
+                    "atr_period": 14,
+                    "adx_period": 14,
+                    "stoch_period": 14,
+                    "stoch_smooth": 3
                 }
             },
             "risk_management": {
                 "max_leverage": 20,
                 "default_leverage": 10,
                 "risk_per_trade": 0.02
+            },
+            "data_feed": {
+                "mode": "rest",
+                "base_url": "https://fapi.binance.com",
+                "stream_url": "wss://fstream.binance.com",
+                "resample_source": "1m",
+                "resample_seed_history": True
+            },
+            "history": {
+                "lookback_days": {}  # Rỗng: 200 nến mỗi series; ví dụ {"1m": 3, "1h": 120, "1d": 1000}
+            },
+            "cache": {
+                "enabled": False,
+                "directory": "data/candles",
+                "flush_interval": 5
+            },
+            "shared_memory": {
+                "enabled": False,
+                "prefix": "binance_bot"
+            },
+            "analysis": {
+                "executor": "inline",
+                "max_workers": None
+            },
+            "scanner": {
+                "enabled": False,
+                "top_k": 10,
+                "quote_asset": "USDT",
+                "max_symbols": None
+            },
+            "http": {
+                "pool_size": 100,
+                "pool_size_per_host": 20,
+                "dns_ttl": 300,
+                "keepalive_timeout": 60,
+                "default_timeout": 10,
+                "max_retries": 3,
+                "use_uvloop": True
             }
         }
     
@@ -126,4 +172,39 @@ class ConfigManager:
             "max_leverage": 20,
             "default_leverage": 10,
             "risk_per_trade": 0.02
-        }) 
\ No newline at end of file
+        })
+    
+    def get_data_feed_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình nguồn dữ liệu (websocket hoặc rest)"""
+        defaults = self.get_default_config()["data_feed"]
+        return {**defaults, **self.config.get("data_feed", {})}
+    
+    def get_history_lookback(self) -> Dict[str, float]:
+        """Trả về số ngày lịch sử cần tải cho mỗi timeframe (rỗng = chỉ tải 200 nến)"""
+        history = self.config.get("history", self.get_default_config()["history"])
+        return history.get("lookback_days", {})
+    
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình cache nến trên đĩa"""
+        defaults = self.get_default_config()["cache"]
+        return {**defaults, **self.config.get("cache", {})}
+    
+    def get_shared_memory_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình chia sẻ nến qua shared memory"""
+        defaults = self.get_default_config()["shared_memory"]
+        return {**defaults, **self.config.get("shared_memory", {})}
+    
+    def get_analysis_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình chạy phân tích (executor "inline" hoặc "process", số worker)"""
+        defaults = self.get_default_config()["analysis"]
+        return {**defaults, **self.config.get("analysis", {})}
+    
+    def get_scanner_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình chế độ quét toàn thị trường (top-K đề xuất trên mọi perpetual)"""
+        defaults = self.get_default_config()["scanner"]
+        return {**defaults, **self.config.get("scanner", {})}
+    
+    def get_http_config(self) -> Dict[str, Any]:
+        """Trả về cấu hình tầng HTTP (connection pool, timeout, retry, uvloop)"""
+        defaults = self.get_default_config()["http"]
+        return {**defaults, **self.config.get("http", {})}
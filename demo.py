@@ -4,6 +4,7 @@ Demo script để test các module của Bot Trading AI
 """
 
 import asyncio
+import time
 import sys
 import os
 
@@ -15,14 +16,17 @@ from modules.data_models import DataStore
 from modules.binance_connector import BinanceConnector
 from modules.technical_analysis import TechnicalAnalyzer
 from modules.trading_strategy import TradingStrategy
+from modules.market_scanner import MarketScanner
+from modules.backtester import Backtester
+from modules.candle_store import datetime_to_ms
 from utils.logger import setup_logger
 
-async def test_binance_connection():
+async def test_binance_connection(base_url: str = "https://fapi.binance.com"):
     """Test kết nối Binance API"""
     print("🔗 Testing Binance connection...")
     
     data_store = DataStore()
-    connector = BinanceConnector(data_store)
+    connector = BinanceConnector(data_store, base_url=base_url)
     
     try:
         await connector.start()
@@ -124,7 +128,69 @@ def test_data_store():
     except Exception as e:
         print(f"❌ DataStore test failed: {e}")
 
-async def test_full_workflow():
+def _check_streaming(max_candles: int, count: int, seed: int):
+    """Chạy series count nến (mỗi nến sửa vài lần), so sánh streaming với batch sau mỗi lần ghi"""
+    import numpy as np
+    from modules.streaming_indicators import StreamingIndicatorEngine
+    
+    indicators_config = ConfigManager().get_indicators_config("scalp")
+    data_store = DataStore(max_candles=max_candles)
+    analyzer = TechnicalAnalyzer(data_store, use_streaming=False)
+    engine = StreamingIndicatorEngine(data_store, indicators_config)
+    engine.attach()
+    
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, count))
+    closes[80:110] = closes[80]  # Đoạn giá đứng yên: RSI 0/0, độ lệch chuẩn bằng 0
+    start = 1_700_000_000_000
+    fields = ['rsi', 'ma_fast', 'ma_slow', 'macd', 'macd_signal', 'macd_histogram',
+              'bb_upper', 'bb_middle', 'bb_lower']
+    
+    def check(step: str):
+        batch = analyzer.analyze_symbol_timeframe("BTCUSDT", "1m", indicators_config)
+        streaming = engine.get_indicators("BTCUSDT", "1m")
+        assert (batch is None) == (streaming is None), step
+        if batch is None:
+            return
+        assert batch.timestamp == streaming.timestamp, step
+        for field in fields:
+            a, b = getattr(batch, field), getattr(streaming, field)
+            assert (a is None) == (b is None), (step, field)
+            # pandas rolling std có sai số làm tròn ~1e-7 khi cửa sổ gần như không đổi
+            tolerance = 1e-6 * abs(batch.bb_middle) if field.startswith('bb') else 1e-9 * max(1.0, abs(a or 0))
+            assert a is None or abs(a - b) <= tolerance, (step, field, a, b)
+    
+    for i, close in enumerate(closes):
+        # Nến đang hình thành được cập nhật vài lần rồi mới chốt
+        for price in (close + rng.normal(0, 0.5), close):
+            data_store.upsert_candle("BTCUSDT", "1m", start + i * 60_000, price, price + 1, price - 1, price, 1.0)
+            check(f"nến {i}")
+    
+    # Sửa một nến cũ còn trong buffer: series được nạp lại từ buffer
+    data_store.upsert_candle("BTCUSDT", "1m", start + (count - 50) * 60_000, 1.0, 2.0, 0.5, 1.0, 1.0)
+    check("sửa nến cũ")
+    return len(data_store.get_candle_buffer("BTCUSDT", "1m"))
+
+def test_streaming_indicators() -> bool:
+    """So sánh chỉ báo streaming (O(1) mỗi nến) với cách tính lại cả series bằng pandas
+    
+    Chạy hai kịch bản: buffer chưa đầy, và buffer ring đã bỏ nến cũ (EMA streaming nhớ
+    cả phần đã bị bỏ, phần này nhỏ hơn sai số khi buffer đủ dài). Trả về False nếu lệch.
+    """
+    print("\n📈 Testing streaming indicators...")
+    
+    try:
+        kept = _check_streaming(max_candles=1000, count=200, seed=7)
+        print(f"✅ Streaming indicators match batch over {kept} candles (with revisions)")
+        kept = _check_streaming(max_candles=600, count=1500, seed=11)
+        print(f"✅ Streaming indicators match batch after ring-buffer eviction (1500 candles, {kept} kept)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streaming indicators test failed: {e!r}")
+        return False
+
+async def test_full_workflow(base_url: str = "https://fapi.binance.com"):
     """Test workflow hoàn chỉnh"""
     print("\n🔄 Testing full workflow...")
     
@@ -132,7 +198,7 @@ async def test_full_workflow():
         # Khởi tạo các components
         config_manager = ConfigManager()
         data_store = DataStore()
-        connector = BinanceConnector(data_store)
+        connector = BinanceConnector(data_store, base_url=base_url)
         analyzer = TechnicalAnalyzer(data_store)
         strategy = TradingStrategy(data_store, config_manager, analyzer)
         
@@ -163,7 +229,23 @@ async def test_full_workflow():
                 print(f"   RSI: {indicators.rsi:.2f}" if indicators.rsi else "   RSI: N/A")
                 print(f"   MA Fast: {indicators.ma_fast:.2f}" if indicators.ma_fast else "   MA Fast: N/A")
                 print(f"   MA Slow: {indicators.ma_slow:.2f}" if indicators.ma_slow else "   MA Slow: N/A")
-            
+
+            # Chuỗi chỉ báo cho biểu đồ: hàng cuối phải trùng với chỉ báo vừa tính
+            history = analyzer.get_indicator_dataframe("BTCUSDT", "1h", indicators_config)
+            if history is not None and indicators and indicators.rsi is not None:
+                assert len(history) == len(df) and abs(history['rsi'].iloc[-1] - indicators.rsi) < 1e-9
+                # Nến cuối thay đổi: chỉ phần đuôi được tính lại, vẫn khớp với tính lại cả series
+                last = df.iloc[-1]
+                data_store.upsert_candle("BTCUSDT", "1h", datetime_to_ms(last['timestamp']),
+                                         last['open'], last['high'] * 1.01, last['low'], last['high'] * 1.01,
+                                         last['volume'] + 1)
+                history = analyzer.get_indicator_dataframe("BTCUSDT", "1h", indicators_config)
+                latest = analyzer.calculate_indicators("BTCUSDT", "1h", indicators_config)
+                for field in ('rsi', 'macd_signal', 'adx', 'vwap', 'obv'):
+                    assert abs(history[field].iloc[-1] - getattr(latest, field)) <= 1e-9 * max(1.0, abs(getattr(latest, field)))
+                assert analyzer.history.incremental_updates == 1
+                print(f"✅ Indicator history: {len(history)} rows × {len(history.columns) - 1} fields (tail update)")
+
             # Chạy chiến lược
             print("💡 Running trading strategy...")
             strategy.run_strategy_analysis(symbols, "Scalp")
@@ -183,6 +265,66 @@ async def test_full_workflow():
     except Exception as e:
         print(f"❌ Full workflow test failed: {e}")
 
+async def test_market_scanner(base_url: str = "https://fapi.binance.com", max_symbols: int = 20):
+    """Test scanner: lấy perpetual từ exchangeInfo, quét và xếp hạng top-K"""
+    print("\n🔭 Testing market scanner...")
+    
+    try:
+        config_manager = ConfigManager()
+        data_store = DataStore()
+        connector = BinanceConnector(data_store, base_url=base_url)
+        analyzer = TechnicalAnalyzer(data_store)
+        strategy = TradingStrategy(data_store, config_manager, analyzer)
+        scanner = MarketScanner(data_store, connector, analyzer, strategy, config_manager,
+                                top_k=5, max_symbols=max_symbols)
+        
+        await connector.start()
+        symbols = await scanner.discover()
+        print(f"✅ Discovered {len(symbols)} USDT perpetuals (limited to {max_symbols})")
+        
+        await connector.fetch_historical_data(symbols, config_manager.get_timeframes_for_mode("scalp"))
+        await connector.update_current_prices(symbols)
+        top = scanner.scan("Scalp")
+        print(f"✅ Scan cycle: {scanner.last_analyzed} series, {scanner.last_cycle_cpu * 1e3:.1f} ms CPU")
+        for suggestion in top:
+            print(f"   {suggestion.direction} {suggestion.symbol} ({suggestion.confidence:.0%})")
+        
+        confidences = [suggestion.confidence for suggestion in top]
+        assert confidences == sorted(confidences, reverse=True) and len(top) <= 5
+        await connector.stop()
+        print("✅ Market scanner test completed!")
+        
+    except Exception as e:
+        print(f"❌ Market scanner test failed: {e!r}")
+
+async def test_backtester(base_url: str = "https://fapi.binance.com", days: int = 7):
+    """Test backtest: tải lịch sử 1m của BTCUSDT rồi chạy lại luật Scalp"""
+    print("\n⏪ Testing backtester...")
+    
+    try:
+        config_manager = ConfigManager()
+        data_store = DataStore()
+        connector = BinanceConnector(data_store, base_url=base_url)
+        strategy = TradingStrategy(data_store, config_manager, TechnicalAnalyzer(data_store))
+        backtester = Backtester(config_manager, strategy)
+        
+        await connector.start()
+        end_time = int(time.time() * 1000)
+        loaded = await connector.backfill_series("BTCUSDT", "1m", end_time - days * 86_400_000, end_time)
+        await connector.stop()
+        print(f"✅ Backfilled {loaded} 1m candles")
+        
+        result = backtester.run_buffer("BTCUSDT", data_store.get_candle_buffer("BTCUSDT", "1m"), "Scalp")
+        print(f"✅ {result.trades} trades, win rate {result.win_rate:.0%}, PnL {result.total_pnl:.2f}, "
+              f"max drawdown {result.max_drawdown_pct:.1f}% ({result.seconds:.2f}s)")
+        
+        assert result.trades == len(result.trade_log) and result.wins <= result.trades
+        assert (result.trade_log['exit_index'] >= result.trade_log['entry_index']).all()
+        print("✅ Backtester test completed!")
+        
+    except Exception as e:
+        print(f"❌ Backtester test failed: {e!r}")
+
 async def main():
     """Hàm main để chạy tất cả tests"""
     print("🚀 Starting Bot Trading AI Demo\n")
@@ -190,11 +332,26 @@ async def main():
     # Setup logger
     logger = setup_logger()
     
+    # --mock: chạy với server giả lập thay vì fapi.binance.com
+    mock_server = None
+    base_url = "https://fapi.binance.com"
+    if "--mock" in sys.argv:
+        from utils.binance_mock_server import MockBinanceServer
+        mock_server = MockBinanceServer()
+        base_url = await mock_server.start()
+        print(f"🧪 Using mock Binance server at {base_url}\n")
+    
     # Chạy các tests
     test_config_manager()
     test_data_store()
-    await test_binance_connection()
-    await test_full_workflow()
+    streaming_ok = test_streaming_indicators()
+    await test_binance_connection(base_url)
+    await test_full_workflow(base_url)
+    await test_market_scanner(base_url)
+    await test_backtester(base_url)
+    
+    if mock_server:
+        await mock_server.stop()
     
     print("\n🎉 Demo completed!")
     print("\n📝 Next steps:")
@@ -202,6 +359,10 @@ async def main():
     print("2. Configure your trading settings")
     print("3. Start the bot and monitor suggestions")
     print("\n⚠️ Remember: This bot only provides suggestions, not automatic trading!")
+    
+    # Kiểm tra tương đương streaming/batch là điều kiện bắt buộc: thoát với mã lỗi nếu lệch
+    if not streaming_ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
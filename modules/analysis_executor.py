@@ -0,0 +1,183 @@
+import math
+import os
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import logging
+
+from .candle_store import CANDLE_FIELDS, ms_to_datetime_index
+from .data_models import DataStore, TechnicalIndicators
+from .indicator_cache import IndicatorCache
+from .indicator_kernels import MIN_CANDLES
+from .indicator_registry import IndicatorGraph
+from .shared_store import SharedCandleReader, SharedCandleWriter
+from .technical_analysis import TechnicalAnalyzer
+
+# Số lần tính lại trên view shared memory khi series bị ghi trong lúc tính, sau đó đọc bản copy
+_VIEW_RETRIES = 3
+
+# Trạng thái của tiến trình worker (tạo trong _init_worker)
+_reader: Optional[SharedCandleReader] = None
+_graphs: Dict[tuple, IndicatorGraph] = {}
+
+def _init_worker(prefix: str):
+    global _reader
+    _reader = SharedCandleReader(prefix)
+
+def _latest(graph: IndicatorGraph, symbol: str, timeframe: str,
+            timestamps: np.ndarray, values: np.ndarray) -> TechnicalIndicators:
+    """TechnicalIndicators tại nến cuối (giống TechnicalAnalyzer._calculate_with_kernels)"""
+    columns = {name: values[row] for row, name in enumerate(CANDLE_FIELDS)}
+    columns['timestamp'] = timestamps
+    latest = {}
+    for field, series in graph.evaluate(columns).items():
+        value = float(series[-1])
+        latest[field] = None if np.isnan(value) else value
+    return TechnicalIndicators(
+        symbol=symbol,
+        timeframe=timeframe,
+        timestamp=ms_to_datetime_index(timestamps[-1:])[0],
+        **latest
+    )
+
+def _analyze_series(graph: IndicatorGraph, symbol: str, timeframe: str) -> Optional[TechnicalIndicators]:
+    """Tính trên view shared memory (không copy); nếu series bị ghi trong lúc tính thì tính lại"""
+    for _ in range(_VIEW_RETRIES):
+        seq, timestamps, values = _reader.read_view(symbol, timeframe)
+        if len(timestamps) < MIN_CANDLES:
+            return None
+        indicators = _latest(graph, symbol, timeframe, timestamps, values)
+        if _reader.is_stable(symbol, timeframe, seq):
+            return indicators
+    timestamps, values = _reader.read(symbol, timeframe)
+    if len(timestamps) < MIN_CANDLES:
+        return None
+    return _latest(graph, symbol, timeframe, timestamps, values)
+
+def _analyze_shard(keys: Sequence[Tuple[str, str]], indicators_config: Dict,
+                   indicator_names: Optional[Tuple[str, ...]]) -> Tuple[List[TechnicalIndicators], List[Tuple[str, str]]]:
+    """Hàm chạy trong worker: (chỉ báo đã tính, các series lỗi cần phân tích lại)"""
+    graph_key = (IndicatorCache.config_key(indicators_config), indicator_names)
+    graph = _graphs.get(graph_key)
+    if graph is None:
+        graph = _graphs[graph_key] = IndicatorGraph(indicators_config, indicator_names)
+
+    results, failed = [], []
+    for symbol, timeframe in keys:
+        try:
+            indicators = _analyze_series(graph, symbol, timeframe)
+            if indicators is not None:
+                results.append(indicators)
+        except Exception:
+            failed.append((symbol, timeframe))  # Series chưa được công bố hoặc đang resize
+    return results, failed
+
+class ProcessAnalysisExecutor:
+    """Phân tích các (symbol, timeframe) song song trên ProcessPoolExecutor
+
+    Worker đọc nến thẳng từ shared memory của SharedCandleWriter (seqlock, không pickle
+    DataFrame) và chỉ gửi về TechnicalIndicators. Kết quả được ghi vào DataStore trên
+    luồng gọi collect(), không chặn chờ worker. Mỗi lúc chỉ có một lượt phân tích: nếu
+    lượt trước chưa xong, submit() bỏ qua lượt mới (backpressure) và các series thay
+    đổi được dồn sang lượt sau.
+    """
+
+    def __init__(self, data_store: DataStore, technical_analyzer: TechnicalAnalyzer,
+                 shared_writer: SharedCandleWriter, max_workers: Optional[int] = None,
+                 shards_per_worker: int = 4):
+        self.data_store = data_store
+        self.technical_analyzer = technical_analyzer
+        self.shared_writer = shared_writer
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._futures: List[Future] = []
+        self._started_at = 0.0
+        self._analyzed: Set[Tuple[str, str]] = set()
+
+        # Thống kê
+        self.passes = 0
+        self.overruns = 0  # Số lượt bị bỏ qua do lượt trước chưa xong
+        self.last_pass_seconds = 0.0
+
+        self.logger = logging.getLogger(__name__)
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: fork một tiến trình đang có thread (Streamlit, event loop) không an toàn
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.shared_writer.prefix,)
+            )
+        return self._pool
+
+    def busy(self) -> bool:
+        """Lượt phân tích trước còn đang chạy"""
+        return any(not future.done() for future in self._futures)
+
+    def submit(self, symbols: List[str], timeframes: List[str], indicators_config: Dict) -> bool:
+        """Bắt đầu một lượt cho các series cần phân tích lại; False nếu lượt trước chưa xong hoặc không có gì mới"""
+        if self.busy():
+            self.overruns += 1
+            return False
+
+        pending, _ = self.technical_analyzer.take_pending(symbols, timeframes, indicators_config)
+        if not pending:
+            return False
+
+        pool = self._ensure_pool()
+        shard_count = min(len(pending), self.max_workers * self.shards_per_worker)
+        size = math.ceil(len(pending) / shard_count)
+        names = self.technical_analyzer.indicator_names
+        self._started_at = time.perf_counter()
+        self._futures = [
+            pool.submit(_analyze_shard, pending[start:start + size], dict(indicators_config), names)
+            for start in range(0, len(pending), size)
+        ]
+        self.passes += 1
+        return True
+
+    def collect(self) -> Set[Tuple[str, str]]:
+        """Ghi kết quả của các shard đã xong vào DataStore (không chờ)
+
+        Trả về các (symbol, timeframe) được phân tích trong lượt vừa hoàn tất, rỗng
+        nếu lượt đang chạy dở.
+        """
+        done = [future for future in self._futures if future.done()]
+        for future in done:
+            self._futures.remove(future)
+            try:
+                results, failed = future.result()
+            except Exception as e:
+                self.logger.error(f"Lỗi worker phân tích: {e}")
+                continue
+            for indicators in results:
+                self.data_store.add_indicators(indicators)
+                self._analyzed.add((indicators.symbol, indicators.timeframe))
+            if failed:
+                self.technical_analyzer.mark_dirty(failed)
+
+        if self._futures or not done:
+            return set()
+        self.last_pass_seconds = time.perf_counter() - self._started_at
+        analyzed, self._analyzed = self._analyzed, set()
+        return analyzed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Tuple[str, str]]:
+        """Chờ lượt hiện tại xong rồi collect()"""
+        if self._futures:
+            wait_futures(self._futures, timeout=timeout)
+        return self.collect()
+
+    def shutdown(self):
+        """Dừng các worker, bỏ các shard chưa chạy"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._futures = []
+        self._analyzed.clear()
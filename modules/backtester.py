@@ -0,0 +1,344 @@
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .indicator_kernels import MIN_CANDLES
+from .candle_store import CANDLE_FIELDS, CandleBuffer, bucket_start, interval_to_ms, ms_to_datetime_index
+from .signal_matrix import SIGNAL_FIELDS, SignalMatrix, classify
+from .trading_strategy import (MIN_CONFIDENCE, SCALP_MAX_LEVERAGE, SCALP_STOP_LOSS_PCT, SCALP_TAKE_PROFIT_PCT,
+                               SWING_MAX_LEVERAGE, SWING_STOP_LOSS_PCT, SWING_TAKE_PROFIT_PCT, TradingStrategy)
+from . import indicator_kernels as kernels
+from config.config import ConfigManager
+
+# Phí giao dịch mỗi chiều (taker USDT-M)
+DEFAULT_FEE_RATE = 0.0005
+
+# Số nến nhỏ quét tìm SL/TP trong lượt đầu, nhân đôi sau mỗi lượt chưa chạm
+_EXIT_SCAN_CHUNK = 256
+
+# Số hàng mỗi lượt khi tính độ lệch trong cửa sổ (giới hạn bộ nhớ tạm)
+_MOMENT_ROWS = 65536
+
+def _window_sum(values: np.ndarray, width: int) -> np.ndarray:
+    """out[k] = tổng values[k-width+1..k] (NaN khi chưa đủ width phần tử)
+
+    Cộng trực tiếp trên từng cửa sổ thay vì hiệu hai cumsum nên cửa sổ toàn số 0 cho
+    đúng 0 và sai số không tích lũy theo độ dài lịch sử.
+    """
+    out = np.full(len(values), np.nan)
+    if width == 0:
+        out[:] = 0.0
+    elif len(values) >= width:
+        out[width - 1:] = np.lib.stride_tricks.sliding_window_view(values, width).sum(axis=1)
+    return out
+
+def _window_moments(values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(Σ(x_j - x_k), Σ(x_j - x_k)²) trên cửa sổ width phần tử kết thúc tại k, lấy x_k làm gốc"""
+    first = np.full(len(values), np.nan)
+    second = np.full(len(values), np.nan)
+    if width == 0:
+        first[:] = second[:] = 0.0
+        return first, second
+    if len(values) < width:
+        return first, second
+    windows = np.lib.stride_tricks.sliding_window_view(values, width)
+    for start in range(0, len(windows), _MOMENT_ROWS):
+        block = windows[start:start + _MOMENT_ROWS]
+        deviation = block - block[:, -1:]
+        rows = slice(width - 1 + start, width - 1 + start + len(block))
+        first[rows] = deviation.sum(axis=1)
+        second[rows] = np.square(deviation).sum(axis=1)
+    return first, second
+
+def _previous(values: np.ndarray, position: np.ndarray, fill: float = np.nan) -> np.ndarray:
+    """values[position - 1] cho mỗi phần tử, fill khi position = 0"""
+    out = values[np.maximum(position - 1, 0)]
+    return np.where(position > 0, out, fill)
+
+def forming_indicators(timestamps: np.ndarray, close: np.ndarray, timeframe: str,
+                       indicators_config: Dict) -> np.ndarray:
+    """Chỉ báo của timeframe tại từng nến nhỏ, như bot thấy lúc đó: các nến timeframe đã
+    đóng cộng nến đang hình thành với giá đóng là giá hiện tại
+
+    Trả về (len(SIGNAL_FIELDS), n). Mỗi giá trị chỉ dùng dữ liệu đến nến nhỏ hiện tại
+    (không nhìn trước); NaN khi series chưa đủ MIN_CANDLES nến hoặc chưa đủ chu kỳ.
+    """
+    rsi_period = indicators_config.get('rsi_period', 14)
+    ma_fast = indicators_config.get('ma_fast', 10)
+    ma_slow = indicators_config.get('ma_slow', 20)
+    macd_fast = indicators_config.get('macd_fast', 12)
+    macd_slow = indicators_config.get('macd_slow', 26)
+    macd_signal = indicators_config.get('macd_signal', 9)
+    bb_period = indicators_config.get('bb_period', 20)
+    bb_std = indicators_config.get('bb_std', 2)
+
+    # Nến timeframe chứa mỗi nến nhỏ: position = số nến đã đóng trước nó
+    buckets = bucket_start(timestamps, timeframe)
+    starts = np.empty(len(buckets), dtype=bool)
+    starts[:1] = True
+    np.not_equal(buckets[1:], buckets[:-1], out=starts[1:])
+    position = np.cumsum(starts) - 1
+    count = position + 1
+    ends = np.append(starts[1:], True)
+    closed = close[ends]  # Giá đóng của từng nến timeframe (chỉ được đọc khi đã đóng)
+
+    def rolling_mean(period: int) -> np.ndarray:
+        sums = _previous(_window_sum(closed, period - 1), position, 0.0)
+        return np.where(count >= period, (sums + close) / period, np.nan)
+
+    # Bollinger: độ lệch lấy giá đóng của nến trước làm gốc để tránh triệt tiêu số lớn
+    reference = _previous(closed, position, 0.0)
+    first, second = (_previous(moment, position, 0.0) for moment in _window_moments(closed, bb_period - 1))
+    offset = np.where(position > 0, close - reference, 0.0)
+    first, second = first + offset, second + offset * offset
+    variance = np.maximum(second - first * first / bb_period, 0.0) / max(bb_period - 1, 1)
+    bb_middle = rolling_mean(bb_period)
+    band = bb_std * np.where(count >= bb_period, np.sqrt(variance), np.nan)
+
+    # RSI: tổng tăng/giảm của rsi_period biến động gần nhất, biến động đầu tiên tính là 0
+    deltas = np.diff(closed, prepend=closed[:1])
+    partial = np.where(position > 0, close - reference, 0.0)
+    gains = _previous(_window_sum(np.maximum(deltas, 0.0), rsi_period - 1), position, 0.0) + np.maximum(partial, 0.0)
+    losses = _previous(_window_sum(np.maximum(-deltas, 0.0), rsi_period - 1), position, 0.0) + np.maximum(-partial, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gains / losses)
+    rsi = np.where(count >= rsi_period, rsi, np.nan)
+
+    # EMA adjust=True: tử số của các nến đã đóng nối thêm giá hiện tại
+    def forming_ema(series: np.ndarray, current: np.ndarray, span: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(EMA tại từng nến nhỏ, EMA của các nến đã đóng)"""
+        decay = 1 - 2 / (span + 1)
+        numerator = kernels.decayed_sum(series, decay)
+        weights = (1 - decay ** np.arange(1, len(series) + 1)) / (1 - decay)
+        forming = (current + decay * _previous(numerator, position, 0.0)) / ((1 - decay ** count) / (1 - decay))
+        return forming, numerator / weights
+
+    ema_fast, closed_fast = forming_ema(closed, close, macd_fast)
+    ema_slow, closed_slow = forming_ema(closed, close, macd_slow)
+    macd = ema_fast - ema_slow
+    signal, _ = forming_ema(closed_fast - closed_slow, macd, macd_signal)
+
+    values = np.vstack([
+        rolling_mean(ma_fast),
+        rolling_mean(ma_slow),
+        rsi,
+        macd,
+        signal,
+        macd - signal,
+        bb_middle + band,
+        bb_middle,
+        bb_middle - band,
+    ])
+    values[:, count < MIN_CANDLES] = np.nan
+    return values
+
+@dataclass
+class BacktestResult:
+    """Kết quả backtest một symbol"""
+    symbol: str
+    mode: str
+    start: Optional[pd.Timestamp]
+    end: Optional[pd.Timestamp]
+    candles: int
+    signals: int
+    trades: int
+    wins: int
+    win_rate: float
+    total_pnl: float
+    return_pct: float
+    max_drawdown_pct: float
+    profit_factor: float
+    final_equity: float
+    seconds: float
+    trade_log: pd.DataFrame = field(repr=False, default_factory=pd.DataFrame)
+
+    def summary(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'mode': self.mode,
+            'trades': self.trades,
+            'win_rate': self.win_rate,
+            'total_pnl': self.total_pnl,
+            'return_pct': self.return_pct,
+            'max_drawdown_pct': self.max_drawdown_pct,
+            'profit_factor': self.profit_factor,
+        }
+
+class Backtester:
+    """Chạy lại luật Scalp/Swing của TradingStrategy trên lịch sử nến nhỏ (mặc định 1m)
+
+    Chỉ báo của mọi timeframe của chế độ được tính cho toàn bộ lịch sử trong một lượt
+    (forming_indicators), phân loại bằng signal_matrix.classify và chấm điểm bằng chính
+    scalp_decisions/swing_decisions của chiến lược. Vào lệnh tại giá đóng của nến nhỏ có
+    tín hiệu, mỗi lúc một vị thế; SL/TP theo hằng số của trading_strategy, thoát lệnh
+    xét high/low từng nến nhỏ.
+    """
+
+    def __init__(self, config_manager: ConfigManager, trading_strategy: TradingStrategy):
+        self.config_manager = config_manager
+        self.trading_strategy = trading_strategy
+        self.logger = logging.getLogger(__name__)
+
+    def signals(self, timestamps: np.ndarray, values: np.ndarray,
+                trading_mode: str) -> Tuple[np.ndarray, np.ndarray, SignalMatrix]:
+        """(hướng 1/-1/0, độ tin cậy, ma trận tín hiệu) tại mỗi nến nhỏ"""
+        timeframes = self.config_manager.get_timeframes_for_mode(trading_mode)
+        indicators_config = self.config_manager.get_indicators_config(trading_mode)
+        step = int(np.min(np.diff(timestamps))) if len(timestamps) > 1 else 0
+        too_small = [tf for tf in timeframes if interval_to_ms(tf) < step]
+        if too_small:
+            raise ValueError(f"Nến đầu vào lớn hơn timeframe {', '.join(too_small)}")
+
+        close = values[CANDLE_FIELDS.index('close')]
+        indicators = np.empty((len(SIGNAL_FIELDS), len(close), len(timeframes)))
+        for column, timeframe in enumerate(timeframes):
+            indicators[:, :, column] = forming_indicators(timestamps, close, timeframe, indicators_config)
+
+        matrix = SignalMatrix(range(len(close)), timeframes, classify(indicators, close, trading_mode), trading_mode)
+        is_scalp = trading_mode.lower() == "scalp"
+        strategy = self.trading_strategy
+        direction, confidence = strategy.scalp_decisions(matrix) if is_scalp else strategy.swing_decisions(matrix)
+        return direction, confidence, matrix
+
+    @staticmethod
+    def _find_exit(values: np.ndarray, start: int, side: int, stop_loss: float,
+                   take_profit: float) -> Tuple[int, float, str]:
+        """(chỉ số nến thoát, giá thoát, lý do) của lệnh vào tại nến start - 1
+
+        Nến chạm cả SL và TP: giá đi O→H→L→C nếu open gần high hơn, ngược lại O→L→H→C.
+        Mở cửa vượt qua mức thì khớp tại giá mở.
+        """
+        open_, high, low, close = values[0], values[1], values[2], values[3]
+        length = len(close)
+        chunk = _EXIT_SCAN_CHUNK
+        while start < length:
+            stop = min(start + chunk, length)
+            if side > 0:
+                hit_stop, hit_target = low[start:stop] <= stop_loss, high[start:stop] >= take_profit
+            else:
+                hit_stop, hit_target = high[start:stop] >= stop_loss, low[start:stop] <= take_profit
+            hit = hit_stop | hit_target
+            if hit.any():
+                offset = int(np.argmax(hit))
+                index = start + offset
+                price = open_[index]
+                if (price - stop_loss) * side <= 0:
+                    return index, price, "SL"
+                if (price - take_profit) * side >= 0:
+                    return index, price, "TP"
+                if hit_stop[offset] and hit_target[offset]:
+                    high_first = high[index] - price < price - low[index]
+                    stop_first = high_first if side < 0 else not high_first
+                    return (index, stop_loss, "SL") if stop_first else (index, take_profit, "TP")
+                return (index, stop_loss, "SL") if hit_stop[offset] else (index, take_profit, "TP")
+            start = stop
+            chunk *= 2
+        return length - 1, close[-1], "END"
+
+    def run(self, timestamps: np.ndarray, values: np.ndarray, trading_mode: str = "Scalp",
+            symbol: str = "", capital: Optional[float] = None,
+            fee_rate: float = DEFAULT_FEE_RATE) -> BacktestResult:
+        """Backtest trên (timestamps int64, values (5, n)) theo thứ tự CANDLE_FIELDS
+
+        Vốn cộng dồn: kích thước lệnh theo calculate_position_size trên vốn hiện tại,
+        giá trị danh nghĩa không vượt quá đòn bẩy tối đa của chế độ.
+        """
+        started = time.perf_counter()
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        is_scalp = trading_mode.lower() == "scalp"
+        strategy = self.trading_strategy
+        risk_config = self.config_manager.get_risk_management_config()
+        risk_per_trade = risk_config.get('risk_per_trade', 0.02)
+        if is_scalp:
+            sl_pct, tp_pct = SCALP_STOP_LOSS_PCT, SCALP_TAKE_PROFIT_PCT
+            max_leverage = min(risk_config.get('max_leverage', 20), SCALP_MAX_LEVERAGE)
+            stop_loss_of, take_profit_of = strategy.calculate_stop_loss_scalp, strategy.calculate_take_profit_scalp
+        else:
+            sl_pct, tp_pct = SWING_STOP_LOSS_PCT, SWING_TAKE_PROFIT_PCT
+            max_leverage = min(risk_config.get('max_leverage', 20), SWING_MAX_LEVERAGE)
+            stop_loss_of, take_profit_of = strategy.calculate_stop_loss_swing, strategy.calculate_take_profit_swing
+        if capital is None:
+            capital = strategy.suggestion_config()['available_capital']
+
+        if len(timestamps):
+            direction, confidence, _ = self.signals(timestamps, values, trading_mode)
+            entries = np.flatnonzero((direction != 0) & (confidence > MIN_CONFIDENCE))
+        else:
+            direction, entries = np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64)
+        close = values[CANDLE_FIELDS.index('close')] if len(timestamps) else np.empty(0)
+
+        # Mỗi lúc một vị thế: lệnh kế tiếp từ tín hiệu tại hoặc sau nến thoát lệnh
+        equity = float(capital)
+        rows: List[Tuple] = []
+        next_entry = 0
+        while True:
+            found = int(np.searchsorted(entries, next_entry))
+            if found >= len(entries):
+                break
+            entry_index = int(entries[found])
+            side = int(direction[entry_index])
+            label = "LONG" if side > 0 else "SHORT"
+            entry_price = float(close[entry_index])
+            stop_loss = stop_loss_of(entry_price, label, sl_pct)
+            take_profit = take_profit_of(entry_price, label, tp_pct)
+            size = strategy.calculate_position_size(equity, risk_per_trade, entry_price, stop_loss)
+            size = min(size, equity * max_leverage / entry_price)
+            if size <= 0:
+                break
+
+            exit_index, exit_price, reason = self._find_exit(values, entry_index + 1, side, stop_loss, take_profit)
+            exit_price = float(exit_price)
+            pnl = size * (exit_price - entry_price) * side - fee_rate * size * (entry_price + exit_price)
+            equity += pnl
+            rows.append((entry_index, exit_index, label, entry_price, exit_price, stop_loss, take_profit,
+                         size, reason, float(confidence[entry_index]), pnl, equity))
+            if reason == "END":
+                break
+            next_entry = exit_index
+
+        trade_log = pd.DataFrame(rows, columns=[
+            'entry_index', 'exit_index', 'direction', 'entry_price', 'exit_price', 'stop_loss', 'take_profit',
+            'size', 'exit_reason', 'confidence', 'pnl', 'equity'
+        ])
+        if rows:
+            trade_log.insert(0, 'entry_time', ms_to_datetime_index(timestamps[trade_log['entry_index'].to_numpy()]))
+            trade_log.insert(1, 'exit_time', ms_to_datetime_index(timestamps[trade_log['exit_index'].to_numpy()]))
+
+        pnl = trade_log['pnl'].to_numpy(dtype=np.float64)
+        curve = np.concatenate([[float(capital)], trade_log['equity'].to_numpy(dtype=np.float64)])
+        peaks = np.maximum.accumulate(curve)
+        gross_profit, gross_loss = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+        wins = int(np.count_nonzero(pnl > 0))
+        dates = ms_to_datetime_index(timestamps[[0, -1]]) if len(timestamps) else [None, None]
+
+        result = BacktestResult(
+            symbol=symbol,
+            mode=trading_mode,
+            start=dates[0],
+            end=dates[1],
+            candles=len(timestamps),
+            signals=len(entries),
+            trades=len(rows),
+            wins=wins,
+            win_rate=wins / len(rows) if rows else 0.0,
+            total_pnl=float(pnl.sum()),
+            return_pct=(equity / capital - 1) * 100,
+            max_drawdown_pct=float(np.max((peaks - curve) / peaks) * 100),
+            profit_factor=float(gross_profit / gross_loss) if gross_loss > 0 else float('inf') if gross_profit > 0 else 0.0,
+            final_equity=equity,
+            seconds=time.perf_counter() - started,
+            trade_log=trade_log
+        )
+        self.logger.info(f"Backtest {symbol} {trading_mode}: {result.trades} lệnh, win rate {result.win_rate:.0%}, "
+                         f"PnL {result.total_pnl:.2f} ({result.seconds:.2f}s)")
+        return result
+
+    def run_buffer(self, symbol: str, buffer: CandleBuffer, trading_mode: str = "Scalp",
+                   capital: Optional[float] = None, fee_rate: float = DEFAULT_FEE_RATE) -> BacktestResult:
+        """Backtest trên toàn bộ nến của một CandleBuffer (vd. 1m đã backfill)"""
+        timestamps, values = buffer.window()
+        return self.run(timestamps, values, trading_mode, symbol, capital, fee_rate)
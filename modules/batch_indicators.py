@@ -0,0 +1,100 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+from .data_models import DataStore
+from .indicator_kernels import ema_matrix
+
+def stack_closes(data_store: DataStore, symbols: Sequence[str], timeframe: str,
+                 length: int = None) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Xếp giá đóng của nhiều symbol thành ma trận (symbols × thời gian), căn phải theo nến mới nhất
+
+    Series ngắn hơn được đệm NaN ở đầu. Trả về (symbols có dữ liệu, closes (S, T),
+    số nến của mỗi symbol, thời gian mở của nến mới nhất).
+    """
+    buffers = []
+    for symbol in symbols:
+        buffer = data_store.get_candle_buffer(symbol, timeframe)
+        if buffer is not None and len(buffer):
+            buffers.append((symbol, buffer))
+
+    counts = np.array([len(buffer) for _, buffer in buffers], dtype=np.int64)
+    if length is not None:
+        counts = np.minimum(counts, length)
+    width = int(counts.max()) if len(counts) else 0
+    closes = np.full((len(buffers), width), np.nan)
+    last_times = np.empty(len(buffers), dtype=np.int64)
+    for row, ((_, buffer), count) in enumerate(zip(buffers, counts.tolist())):
+        closes[row, width - count:] = buffer.column('close', count)
+        last_times[row] = buffer.last_timestamp()
+    return [symbol for symbol, _ in buffers], closes, counts, last_times
+
+def _last_window(closes: np.ndarray, period: int) -> np.ndarray:
+    """period cột cuối (đệm NaN bên trái nếu ma trận hẹp hơn)"""
+    if closes.shape[1] >= period:
+        return closes[:, -period:]
+    return np.hstack([np.full((closes.shape[0], period - closes.shape[1]), np.nan), closes])
+
+def latest_sma(closes: np.ndarray, counts: np.ndarray, period: int) -> np.ndarray:
+    """SMA(period) tại nến cuối của mỗi hàng (NaN nếu chưa đủ nến)"""
+    result = _last_window(closes, period).mean(axis=1)
+    result[counts < period] = np.nan
+    return result
+
+def latest_rsi(closes: np.ndarray, counts: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI theo trung bình cộng gain/loss tại nến cuối (delta của nến đầu tiên tính là 0)"""
+    delta = np.diff(_last_window(closes, period + 1), axis=1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gain.mean(axis=1) / loss.mean(axis=1))
+    rsi[counts < period] = np.nan
+    return rsi
+
+def latest_bollinger(closes: np.ndarray, counts: np.ndarray, period: int = 20,
+                     std: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger Bands (độ lệch chuẩn mẫu, ddof=1) tại nến cuối"""
+    window = _last_window(closes, period)
+    middle = window.mean(axis=1)
+    band = window.std(axis=1, ddof=1) * std
+    middle[counts < period] = np.nan
+    return middle + band, middle, middle - band
+
+def latest_macd(closes: np.ndarray, fast: int = 12, slow: int = 26,
+                signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD, signal, histogram tại nến cuối của mỗi hàng"""
+    if closes.shape[1] == 0:
+        empty = np.full(closes.shape[0], np.nan)
+        return empty, empty.copy(), empty.copy()
+    macd = ema_matrix(closes, fast) - ema_matrix(closes, slow)
+    # Signal chỉ cần giá trị cuối: tổng có trọng số decay^k trên toàn bộ chuỗi MACD
+    valid = ~np.isnan(macd)
+    weights = (1 - 2 / (signal + 1)) ** np.arange(closes.shape[1] - 1, -1, -1, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        macd_signal = (np.where(valid, macd, 0.0) @ weights) / (valid @ weights)
+    macd = macd[:, -1]
+    return macd, macd_signal, macd - macd_signal
+
+def latest_indicators(closes: np.ndarray, counts: np.ndarray, indicators_config: Dict) -> Dict[str, np.ndarray]:
+    """Tất cả chỉ báo của TechnicalIndicators tại nến cuối của mỗi hàng trong một lượt vector hóa"""
+    macd, macd_signal, macd_histogram = latest_macd(
+        closes,
+        indicators_config.get('macd_fast', 12),
+        indicators_config.get('macd_slow', 26),
+        indicators_config.get('macd_signal', 9)
+    )
+    bb_upper, bb_middle, bb_lower = latest_bollinger(
+        closes, counts,
+        indicators_config.get('bb_period', 20),
+        indicators_config.get('bb_std', 2)
+    )
+    return {
+        'rsi': latest_rsi(closes, counts, indicators_config.get('rsi_period', 14)),
+        'ma_fast': latest_sma(closes, counts, indicators_config.get('ma_fast', 10)),
+        'ma_slow': latest_sma(closes, counts, indicators_config.get('ma_slow', 20)),
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_histogram': macd_histogram,
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+    }
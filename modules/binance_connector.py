@@ -1,28 +1,45 @@
 import asyncio
-import aiohttp
-import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import time
 import logging
+import numpy as np
 
 from .data_models import MarketData, DataStore
+from .candle_store import interval_to_ms
+from .binance_stream import BinanceKlineStream
+from .rate_limiter import WeightRateLimiter, ENDPOINT_WEIGHTS, BULK_ENDPOINT_WEIGHTS, klines_weight
+from .http_client import BinanceHttpClient, RequestMetrics
+from .fast_json import decode_klines
+from .scheduler import CandleCloseScheduler
 
 class BinanceConnector:
     """Kết nối và lấy dữ liệu từ Binance API"""
     
-    def __init__(self, data_store: DataStore):
+    def __init__(self, data_store: DataStore, base_url: str = "https://fapi.binance.com",
+                 stream_url: str = "wss://fstream.binance.com", http_config: Optional[Dict[str, Any]] = None):
         self.data_store = data_store
-        self.base_url = "https://fapi.binance.com"
+        self.base_url = base_url
+        self.stream_url = stream_url
         self.session = None
+        self.stream = None
+        self.scheduler = None
         self.is_running = False
+        self.rate_limiter = WeightRateLimiter()
+        
+        # Tầng HTTP dùng chung + thống kê latency/byte theo endpoint
+        self.http = BinanceHttpClient(base_url, self.rate_limiter, **(http_config or {}))
+        self.metrics = RequestMetrics()
+        self.http.add_request_hook(self.metrics.record)
+        self.backfill_cursors: Dict[tuple, int] = {}  # (symbol, timeframe) -> thời gian mở tiếp theo cần tải
         
         # Thiết lập logging
         self.logger = logging.getLogger(__name__)
         
     async def start(self):
         """Khởi động connector"""
-        self.session = aiohttp.ClientSession()
+        self.http.base_url = self.base_url
+        self.session = await self.http.start()
         self.is_running = True
         self.data_store.add_log("Đang kết nối đến Binance API...")
         
@@ -35,71 +52,92 @@ class BinanceConnector:
     async def stop(self):
         """Dừng connector"""
         self.is_running = False
-        if self.session:
-            await self.session.close()
+        await self.http.close()
+        self.session = None
             
     async def test_connection(self) -> bool:
         """Test kết nối API"""
-        try:
-            url = f"{self.base_url}/fapi/v1/ping"
-            async with self.session.get(url) as response:
-                return response.status == 200
-        except Exception as e:
-            self.logger.error(f"Lỗi test kết nối: {e}")
-            return False
+        path = "/fapi/v1/ping"
+        status, _ = await self.http.get_json(path, weight=ENDPOINT_WEIGHTS[path])
+        if status != 200:
+            self.logger.error(f"Lỗi test kết nối: {status}")
+        return status == 200
     
     async def get_current_price(self, symbol: str) -> Optional[float]:
         """Lấy giá hiện tại của symbol"""
+        path = "/fapi/v1/ticker/price"
+        status, data = await self.http.get_json(path, {"symbol": symbol}, ENDPOINT_WEIGHTS[path])
+        if data is None:
+            self.logger.error(f"Lỗi lấy giá {symbol}: {status}")
+            return None
         try:
-            url = f"{self.base_url}/fapi/v1/ticker/price"
-            params = {"symbol": symbol}
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return float(data["price"])
-                else:
-                    self.logger.error(f"Lỗi lấy giá {symbol}: {response.status}")
-                    return None
+            return float(data["price"])
         except Exception as e:
             self.logger.error(f"Lỗi lấy giá {symbol}: {e}")
             return None
     
     async def get_24h_ticker(self, symbol: str) -> Optional[Dict]:
         """Lấy thông tin ticker 24h"""
-        try:
-            url = f"{self.base_url}/fapi/v1/ticker/24hr"
-            params = {"symbol": symbol}
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    self.logger.error(f"Lỗi lấy ticker 24h {symbol}: {response.status}")
-                    return None
-        except Exception as e:
-            self.logger.error(f"Lỗi lấy ticker 24h {symbol}: {e}")
-            return None
+        path = "/fapi/v1/ticker/24hr"
+        status, data = await self.http.get_json(path, {"symbol": symbol}, ENDPOINT_WEIGHTS[path])
+        if data is None:
+            self.logger.error(f"Lỗi lấy ticker 24h {symbol}: {status}")
+        return data
     
-    async def get_klines(self, symbol: str, interval: str, limit: int = 500) -> Optional[List]:
-        """Lấy dữ liệu nến (klines)"""
-        try:
-            url = f"{self.base_url}/fapi/v1/klines"
-            params = {
-                "symbol": symbol,
-                "interval": interval,
-                "limit": limit
-            }
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    self.logger.error(f"Lỗi lấy klines {symbol} {interval}: {response.status}")
-                    return None
-        except Exception as e:
-            self.logger.error(f"Lỗi lấy klines {symbol} {interval}: {e}")
+    async def get_all_24h_tickers(self) -> Optional[List[Dict]]:
+        """Lấy ticker 24h của toàn bộ thị trường trong một request"""
+        path = "/fapi/v1/ticker/24hr"
+        status, data = await self.http.get_json(path, weight=BULK_ENDPOINT_WEIGHTS[path])
+        if data is None:
+            self.logger.error(f"Lỗi lấy ticker 24h toàn thị trường: {status}")
+        return data
+    
+    async def get_perpetual_symbols(self, quote_asset: str = "USDT") -> Optional[List[str]]:
+        """Toàn bộ hợp đồng perpetual đang giao dịch với quote_asset (từ exchangeInfo)"""
+        path = "/fapi/v1/exchangeInfo"
+        status, data = await self.http.get_json(path, weight=ENDPOINT_WEIGHTS[path])
+        if data is None:
+            self.logger.error(f"Lỗi lấy exchangeInfo: {status}")
             return None
+        return [
+            item["symbol"] for item in data.get("symbols", [])
+            if item.get("contractType") == "PERPETUAL" and item.get("status") == "TRADING"
+            and item.get("quoteAsset") == quote_asset
+        ]
+    
+    def _klines_params(self, symbol: str, interval: str, limit: int,
+                       start_time: Optional[int], end_time: Optional[int]) -> Dict[str, Any]:
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        return params
+    
+    async def get_klines(self, symbol: str, interval: str, limit: int = 500,
+                         start_time: Optional[int] = None, end_time: Optional[int] = None) -> Optional[List]:
+        """Lấy dữ liệu nến (klines), start_time/end_time tính bằng epoch ms"""
+        path = "/fapi/v1/klines"
+        params = self._klines_params(symbol, interval, limit, start_time, end_time)
+        status, data = await self.http.get_json(path, params, klines_weight(limit))
+        if data is None:
+            self.logger.error(f"Lỗi lấy klines {symbol} {interval}: {status}")
+        return data
+    
+    async def get_kline_columns(self, symbol: str, interval: str, limit: int = 500,
+                                start_time: Optional[int] = None,
+                                end_time: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Như get_klines nhưng giải mã thẳng thành (timestamps, values) dạng cột"""
+        path = "/fapi/v1/klines"
+        params = self._klines_params(symbol, interval, limit, start_time, end_time)
+        status, data = await self.http.get_json(path, params, klines_weight(limit), decoder=decode_klines)
+        if data is None:
+            self.logger.error(f"Lỗi lấy klines {symbol} {interval}: {status}")
+        return data
     
     def parse_klines_data(self, klines_data: List, symbol: str, timeframe: str) -> List[MarketData]:
         """Chuyển đổi dữ liệu klines thành MarketData"""
@@ -125,75 +163,305 @@ class BinanceConnector:
                 
         return market_data_list
     
-    async def fetch_historical_data(self, symbols: List[str], timeframes: List[str]):
-        """Lấy dữ liệu lịch sử cho tất cả symbols và timeframes"""
+    async def _fetch_history_series(self, symbol: str, timeframe: str, limit: int) -> bool:
+        """Tải dữ liệu lịch sử cho một (symbol, timeframe)"""
+        try:
+            columns = await self.get_kline_columns(symbol, timeframe, limit)
+            if columns is not None and len(columns[0]):
+                # Thêm cả khối vào data store
+                self.data_store.add_candles_block(symbol, timeframe, *columns)
+                
+                self.data_store.add_log(f"Đã tải {len(columns[0])} nến {symbol} {timeframe}")
+                return True
+            
+        except Exception as e:
+            self.logger.error(f"Lỗi tải dữ liệu {symbol} {timeframe}: {e}")
+        
+        self.data_store.add_log(f"Lỗi tải dữ liệu {symbol} {timeframe}")
+        return False
+    
+    async def fetch_historical_data(self, symbols: List[str], timeframes: List[str], limit: int = 200):
+        """Lấy dữ liệu lịch sử cho tất cả symbols và timeframes
+
+        Các series được tải đồng thời; rate limiter giới hạn số request song song
+        và tổng weight theo phút thay cho sleep cố định.
+        """
         self.data_store.add_log("Đang tải dữ liệu lịch sử...")
         
-        for symbol in symbols:
-            for timeframe in timeframes:
-                try:
-                    klines_data = await self.get_klines(symbol, timeframe, 200)
-                    if klines_data:
-                        market_data_list = self.parse_klines_data(klines_data, symbol, timeframe)
-                        
-                        # Thêm vào data store
-                        for market_data in market_data_list:
-                            self.data_store.add_market_data(market_data)
-                        
-                        self.data_store.add_log(f"Đã tải {len(market_data_list)} nến {symbol} {timeframe}")
-                    
-                    # Tránh rate limit
-                    await asyncio.sleep(0.1)
-                    
-                except Exception as e:
-                    self.logger.error(f"Lỗi tải dữ liệu {symbol} {timeframe}: {e}")
-                    self.data_store.add_log(f"Lỗi tải dữ liệu {symbol} {timeframe}")
+        tasks = [
+            self._fetch_history_series(symbol, timeframe, limit)
+            for symbol in symbols
+            for timeframe in timeframes
+        ]
+        results = await asyncio.gather(*tasks)
+        
+        self.data_store.add_log(f"Đã tải lịch sử {sum(results)}/{len(tasks)} series")
+    
+    async def backfill_series(self, symbol: str, timeframe: str, start_time: int, end_time: Optional[int] = None,
+                              page_size: int = 1500, max_inflight: int = 4) -> int:
+        """Tải lịch sử sâu theo trang startTime/endTime cho một (symbol, timeframe)
+
+        Các trang được gửi song song (tối đa max_inflight trang đang chờ) nhưng được
+        ghi vào DataStore theo thứ tự thời gian. Tiến độ lưu trong backfill_cursors
+        nên lần gọi sau sẽ tiếp tục từ trang chưa tải. Trả về số nến đã tải.
+        """
+        key = (symbol, timeframe)
+        interval = interval_to_ms(timeframe)
+        if end_time is None:
+            end_time = int(time.time() * 1000)
+        
+        # Tiếp tục từ lần tải trước (nếu có)
+        start_time = max(start_time, self.backfill_cursors.get(key, start_time))
+        start_time -= start_time % interval
+        page_span = page_size * interval
+        page_starts = list(range(start_time, end_time, page_span))
+        if not page_starts:
+            return 0
+        
+        self.data_store.ensure_capacity(timeframe, (end_time - start_time) // interval + 2)
+        
+        def request_page(page_start: int):
+            page_end = min(page_start + page_span, end_time)
+            # Trang ngắn dùng limit nhỏ hơn để tốn ít weight hơn
+            limit = min(page_size, (page_end - page_start) // interval + 1)
+            return asyncio.ensure_future(self.get_kline_columns(
+                symbol, timeframe, limit,
+                start_time=page_start,
+                end_time=page_end - 1
+            ))
+        
+        pending = [request_page(page_start) for page_start in page_starts[:max_inflight]]
+        next_page = len(pending)
+        loaded = 0
+        
+        try:
+            for page_start in page_starts:
+                columns = await pending.pop(0)
+                if next_page < len(page_starts):
+                    pending.append(request_page(page_starts[next_page]))
+                    next_page += 1
+                
+                if columns is None:
+                    self.data_store.add_log(f"Dừng tải lịch sử {symbol} {timeframe}, sẽ tiếp tục lần sau")
+                    break
+                
+                if len(columns[0]):
+                    self.data_store.add_candles_block(symbol, timeframe, *columns)
+                    loaded += len(columns[0])
+                
+                # Chỉ lưu tiến độ cho trang đã đóng hoàn toàn
+                page_end = min(page_start + page_span, end_time)
+                if page_end + interval <= end_time:
+                    self.backfill_cursors[key] = page_end
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        return loaded
+    
+    async def _load_series_history(self, symbol: str, timeframe: str, lookback_days: Optional[float],
+                                   now_ms: int) -> bool:
+        """Tải lịch sử cho một series
+
+        - Đã có dữ liệu (ví dụ nạp từ cache đĩa): chỉ tải các nến từ nến cuối đến hiện tại
+        - Có lookback: tải lịch sử sâu theo trang
+        - Còn lại: tải 200 nến gần nhất
+        """
+        try:
+            buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+            last_open_time = buffer.last_timestamp() if buffer is not None else None
+            
+            # Không tải xa hơn lookback (hoặc 200 nến nếu không cấu hình lookback)
+            if lookback_days:
+                start_time = now_ms - int(lookback_days * 86_400_000)
+            else:
+                start_time = now_ms - 200 * interval_to_ms(timeframe)
+            
+            if last_open_time is not None:
+                loaded = await self.backfill_series(symbol, timeframe, max(last_open_time, start_time), now_ms)
+                self.data_store.add_log(f"Đã bổ sung {loaded} nến {symbol} {timeframe} từ nến cuối trong cache")
+                return True
+            
+            if not lookback_days:
+                return await self._fetch_history_series(symbol, timeframe, 200)
+            
+            loaded = await self.backfill_series(symbol, timeframe, start_time, now_ms)
+            self.data_store.add_log(f"Đã tải {loaded} nến lịch sử {symbol} {timeframe}")
+            return loaded > 0
+            
+        except Exception as e:
+            self.logger.error(f"Lỗi tải lịch sử {symbol} {timeframe}: {e}")
+            return False
+    
+    async def fetch_deep_history(self, symbols: List[str], timeframes: List[str], lookback_days: Dict[str, float]):
+        """Tải lịch sử cho tất cả symbols và timeframes theo lookback cấu hình
+
+        Series đã có dữ liệu trong DataStore chỉ được tải phần còn thiếu.
+        """
+        self.data_store.add_log("Đang tải lịch sử sâu...")
+        now_ms = int(time.time() * 1000)
+        
+        results = await asyncio.gather(*(
+            self._load_series_history(symbol, timeframe, lookback_days.get(timeframe), now_ms)
+            for symbol in symbols
+            for timeframe in timeframes
+        ))
+        self.data_store.add_log(f"Đã tải lịch sử sâu {sum(results)}/{len(results)} series")
+    
+    async def load_initial_history(self, symbols: List[str], timeframes: List[str],
+                                   history_lookback: Optional[Dict[str, float]] = None):
+        """Tải dữ liệu lịch sử lần đầu: lịch sử sâu nếu có cấu hình lookback hoặc đã có dữ liệu cache"""
+        has_cached = any(
+            self.data_store.get_candle_buffer(symbol, timeframe) is not None
+            for symbol in symbols
+            for timeframe in timeframes
+        )
+        if history_lookback or has_cached:
+            await self.fetch_deep_history(symbols, timeframes, history_lookback or {})
+        else:
+            await self.fetch_historical_data(symbols, timeframes)
+    
+    def use_bulk_ticker(self, symbol_count: int) -> bool:
+        """Chọn gọi ticker một lần cho cả thị trường khi tốn ít weight hơn gọi từng symbol"""
+        path = "/fapi/v1/ticker/24hr"
+        return symbol_count * ENDPOINT_WEIGHTS[path] > BULK_ENDPOINT_WEIGHTS[path]
     
     async def update_current_prices(self, symbols: List[str]):
         """Cập nhật giá hiện tại cho tất cả symbols"""
-        for symbol in symbols:
+        if self.use_bulk_ticker(len(symbols)):
+            await self._update_prices_bulk(symbols)
+        else:
+            await self._update_prices_per_symbol(symbols)
+    
+    async def _update_prices_bulk(self, symbols: List[str]):
+        """Một request /ticker/24hr cho toàn thị trường, giải mã một lượt và cập nhật theo lô"""
+        tickers = await self.get_all_24h_tickers()
+        if not tickers:
+            return
+        
+        wanted = set(symbols)
+        prices = {}
+        for ticker_data in tickers:
+            symbol = ticker_data.get("symbol")
+            if symbol in wanted:
+                try:
+                    prices[symbol] = (float(ticker_data["lastPrice"]), float(ticker_data["priceChangePercent"]))
+                except (KeyError, TypeError, ValueError) as e:
+                    self.logger.error(f"Lỗi cập nhật giá {symbol}: {e}")
+        
+        self.data_store.update_prices_batch(prices)
+    
+    async def _update_prices_per_symbol(self, symbols: List[str]):
+        """Gọi /ticker/24hr cho từng symbol (song song, giới hạn bởi rate limiter)"""
+        async def fetch(symbol: str):
             try:
                 # Lấy ticker 24h để có thêm thông tin change
                 ticker_data = await self.get_24h_ticker(symbol)
                 if ticker_data:
-                    price = float(ticker_data["lastPrice"])
-                    change_24h = float(ticker_data["priceChangePercent"])
-                    self.data_store.update_price(symbol, price, change_24h)
-                
-                # Tránh rate limit
-                await asyncio.sleep(0.05)
-                
+                    return symbol, (float(ticker_data["lastPrice"]), float(ticker_data["priceChangePercent"]))
             except Exception as e:
                 self.logger.error(f"Lỗi cập nhật giá {symbol}: {e}")
+            return symbol, None
+        
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        self.data_store.update_prices_batch({symbol: price for symbol, price in results if price})
     
     async def fetch_latest_klines(self, symbols: List[str], timeframes: List[str]):
         """Lấy dữ liệu nến mới nhất"""
-        for symbol in symbols:
-            for timeframe in timeframes:
-                try:
-                    # Chỉ lấy 2 nến mới nhất để cập nhật
-                    klines_data = await self.get_klines(symbol, timeframe, 2)
-                    if klines_data:
-                        market_data_list = self.parse_klines_data(klines_data, symbol, timeframe)
-                        
-                        # Chỉ thêm nến mới nhất (nến cuối có thể chưa đóng)
-                        if market_data_list:
-                            latest_data = market_data_list[-1]
-                            self.data_store.add_market_data(latest_data)
-                    
-                    # Tránh rate limit
-                    await asyncio.sleep(0.05)
+        await self.refresh_klines([(symbol, timeframe) for symbol in symbols for timeframe in timeframes])
+    
+    async def refresh_klines(self, keys: List[tuple]):
+        """Lấy 2 nến mới nhất cho các (symbol, timeframe), song song qua rate limiter"""
+        async def refresh(symbol: str, timeframe: str):
+            try:
+                columns = await self.get_kline_columns(symbol, timeframe, 2)
+                if columns is not None and len(columns[0]):
+                    # Nến áp chót vừa đóng (ghi lại giá trị cuối cùng),
+                    # nến cuối đang hình thành (cập nhật tại chỗ)
+                    self.data_store.add_candles_block(symbol, timeframe, *columns)
+            except Exception as e:
+                self.logger.error(f"Lỗi cập nhật klines {symbol} {timeframe}: {e}")
+        
+        await asyncio.gather(*(refresh(symbol, timeframe) for symbol, timeframe in keys))
+    
+    async def resync_klines(self, keys: List[tuple]):
+        """Lấy lại các nến bị thiếu kể từ nến cuối trong DataStore (sau khi mất kết nối)
+
+        Khoảng trống dài hơn một trang (1500 nến) được tải theo trang qua backfill_series.
+        """
+        async def resync(symbol: str, timeframe: str):
+            try:
+                buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+                last_open_time = buffer.last_timestamp() if buffer is not None else None
+                if last_open_time is None:
+                    columns = await self.get_kline_columns(symbol, timeframe, 200)
+                    if columns is not None and len(columns[0]):
+                        self.data_store.add_candles_block(symbol, timeframe, *columns)
+                    return
+                
+                now_ms = int(time.time() * 1000)
+                missing = (now_ms - last_open_time) // interval_to_ms(timeframe)
+                loaded = await self.backfill_series(symbol, timeframe, last_open_time, now_ms + interval_to_ms(timeframe))
+                if missing > 1500:
+                    self.data_store.add_log(f"Đã lấp khoảng trống {missing} nến {symbol} {timeframe} ({loaded} nến)")
                     
-                except Exception as e:
-                    self.logger.error(f"Lỗi cập nhật klines {symbol} {timeframe}: {e}")
+            except Exception as e:
+                self.logger.error(f"Lỗi đồng bộ lại klines {symbol} {timeframe}: {e}")
+        
+        await asyncio.gather(*(resync(symbol, timeframe) for symbol, timeframe in keys))
     
-    async def run_data_fetcher(self, symbols: List[str], timeframes: List[str], update_interval: int = 30):
-        """Chạy vòng lặp cập nhật dữ liệu"""
+    async def run_stream_fetcher(self, symbols: List[str], timeframes: List[str], ticker_interval: int = 60,
+                                 history_lookback: Optional[Dict[str, float]] = None,
+                                 live_timeframes: Optional[List[str]] = None):
+        """Chạy chế độ realtime qua WebSocket (kline + markPrice)
+        
+        live_timeframes: timeframe cần nhận realtime từ sàn (mặc định tất cả), các timeframe
+        còn lại chỉ tải lịch sử và được cập nhật nơi khác (ví dụ CandleResampler).
+        """
         # Tải dữ liệu lịch sử lần đầu
-        await self.fetch_historical_data(symbols, timeframes)
+        await self.load_initial_history(symbols, timeframes, history_lookback)
+        await self.update_current_prices(symbols)
+        
+        self.stream = BinanceKlineStream(self, self.stream_url)
+        stream_task = asyncio.ensure_future(self.stream.run(symbols, live_timeframes or timeframes))
         
+        try:
+            while self.is_running and not stream_task.done():
+                # Giá realtime đến từ markPrice, % thay đổi 24h chỉ cần làm mới thưa hơn qua REST
+                await asyncio.sleep(ticker_interval)
+                if self.is_running:
+                    await self.update_current_prices(symbols)
+        finally:
+            stream_task.cancel()
+            try:
+                await stream_task
+            except (asyncio.CancelledError, Exception):
+                pass
+    
+    async def run_data_fetcher(self, symbols: List[str], timeframes: List[str],
+                               use_websocket: bool = False, history_lookback: Optional[Dict[str, float]] = None,
+                               live_timeframes: Optional[List[str]] = None,
+                               active_timeframes: Optional[Callable[[], List[str]]] = None,
+                               settle_delay: float = 1.5):
+        """Chạy vòng lặp cập nhật dữ liệu (live_timeframes: xem run_stream_fetcher)
+        
+        Ở chế độ REST, mỗi (symbol, timeframe) được làm mới ngay sau khi nến đóng
+        (cộng settle_delay giây) thay vì làm mới tất cả theo chu kỳ cố định.
+        active_timeframes (nếu có) trả về các timeframe đang cần, ví dụ theo chế độ
+        giao dịch hiện tại; chỉ các timeframe đó được lập lịch.
+        """
+        if use_websocket:
+            await self.run_stream_fetcher(symbols, timeframes, history_lookback=history_lookback,
+                                          live_timeframes=live_timeframes)
+            return
+        
+        # Tải dữ liệu lịch sử lần đầu
+        await self.load_initial_history(symbols, timeframes, history_lookback)
+        
+        live_timeframes = live_timeframes or timeframes
+        self.scheduler = CandleCloseScheduler(settle_ms=int(settle_delay * 1000))
+        scheduled_timeframes = None
         last_price_update = 0
-        last_klines_update = 0
         
         while self.is_running:
             try:
@@ -204,15 +472,21 @@ class BinanceConnector:
                     await self.update_current_prices(symbols)
                     last_price_update = current_time
                 
-                # Cập nhật klines mỗi 30 giây
-                if current_time - last_klines_update >= update_interval:
-                    await self.fetch_latest_klines(symbols, timeframes)
-                    last_klines_update = current_time
-                    self.data_store.add_log("Đã cập nhật dữ liệu thị trường")
+                # Chỉ lập lịch cho các timeframe đang cần (chế độ giao dịch có thể đổi khi đang chạy)
+                wanted = [timeframe for timeframe in (active_timeframes() if active_timeframes else live_timeframes)
+                          if timeframe in live_timeframes]
+                if wanted != scheduled_timeframes:
+                    scheduled_timeframes = wanted
+                    self.scheduler.set_keys((symbol, timeframe) for symbol in symbols for timeframe in wanted)
+                    self.data_store.add_log(f"Lập lịch cập nhật klines: {', '.join(wanted) or 'không có'}")
+                
+                due = self.scheduler.pop_due()
+                if due:
+                    await self.refresh_klines(due)
                 
-                await asyncio.sleep(1)
+                await asyncio.sleep(self.scheduler.tick_ms / 1000)
                 
             except Exception as e:
                 self.logger.error(f"Lỗi trong vòng lặp cập nhật dữ liệu: {e}")
                 self.data_store.add_log(f"Lỗi cập nhật dữ liệu: {str(e)}")
-                await asyncio.sleep(5)  # Chờ 5 giây trước khi thử lại 
\ No newline at end of file
+                await asyncio.sleep(5)  # Chờ 5 giây trước khi thử lại
@@ -0,0 +1,150 @@
+import asyncio
+import aiohttp
+from typing import Dict, List, Optional
+import logging
+
+from .data_models import DataStore
+from .fast_json import loads
+
+class BinanceKlineStream:
+    """Nhận nến và mark price realtime qua Binance combined streams (WebSocket)"""
+
+    # Binance Futures cho phép tối đa 200 stream trên một kết nối
+    MAX_STREAMS_PER_CONNECTION = 200
+
+    def __init__(self, connector, stream_url: str = "wss://fstream.binance.com",
+                 max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+                 mark_price_speed: str = "1s"):
+        self.connector = connector
+        self.data_store: DataStore = connector.data_store
+        self.stream_url = stream_url.rstrip('/')
+        self.max_streams_per_connection = max_streams_per_connection
+        self.mark_price_speed = mark_price_speed
+        self.max_reconnect_delay = 30
+
+        self.connected_streams = 0
+        self.messages_received = 0
+        self.reconnects = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    def build_streams(self, symbols: List[str], timeframes: List[str]) -> List[str]:
+        """Tạo danh sách tên stream: <symbol>@kline_<tf> và <symbol>@markPrice"""
+        streams = []
+        for symbol in symbols:
+            name = symbol.lower()
+            for timeframe in timeframes:
+                streams.append(f"{name}@kline_{timeframe}")
+            if self.mark_price_speed:
+                streams.append(f"{name}@markPrice@{self.mark_price_speed}")
+            else:
+                streams.append(f"{name}@markPrice")
+        return streams
+
+    def chunk_streams(self, streams: List[str]) -> List[List[str]]:
+        """Chia stream thành nhóm theo giới hạn mỗi kết nối"""
+        size = self.max_streams_per_connection
+        return [streams[i:i + size] for i in range(0, len(streams), size)]
+
+    def build_url(self, streams: List[str]) -> str:
+        """URL combined stream"""
+        return f"{self.stream_url}/stream?streams={'/'.join(streams)}"
+
+    async def run(self, symbols: List[str], timeframes: List[str]):
+        """Chạy tất cả kết nối WebSocket cho đến khi connector dừng"""
+        streams = self.build_streams(symbols, timeframes)
+        chunks = self.chunk_streams(streams)
+        self.data_store.add_log(f"Đang mở {len(chunks)} kết nối WebSocket cho {len(streams)} stream")
+
+        await asyncio.gather(*(self._run_connection(chunk) for chunk in chunks))
+
+    async def _run_connection(self, streams: List[str]):
+        """Giữ một kết nối combined stream, tự kết nối lại và đồng bộ REST khi mất kết nối"""
+        url = self.build_url(streams)
+        kline_keys = self._kline_keys(streams)
+        delay = 1
+        first_connect = True
+        resync_task: Optional[asyncio.Task] = None
+
+        while self.connector.is_running:
+            try:
+                async with self.connector.session.ws_connect(url, heartbeat=30) as ws:
+                    self.connected_streams += len(streams)
+                    delay = 1
+
+                    # Lấp khoảng trống dữ liệu trong thời gian mất kết nối, chạy song song
+                    # với việc nhận message để nến realtime không bị chặn trong lúc tải REST
+                    if not first_connect:
+                        self.reconnects += 1
+                        resync_task = asyncio.ensure_future(self.connector.resync_klines(kline_keys))
+                        self.data_store.add_log(f"Đã kết nối lại WebSocket ({len(streams)} stream)")
+                    first_connect = False
+
+                    try:
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(message.data)
+                            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+
+                            if not self.connector.is_running:
+                                break
+                    finally:
+                        self.connected_streams -= len(streams)
+                        if resync_task is not None and not self.connector.is_running:
+                            resync_task.cancel()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Lỗi kết nối WebSocket: {e}")
+
+            if not self.connector.is_running:
+                break
+
+            first_connect = False
+            self.data_store.add_log(f"Mất kết nối WebSocket, thử lại sau {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _kline_keys(self, streams: List[str]) -> List[tuple]:
+        """Lấy danh sách (symbol, timeframe) từ tên stream kline"""
+        keys = []
+        for stream in streams:
+            name, _, kind = stream.partition('@')
+            if kind.startswith('kline_'):
+                keys.append((name.upper(), kind[len('kline_'):]))
+        return keys
+
+    def handle_message(self, raw: str):
+        """Xử lý một message từ combined stream"""
+        try:
+            payload = loads(raw)
+            self.messages_received += 1
+            self.handle_event(payload.get('data', payload))
+        except Exception as e:
+            self.logger.error(f"Lỗi xử lý message WebSocket: {e}")
+
+    def handle_event(self, event: Dict):
+        """Ghi sự kiện kline/markPrice vào DataStore"""
+        event_type = event.get('e')
+
+        if event_type == 'kline':
+            kline = event['k']
+            # Nến đang hình thành được cập nhật tại chỗ, nến đóng (x=true) ghi giá trị cuối
+            self.data_store.upsert_candle(
+                event['s'],
+                kline['i'],
+                int(kline['t']),
+                float(kline['o']),
+                float(kline['h']),
+                float(kline['l']),
+                float(kline['c']),
+                float(kline['v'])
+            )
+
+        elif event_type == 'markPriceUpdate':
+            symbol = event['s']
+            current = self.data_store.get_price(symbol)
+            change_24h = current.change_24h if current else 0.0
+            self.data_store.update_price(symbol, float(event['p']), change_24h)
@@ -0,0 +1,168 @@
+import os
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .candle_store import CANDLE_FIELDS
+from .data_models import DataStore
+
+# Mỗi segment là một mảng structured: thời gian mở (int64) + OHLCV (float64)
+SEGMENT_DTYPE = np.dtype([('timestamp', '<i8')] + [(name, '<f8') for name in CANDLE_FIELDS])
+
+class CandleDiskCache:
+    """Cache nến trên đĩa dạng cột, chia segment theo (symbol, timeframe)
+
+    Cấu trúc thư mục: <directory>/<symbol>/<timeframe>/<seq>.npy. Các segment chỉ
+    được ghi thêm; nến trùng thời gian mở được giải quyết khi đọc (bản ghi sau thắng).
+    Việc ghi đĩa diễn ra trong một thread nền theo lô nên vòng lặp realtime
+    không bao giờ phải chờ I/O.
+    """
+
+    def __init__(self, directory: str = "data/candles", flush_interval: float = 5.0, max_segments: int = 32,
+                 max_candles_per_series: int = 100_000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_segments = max_segments
+        self.max_candles_per_series = max_candles_per_series
+
+        self._pending: Dict[Tuple[str, str], List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sequence: Dict[Tuple[str, str], int] = {}
+
+        self.logger = logging.getLogger(__name__)
+
+    def _series_dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.directory, symbol, timeframe)
+
+    def _segment_files(self, symbol: str, timeframe: str) -> List[str]:
+        """Danh sách segment theo thứ tự ghi"""
+        series_dir = self._series_dir(symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        names = sorted(name for name in os.listdir(series_dir) if name.endswith('.npy'))
+        return [os.path.join(series_dir, name) for name in names]
+
+    def read_series(self, symbol: str, timeframe: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Đọc toàn bộ segment của một series, trả về (timestamps, values) đã sắp xếp, không trùng"""
+        segments = []
+        for path in self._segment_files(symbol, timeframe):
+            try:
+                segments.append(np.load(path))
+            except Exception as e:
+                self.logger.error(f"Lỗi đọc segment {path}: {e}")
+
+        if not segments:
+            return np.empty(0, dtype=np.int64), np.empty((len(CANDLE_FIELDS), 0), dtype=np.float64)
+
+        records = np.concatenate(segments)
+        # Sắp xếp ổn định rồi giữ bản ghi cuối cùng của mỗi thời gian mở
+        records = records[np.argsort(records['timestamp'], kind='stable')]
+        timestamps = records['timestamp']
+        keep = np.append(timestamps[1:] != timestamps[:-1], True)
+        records = records[keep]
+
+        values = np.vstack([records[name] for name in CANDLE_FIELDS])
+        return records['timestamp'].copy(), values
+
+    def load(self, data_store: DataStore, symbols: List[str], timeframes: List[str]) -> int:
+        """Nạp cache vào DataStore, trả về tổng số nến đã nạp"""
+        total = 0
+        for symbol in symbols:
+            for timeframe in timeframes:
+                timestamps, values = self.read_series(symbol, timeframe)
+                if len(timestamps):
+                    buffer = data_store.get_candle_buffer(symbol, timeframe, create=True)
+                    buffer.upsert_block(timestamps, values)
+                    total += min(len(timestamps), buffer.capacity)
+        return total
+
+    def attach(self, data_store: DataStore):
+        """Nhận mọi nến được ghi vào DataStore và khởi động thread ghi nền"""
+        data_store.add_candle_listener(self.enqueue)
+        self.start()
+
+    def enqueue(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray):
+        """Đưa nến vào hàng đợi ghi (chỉ copy trong bộ nhớ)"""
+        with self._lock:
+            self._pending.setdefault((symbol, timeframe), []).append((timestamps.copy(), values.copy()))
+
+    def start(self):
+        """Khởi động thread ghi nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="candle-disk-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Dừng thread ghi nền và ghi nốt dữ liệu còn lại"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Ghi toàn bộ nến đang chờ ra đĩa, mỗi series một segment"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for (symbol, timeframe), blocks in pending.items():
+            try:
+                timestamps = np.concatenate([block[0] for block in blocks])
+                values = np.concatenate([block[1] for block in blocks], axis=1)
+                self._write_segment(symbol, timeframe, timestamps, values)
+
+                if len(self._segment_files(symbol, timeframe)) > self.max_segments:
+                    self.compact(symbol, timeframe)
+            except Exception as e:
+                self.logger.error(f"Lỗi ghi cache {symbol} {timeframe}: {e}")
+
+    def _next_sequence(self, symbol: str, timeframe: str) -> int:
+        key = (symbol, timeframe)
+        if key not in self._sequence:
+            files = self._segment_files(symbol, timeframe)
+            last = int(os.path.basename(files[-1])[:-4]) if files else 0
+            self._sequence[key] = last
+        self._sequence[key] += 1
+        return self._sequence[key]
+
+    def _write_segment(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray) -> str:
+        """Ghi một segment mới (ghi file tạm rồi rename để không bao giờ đọc phải file dở dang)"""
+        # Trong cùng một lô, chỉ giữ bản ghi cuối của mỗi thời gian mở
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, values = timestamps[order], values[:, order]
+        keep = np.append(timestamps[1:] != timestamps[:-1], True)
+
+        records = np.empty(int(keep.sum()), dtype=SEGMENT_DTYPE)
+        records['timestamp'] = timestamps[keep]
+        for i, name in enumerate(CANDLE_FIELDS):
+            records[name] = values[i, keep]
+
+        series_dir = self._series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        path = os.path.join(series_dir, f"{self._next_sequence(symbol, timeframe):010d}.npy")
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(temp_path, path)
+        return path
+
+    def compact(self, symbol: str, timeframe: str):
+        """Gộp các segment của một series thành một segment duy nhất (giữ tối đa max_candles_per_series nến)"""
+        old_files = self._segment_files(symbol, timeframe)
+        timestamps, values = self.read_series(symbol, timeframe)
+        if not len(timestamps):
+            return
+        keep = self.max_candles_per_series
+        timestamps, values = timestamps[-keep:], values[:, -keep:]
+        self._write_segment(symbol, timeframe, timestamps, values)
+        for path in old_files:
+            os.remove(path)
@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List, Optional, Tuple
+from dateutil import tz
+
+# Thứ tự các cột giá trị (float64) trong buffer
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+_LOCAL_TZ = tz.tzlocal()
+
+# Độ dài mỗi khung thời gian (milliseconds)
+_INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+# 1970-01-01 là thứ Năm, nến tuần của Binance bắt đầu từ thứ Hai
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+def interval_to_ms(timeframe: str) -> int:
+    """Chuyển khung thời gian Binance (1m, 4h, 1d...) sang milliseconds"""
+    try:
+        return int(timeframe[:-1]) * _INTERVAL_UNITS_MS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Khung thời gian không hỗ trợ: {timeframe}")
+
+def bucket_start(timestamps, timeframe: str):
+    """Thời gian mở (epoch ms, UTC) của nến timeframe chứa mỗi timestamp, căn như Binance
+
+    Nhận một số hoặc mảng int64. Nến phút/giờ/ngày căn theo mốc epoch, nến tuần bắt đầu thứ Hai.
+    """
+    step = interval_to_ms(timeframe)
+    offset = _WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    return (timestamps - offset) // step * step + offset
+
+def datetime_to_ms(value: datetime) -> int:
+    """Chuyển datetime (naive = giờ địa phương) sang epoch milliseconds"""
+    return int(round(value.timestamp() * 1000))
+
+def ms_to_datetime_index(timestamps: np.ndarray) -> pd.DatetimeIndex:
+    """Chuyển epoch milliseconds sang giờ địa phương (naive), giống datetime.fromtimestamp"""
+    index = pd.to_datetime(timestamps, unit='ms', utc=True)
+    return index.tz_convert(_LOCAL_TZ).tz_localize(None)
+
+def klines_to_columns(klines: List) -> Tuple[np.ndarray, np.ndarray]:
+    """Chuyển klines thô của Binance (list of lists) thành cột NumPy trong một lượt
+
+    Trả về (timestamps int64, values float64 shape (5, n)) theo thứ tự CANDLE_FIELDS.
+    """
+    if not klines:
+        return np.empty(0, dtype=np.int64), np.empty((len(CANDLE_FIELDS), 0), dtype=np.float64)
+    columns = list(zip(*klines))
+    timestamps = np.array(columns[0], dtype=np.int64)
+    values = np.array(columns[1:1 + len(CANDLE_FIELDS)], dtype=np.float64)
+    return timestamps, values
+
+class CandleBuffer:
+    """Ring buffer dạng cột cho nến của một cặp (symbol, timeframe)
+
+    Mỗi cột được cấp phát 2 * capacity phần tử và mỗi nến được ghi đồng thời
+    tại vị trí i và i + capacity. Nhờ vậy cửa sổ n nến gần nhất luôn là một
+    đoạn liên tục trong bộ nhớ và có thể trả về dưới dạng view (không copy).
+    """
+
+    FIELDS = CANDLE_FIELDS  # Tên các hàng của _values (lớp con có thể đổi)
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity phải lớn hơn 0")
+        self._allocate(capacity)
+        self._end = 0  # Vị trí ghi tiếp theo trong [0, capacity)
+        self._size = 0
+        self.version = 0  # Tăng sau mỗi lần ghi, để cache biết series đã thay đổi
+
+    def _allocate(self, capacity: int):
+        """Cấp phát bộ nhớ cho các cột (lớp con có thể đặt ở bộ nhớ dùng chung)"""
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(self.FIELDS), 2 * capacity), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _write(self, position: int, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        """Ghi một nến vào vị trí position và bản sao position + capacity"""
+        i = position
+        j = i + self.capacity
+        self._timestamps[i] = self._timestamps[j] = timestamp
+        values = self._values
+        values[0, i] = values[0, j] = open_
+        values[1, i] = values[1, j] = high
+        values[2, i] = values[2, j] = low
+        values[3, i] = values[3, j] = close
+        values[4, i] = values[4, j] = volume
+
+    def append(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        """Thêm một nến vào cuối buffer - O(1)"""
+        self.version += 1
+        self._write(self._end, timestamp, open_, high, low, close, volume)
+        self._end = (self._end + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def upsert(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """Thêm hoặc cập nhật nến theo thời gian mở
+
+        - Thời gian mở mới hơn nến cuối: thêm vào cuối (O(1))
+        - Trùng nến cuối (nến đang hình thành): ghi đè tại chỗ (O(1))
+        - Cũ hơn: tìm nhị phân, ghi đè nếu đã có, chèn nếu còn thiếu
+
+        Trả về True nếu nến được thêm mới.
+        """
+        self.version += 1
+        last = self.last_timestamp()
+        if last is None or timestamp > last:
+            self.append(timestamp, open_, high, low, close, volume)
+            return True
+
+        if timestamp == last:
+            self._write((self._end - 1) % self.capacity, timestamp, open_, high, low, close, volume)
+            return False
+
+        window = self._window()
+        timestamps = self._timestamps[window]
+        idx = int(np.searchsorted(timestamps, timestamp))
+        if timestamps[idx] == timestamp:
+            self._write((window.start + idx) % self.capacity, timestamp, open_, high, low, close, volume)
+            return False
+
+        # Nến cũ hơn toàn bộ buffer đã đầy thì sẽ bị loại ngay
+        if idx == 0 and self._size == self.capacity:
+            return False
+
+        # Chèn nến còn thiếu vào giữa (hiếm gặp, O(n))
+        new_timestamps = np.insert(timestamps, idx, timestamp)
+        new_values = np.insert(self._values[:, window], idx, [open_, high, low, close, volume], axis=1)
+        self.clear()
+        self.append_block(new_timestamps, new_values)
+        return True
+
+    def resize(self, capacity: int):
+        """Đổi capacity, giữ lại các nến gần nhất"""
+        if capacity <= 0:
+            raise ValueError("capacity phải lớn hơn 0")
+        if capacity == self.capacity:
+            return
+        timestamps, values = self.window()
+        timestamps, values = timestamps.copy(), values.copy()
+
+        self._allocate(capacity)
+        self.clear()
+        self.append_block(timestamps, values)
+
+    def clear(self):
+        """Xóa toàn bộ nến"""
+        self.version += 1
+        self._end = 0
+        self._size = 0
+
+    def append_block(self, timestamps: np.ndarray, values: np.ndarray):
+        """Thêm nhiều nến cùng lúc
+
+        values có shape (5, n) theo thứ tự CANDLE_FIELDS.
+        """
+        count = len(timestamps)
+        if count == 0:
+            return
+        self.version += 1
+        if count > self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            values = values[:, -self.capacity:]
+            count = self.capacity
+
+        positions = (self._end + np.arange(count)) % self.capacity
+        self._timestamps[positions] = timestamps
+        self._timestamps[positions + self.capacity] = timestamps
+        self._values[:, positions] = values
+        self._values[:, positions + self.capacity] = values
+
+        self._end = (self._end + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def upsert_block(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Thêm hoặc cập nhật nhiều nến (timestamps tăng dần) cùng lúc
+
+        Phần mới hơn nến cuối được thêm theo khối, phần trùng thời gian mở
+        được ghi đè tại chỗ; chỉ khi có nến chèn vào giữa mới phải dựng lại buffer.
+        Trả về số nến được thêm mới.
+        """
+        count = len(timestamps)
+        if count == 0:
+            return 0
+        self.version += 1
+
+        last = self.last_timestamp()
+        if last is None or timestamps[0] > last:
+            self.append_block(timestamps, values)
+            return min(count, self.capacity)
+
+        split = int(np.searchsorted(timestamps, last, side='right'))
+        head_timestamps = timestamps[:split]
+        window = self._window()
+        existing = self._timestamps[window]
+        idx = np.searchsorted(existing, head_timestamps)
+        matched = (idx < len(existing)) & (existing[np.minimum(idx, len(existing) - 1)] == head_timestamps)
+
+        if matched.all():
+            positions = (window.start + idx) % self.capacity
+            self._values[:, positions] = values[:, :split]
+            self._values[:, positions + self.capacity] = values[:, :split]
+            self.append_block(timestamps[split:], values[:, split:])
+            return count - split
+
+        # Có nến còn thiếu ở giữa: gộp, ưu tiên giá trị mới, rồi dựng lại buffer
+        merged_timestamps = np.concatenate([existing, timestamps])
+        merged_values = np.concatenate([self._values[:, window], values], axis=1)
+        order = np.argsort(merged_timestamps, kind='stable')
+        merged_timestamps = merged_timestamps[order]
+        merged_values = merged_values[:, order]
+        keep = np.append(merged_timestamps[1:] != merged_timestamps[:-1], True)
+        added = int(keep.sum()) - len(existing)
+
+        self.clear()
+        self.append_block(merged_timestamps[keep], merged_values[:, keep])
+        return added
+
+    def _window(self, count: Optional[int] = None) -> slice:
+        """Trả về slice liên tục cho count nến gần nhất"""
+        if count is None or count > self._size:
+            count = self._size
+        start = self._end - count
+        if start < 0:
+            start += self.capacity
+        return slice(start, start + count)
+
+    def timestamps(self, count: Optional[int] = None) -> np.ndarray:
+        """View (không copy) của cột thời gian mở nến (epoch ms)"""
+        return self._timestamps[self._window(count)]
+
+    def column(self, name: str, count: Optional[int] = None) -> np.ndarray:
+        """View (không copy) của một cột giá trị"""
+        return self._values[self.FIELDS.index(name), self._window(count)]
+
+    def values(self, count: Optional[int] = None) -> np.ndarray:
+        """View (không copy) của toàn bộ cột giá trị, shape (5, n)"""
+        return self._values[:, self._window(count)]
+
+    def window(self, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Trả về (timestamps, values) của count nến gần nhất"""
+        window = self._window(count)
+        return self._timestamps[window], self._values[:, window]
+
+    def last_timestamp(self) -> Optional[int]:
+        """Thời gian mở của nến mới nhất"""
+        if self._size == 0:
+            return None
+        return int(self._timestamps[self._end - 1 + self.capacity])
+
+    def search(self, start: Optional[int] = None, end: Optional[int] = None) -> slice:
+        """Tìm nhị phân khoảng start <= timestamp < end, trả về slice trên window()"""
+        timestamps = self._timestamps[self._window()]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return slice(lo, max(lo, hi))
+
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Trả về (timestamps, values) của các nến có start <= timestamp < end (view)"""
+        timestamps, values = self.window()
+        found = self.search(start, end)
+        return timestamps[found], values[:, found]
+
+    def to_dataframe(self, count: Optional[int] = None, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Tạo DataFrame (copy) từ buffer, chỉ khi có yêu cầu"""
+        if start is not None or end is not None:
+            timestamps, values = self.between(start, end)
+            if count is not None:
+                timestamps, values = timestamps[-count:], values[:, -count:]
+        else:
+            timestamps, values = self.window(count)
+        data = {'timestamp': ms_to_datetime_index(timestamps)}
+        for i, name in enumerate(self.FIELDS):
+            data[name] = values[i].copy()
+        return pd.DataFrame(data)
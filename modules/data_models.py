@@ -1,8 +1,13 @@
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
+import logging
+import numpy as np
 import pandas as pd
 
+from .candle_store import CandleBuffer, datetime_to_ms, interval_to_ms, klines_to_columns
+from .event_bus import EventBus, EventType, MarketEvent
+
 @dataclass
 class MarketData:
     """Dữ liệu thị trường"""
@@ -30,6 +35,16 @@ class TechnicalIndicators:
     bb_upper: Optional[float] = None
     bb_middle: Optional[float] = None
     bb_lower: Optional[float] = None
+    # Chỉ báo bổ sung từ indicator_registry: chỉ đường DAG điền (analyze_symbol_timeframe,
+    # executor process), đường vector hóa/streaming để None. Chiến lược chưa dùng, UI hiển thị
+    atr: Optional[float] = None
+    adx: Optional[float] = None
+    plus_di: Optional[float] = None
+    minus_di: Optional[float] = None
+    stoch_k: Optional[float] = None
+    stoch_d: Optional[float] = None
+    vwap: Optional[float] = None
+    obv: Optional[float] = None
 
 @dataclass
 class TradingSuggestion:
@@ -74,43 +89,145 @@ class TokenPrice:
 class DataStore:
     """Lưu trữ dữ liệu trong bộ nhớ"""
     
-    def __init__(self):
-        self.market_data: Dict[str, Dict[str, pd.DataFrame]] = {}  # symbol -> timeframe -> DataFrame
+    def __init__(self, max_candles: int = 1000):
+        self.max_candles = max_candles  # Số nến tối đa mặc định cho mỗi (symbol, timeframe)
+        self.timeframe_capacity: Dict[str, int] = {}  # timeframe -> số nến tối đa (ghi đè mặc định)
+        self.candle_listeners: List[Callable] = []  # callback(symbol, timeframe, timestamps, values) sau mỗi lần ghi nến
+        self.event_bus = EventBus()  # Sự kiện nến đóng/cập nhật và giá cho analyzer, strategy...
+        self.buffer_factory: Callable = lambda symbol, timeframe, capacity: CandleBuffer(capacity)
+        self.market_data: Dict[str, Dict[str, CandleBuffer]] = {}  # symbol -> timeframe -> CandleBuffer
         self.indicators: Dict[str, Dict[str, TechnicalIndicators]] = {}  # symbol -> timeframe -> indicators
         self.suggestions: List[TradingSuggestion] = []
         self.current_prices: Dict[str, TokenPrice] = {}
         self.logs: List[str] = []
         
-    def add_market_data(self, data: MarketData):
-        """Thêm dữ liệu thị trường"""
-        if data.symbol not in self.market_data:
-            self.market_data[data.symbol] = {}
-        
-        if data.timeframe not in self.market_data[data.symbol]:
-            self.market_data[data.symbol][data.timeframe] = pd.DataFrame()
-        
-        # Thêm dữ liệu mới vào DataFrame
-        new_row = {
-            'timestamp': data.timestamp,
-            'open': data.open,
-            'high': data.high,
-            'low': data.low,
-            'close': data.close,
-            'volume': data.volume
-        }
-        
-        df = self.market_data[data.symbol][data.timeframe]
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+    def get_candle_buffer(self, symbol: str, timeframe: str, create: bool = False) -> Optional[CandleBuffer]:
+        """Lấy ring buffer nến của (symbol, timeframe)"""
+        buffers = self.market_data.get(symbol)
+        if buffers is None:
+            if not create:
+                return None
+            buffers = self.market_data[symbol] = {}
         
-        # Giữ chỉ 1000 nến gần nhất
-        if len(df) > 1000:
-            df = df.tail(1000).reset_index(drop=True)
-        
-        self.market_data[data.symbol][data.timeframe] = df
+        buffer = buffers.get(timeframe)
+        if buffer is None and create:
+            capacity = self.timeframe_capacity.get(timeframe, self.max_candles)
+            buffer = buffers[timeframe] = self.buffer_factory(symbol, timeframe, capacity)
+        return buffer
+    
+    def ensure_capacity(self, timeframe: str, capacity: int):
+        """Đảm bảo buffer của timeframe giữ được ít nhất capacity nến"""
+        if capacity <= self.timeframe_capacity.get(timeframe, self.max_candles):
+            return
+        self.timeframe_capacity[timeframe] = capacity
+        for buffers in self.market_data.values():
+            buffer = buffers.get(timeframe)
+            if buffer is not None and buffer.capacity < capacity:
+                buffer.resize(capacity)
+    
+    def ensure_lookback_capacity(self, lookback_days: Dict[str, float]):
+        """Đảm bảo mỗi timeframe giữ đủ số nến cho lookback (ngày) cấu hình"""
+        for timeframe, days in lookback_days.items():
+            if days:
+                self.ensure_capacity(timeframe, int(days * 86_400_000) // interval_to_ms(timeframe) + 2)
     
-    def get_market_data(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
-        """Lấy dữ liệu thị trường"""
-        return self.market_data.get(symbol, {}).get(timeframe)
+    def add_candle_listener(self, listener: Callable):
+        """Đăng ký callback(symbol, timeframe, timestamps, values) được gọi sau mỗi lần ghi nến"""
+        self.candle_listeners.append(listener)
+    
+    def remove_candle_listener(self, listener: Callable):
+        """Hủy đăng ký callback ghi nến"""
+        if listener in self.candle_listeners:
+            self.candle_listeners.remove(listener)
+    
+    def _notify_candles(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray):
+        """Thông báo các nến vừa được ghi cho listeners"""
+        for listener in self.candle_listeners:
+            try:
+                listener(symbol, timeframe, timestamps, values)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Lỗi candle listener {symbol} {timeframe}: {e}")
+    
+    def upsert_candle(self, symbol: str, timeframe: str, open_time: int,
+                      open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """Thêm hoặc cập nhật một nến theo thời gian mở (epoch ms)
+
+        Trả về True nếu nến được thêm mới.
+        """
+        buffer = self.get_candle_buffer(symbol, timeframe, create=True)
+        previous_open_time = buffer.last_timestamp()
+        added = buffer.upsert(open_time, open_, high, low, close, volume)
+        if self.candle_listeners:
+            self._notify_candles(
+                symbol, timeframe,
+                np.array([open_time], dtype=np.int64),
+                np.array([[open_], [high], [low], [close], [volume]], dtype=np.float64)
+            )
+        if self.event_bus.has_subscribers:
+            self._publish_candle_event(symbol, timeframe, buffer, previous_open_time, open_time)
+        return added
+    
+    def _publish_candle_event(self, symbol: str, timeframe: str, buffer: CandleBuffer,
+                              previous_open_time: Optional[int], newest_open_time: int):
+        """Phát CANDLE_CLOSED nếu có nến mới hơn nến cuối trước khi ghi, ngược lại CANDLE_UPDATED"""
+        closed = previous_open_time is None or newest_open_time > previous_open_time
+        last_open_time = buffer.last_timestamp()
+        self.event_bus.publish(MarketEvent(
+            EventType.CANDLE_CLOSED if closed else EventType.CANDLE_UPDATED,
+            symbol,
+            timeframe,
+            last_open_time,
+            float(buffer.column('close', 1)[0])
+        ))
+    
+    def add_market_data(self, data: MarketData):
+        """Thêm hoặc cập nhật nến (theo thời gian mở)"""
+        self.upsert_candle(
+            data.symbol,
+            data.timeframe,
+            datetime_to_ms(data.timestamp),
+            data.open,
+            data.high,
+            data.low,
+            data.close,
+            data.volume
+        )
+    
+    def add_klines_batch(self, symbol: str, timeframe: str, klines: List) -> int:
+        """Thêm/cập nhật cả khối klines thô từ Binance, không tạo MarketData từng nến
+
+        Trả về số nến được thêm mới.
+        """
+        timestamps, values = klines_to_columns(klines)
+        return self.add_candles_block(symbol, timeframe, timestamps, values)
+    
+    def add_candles_block(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Thêm/cập nhật khối nến dạng cột (timestamps tăng dần, values shape (5, n))
+
+        Trả về số nến được thêm mới.
+        """
+        buffer = self.get_candle_buffer(symbol, timeframe, create=True)
+        previous_open_time = buffer.last_timestamp()
+        added = buffer.upsert_block(timestamps, values)
+        if self.candle_listeners and len(timestamps):
+            self._notify_candles(symbol, timeframe, timestamps, values)
+        if self.event_bus.has_subscribers and len(timestamps):
+            self._publish_candle_event(symbol, timeframe, buffer, previous_open_time, int(timestamps[-1]))
+        return added
+    
+    def get_market_data(self, symbol: str, timeframe: str,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+        """Lấy dữ liệu thị trường (DataFrame được tạo từ buffer khi gọi)
+
+        start/end (tùy chọn) lọc theo thời gian mở nến: start <= timestamp < end.
+        """
+        buffer = self.get_candle_buffer(symbol, timeframe)
+        if buffer is None:
+            return None
+        return buffer.to_dataframe(
+            start=datetime_to_ms(start) if start else None,
+            end=datetime_to_ms(end) if end else None
+        )
     
     def add_indicators(self, indicators: TechnicalIndicators):
         """Thêm chỉ báo kỹ thuật"""
@@ -138,6 +255,19 @@ class DataStore:
     def update_price(self, symbol: str, price: float, change_24h: float = 0.0):
         """Cập nhật giá hiện tại"""
         self.current_prices[symbol] = TokenPrice(symbol, price, change_24h)
+        if self.event_bus.has_subscribers:
+            self.event_bus.publish(MarketEvent(EventType.PRICE_TICK, symbol, price=price))
+    
+    def update_prices_batch(self, prices: Dict[str, tuple]):
+        """Cập nhật giá cho nhiều symbol cùng lúc: symbol -> (price, change_24h)"""
+        now = datetime.now()
+        self.current_prices.update({
+            symbol: TokenPrice(symbol, price, change_24h, now)
+            for symbol, (price, change_24h) in prices.items()
+        })
+        if self.event_bus.has_subscribers:
+            for symbol, (price, _) in prices.items():
+                self.event_bus.publish(MarketEvent(EventType.PRICE_TICK, symbol, price=price))
     
     def get_price(self, symbol: str) -> Optional[TokenPrice]:
         """Lấy giá hiện tại"""
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+class EventType(Enum):
+    """Loại sự kiện thị trường"""
+    CANDLE_CLOSED = "candle_closed"    # Có nến mới mở, nến trước đó đã đóng
+    CANDLE_UPDATED = "candle_updated"  # Nến đang hình thành thay đổi
+    PRICE_TICK = "price_tick"          # Giá hiện tại thay đổi
+
+@dataclass(frozen=True)
+class MarketEvent:
+    """Sự kiện do DataStore phát ra"""
+    type: EventType
+    symbol: str
+    timeframe: Optional[str] = None  # None với PRICE_TICK
+    open_time: Optional[int] = None  # Thời gian mở của nến mới nhất (epoch ms)
+    price: Optional[float] = None    # Giá đóng của nến mới nhất hoặc giá tick
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return self.symbol, self.timeframe
+
+class Subscription:
+    """Hàng đợi gộp theo key, mỗi key chỉ giữ sự kiện mới nhất (latest value wins)
+
+    Sự kiện mới của cùng một key thay thế sự kiện cũ còn trong hàng đợi; nếu sự
+    kiện cũ là CANDLE_CLOSED thì sự kiện gộp vẫn giữ loại CANDLE_CLOSED để không
+    mất thông tin nến đóng. Không key nào bị bỏ: số key bị chặn bởi số series, nên
+    khi vượt maxsize hàng đợi vẫn nhận thêm và chỉ ghi cảnh báo (consumer đang chậm).
+    Có thể đọc từ bất kỳ thread nào (drain) hoặc chờ trong asyncio (get_batch).
+    """
+
+    def __init__(self, name: str, event_types: Optional[Iterable[EventType]] = None, maxsize: int = 10_000):
+        self.name = name
+        self.event_types: Set[EventType] = set(event_types or EventType)
+        self.maxsize = maxsize
+        self._events: "OrderedDict[Tuple[str, Optional[str]], MarketEvent]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._overflowing = False
+        self.logger = logging.getLogger(__name__)
+
+        # Thống kê
+        self.published = 0
+        self.conflated = 0
+        self.overflowed = 0  # Số key mới được nhận khi hàng đợi đã vượt maxsize
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, event: MarketEvent):
+        warn = False
+        with self._lock:
+            self.published += 1
+            previous = self._events.get(event.key)
+            if previous is not None:
+                self.conflated += 1
+                if previous.type is EventType.CANDLE_CLOSED and event.type is EventType.CANDLE_UPDATED:
+                    event = replace(event, type=EventType.CANDLE_CLOSED)
+                self._events[event.key] = event
+            else:
+                if len(self._events) >= self.maxsize:
+                    self.overflowed += 1
+                    warn = not self._overflowing
+                    self._overflowing = True
+                self._events[event.key] = event
+            waiters, self._waiters = self._waiters, []
+
+        if warn:
+            self.logger.warning(f"Subscription {self.name} vượt {self.maxsize} key đang chờ, consumer xử lý chậm")
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+
+    @staticmethod
+    def _wake(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    def drain(self) -> Dict[Tuple[str, Optional[str]], MarketEvent]:
+        """Lấy toàn bộ sự kiện đang chờ (mỗi key một sự kiện, theo thứ tự cập nhật đầu tiên)"""
+        with self._lock:
+            events, self._events = self._events, OrderedDict()
+            self._overflowing = False
+        return events
+
+    async def get_batch(self, timeout: Optional[float] = None) -> Dict[Tuple[str, Optional[str]], MarketEvent]:
+        """Chờ đến khi có sự kiện rồi lấy toàn bộ (rỗng nếu hết timeout)"""
+        with self._lock:
+            if not self._events:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            else:
+                future = None
+
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.drain()
+
+class EventBus:
+    """Phát sự kiện thị trường tới các subscriber, mỗi subscriber có hàng đợi gộp riêng"""
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self.subscriptions)
+
+    def subscribe(self, name: str, event_types: Optional[Iterable[EventType]] = None,
+                  maxsize: int = 10_000) -> Subscription:
+        """Đăng ký (hoặc lấy lại) subscription theo tên"""
+        if name not in self.subscriptions:
+            self.subscriptions[name] = Subscription(name, event_types, maxsize)
+        return self.subscriptions[name]
+
+    def unsubscribe(self, name: str):
+        self.subscriptions.pop(name, None)
+
+    def publish(self, event: MarketEvent):
+        for subscription in list(self.subscriptions.values()):
+            if event.type in subscription.event_types:
+                subscription.put(event)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Số sự kiện đã nhận, đã gộp, vượt maxsize và đang chờ của mỗi subscriber"""
+        return {
+            name: {
+                'published': subscription.published,
+                'conflated': subscription.conflated,
+                'overflowed': subscription.overflowed,
+                'pending': len(subscription),
+            }
+            for name, subscription in self.subscriptions.items()
+        }
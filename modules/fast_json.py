@@ -0,0 +1,23 @@
+import json
+import numpy as np
+from typing import Any, Tuple, Union
+
+from .candle_store import klines_to_columns
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn, dùng json chuẩn nếu chưa cài
+    orjson = None
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Giải mã JSON, dùng orjson nếu đã cài"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def decode_klines(body: Union[bytes, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Giải mã payload klines thành cột NumPy (timestamps int64, values float64 shape (5, n))
+
+    Dùng loads (orjson nếu có) rồi klines_to_columns chuyển cột trong một lượt.
+    """
+    return klines_to_columns(loads(body))
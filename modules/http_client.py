@@ -0,0 +1,177 @@
+import asyncio
+import aiohttp
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import logging
+
+from .rate_limiter import WeightRateLimiter
+from .fast_json import loads
+
+# Timeout (giây) cho từng endpoint, klines trang lớn cần lâu hơn
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "/fapi/v1/ping": 3,
+    "/fapi/v1/ticker/price": 5,
+    "/fapi/v1/ticker/24hr": 10,
+    "/fapi/v1/klines": 15,
+    "/fapi/v1/exchangeInfo": 15,
+}
+
+class RequestMetrics:
+    """Thống kê latency và số byte theo endpoint (dùng làm request hook)"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.bytes_received: Dict[str, int] = {}
+
+    def record(self, path: str, status: int, latency: float, size: int):
+        """Hook: ghi nhận một request"""
+        if path not in self.latencies:
+            self.latencies[path] = deque(maxlen=self.window)
+        self.latencies[path].append(latency)
+        self.requests[path] = self.requests.get(path, 0) + 1
+        self.bytes_received[path] = self.bytes_received.get(path, 0) + size
+        if status != 200:
+            self.errors[path] = self.errors.get(path, 0) + 1
+
+    def percentile(self, path: str, q: float) -> Optional[float]:
+        """Latency (giây) tại phân vị q (0-100) của endpoint"""
+        samples = sorted(self.latencies.get(path, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Tóm tắt p50/p99, số request, lỗi và byte theo endpoint"""
+        return {
+            path: {
+                'requests': self.requests.get(path, 0),
+                'errors': self.errors.get(path, 0),
+                'bytes': self.bytes_received.get(path, 0),
+                'p50_ms': (self.percentile(path, 50) or 0) * 1000,
+                'p99_ms': (self.percentile(path, 99) or 0) * 1000,
+            }
+            for path in self.latencies
+        }
+
+class BinanceHttpClient:
+    """Tầng HTTP dùng chung cho mọi endpoint REST của Binance
+
+    - Connection pool cấu hình được, cache DNS, giữ kết nối keep-alive
+    - Timeout riêng cho từng endpoint
+    - Retry với jitter khi lỗi mạng/timeout/5xx, backoff theo rate limiter khi 429/418
+    - Hook đo latency và số byte của mỗi request
+    """
+
+    def __init__(self, base_url: str, rate_limiter: WeightRateLimiter,
+                 pool_size: int = 100, pool_size_per_host: int = 20,
+                 dns_ttl: int = 300, keepalive_timeout: float = 60,
+                 default_timeout: float = 10, timeouts: Optional[Dict[str, float]] = None,
+                 max_retries: int = 3, retry_base_delay: float = 0.25, retry_max_delay: float = 5.0):
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.default_timeout = default_timeout
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.request_hooks: List[Callable] = []
+
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Tạo session với connector đã tinh chỉnh"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.default_timeout),
+            headers={"Accept": "application/json"}
+        )
+        return self.session
+
+    async def close(self):
+        """Đóng session"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def add_request_hook(self, hook: Callable):
+        """Đăng ký hook(path, status, latency_giây, số_byte) sau mỗi request"""
+        self.request_hooks.append(hook)
+
+    def _notify(self, path: str, status: int, latency: float, size: int):
+        for hook in self.request_hooks:
+            try:
+                hook(path, status, latency, size)
+            except Exception as e:
+                self.logger.error(f"Lỗi request hook: {e}")
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff với full jitter"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    async def get_json(self, path: str, params: Optional[Dict] = None, weight: int = 1,
+                       decoder: Callable[[bytes], Any] = loads) -> Tuple[int, Any]:
+        """GET qua rate limiter, trả về (status, data) - data là None nếu lỗi
+
+        decoder nhận body (bytes) của response 200, mặc định là JSON (orjson nếu có);
+        body không giải mã được cho (status, None).
+        status = 0 nghĩa là lỗi mạng/timeout sau khi đã retry hết.
+        """
+        url = f"{self.base_url}{path}"
+        timeout = aiohttp.ClientTimeout(total=self.timeouts.get(path, self.default_timeout))
+        status = 0
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                async with self.rate_limiter.limit(weight):
+                    start = time.perf_counter()
+                    async with self.session.get(url, params=params, timeout=timeout) as response:
+                        status = response.status
+                        body = await response.read()
+                        self.rate_limiter.update_from_headers(response.headers)
+                        self._notify(path, status, time.perf_counter() - start, len(body))
+
+                        if status in (429, 418):
+                            self.rate_limiter.backoff(status, response.headers.get("Retry-After"))
+                            continue
+
+                        if status == 200:
+                            self.rate_limiter.reset_backoff()
+                            try:
+                                return status, decoder(body)
+                            except (ValueError, TypeError, IndexError) as e:
+                                # Body lỗi hoặc bị cắt: không làm hỏng vòng lấy dữ liệu
+                                self.logger.error(f"Lỗi giải mã response {path}: {e!r}")
+                                return status, None
+
+                        if status < 500:
+                            return status, None
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = 0
+                self._notify(path, status, time.perf_counter() - start, 0)
+                self.logger.warning(f"Lỗi request {path} (lần {attempt + 1}): {e!r}")
+
+            # Lỗi mạng, timeout hoặc 5xx: thử lại sau một khoảng ngẫu nhiên
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt))
+
+        return status, None
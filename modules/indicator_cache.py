@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from .candle_store import CandleBuffer
+from .data_models import TechnicalIndicators
+
+class IndicatorCache:
+    """Cache LRU có giới hạn cho chỉ báo đã tính của mỗi (symbol, timeframe, cấu hình chỉ báo)
+
+    Mỗi mục lưu kèm dấu phiên bản của series (thời gian mở nến cuối, version của
+    buffer); mục chỉ được dùng khi dấu này khớp với buffer hiện tại. Series thay
+    đổi thì mục cũ bị ghi đè tại chỗ, không chiếm thêm chỗ trong cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str, Hashable], Tuple[tuple, TechnicalIndicators]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Thống kê
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def config_key(indicators_config: Dict, names: Optional[Iterable[str]] = None) -> Hashable:
+        """Khóa của cấu hình chỉ báo (dict phẳng như get_indicators_config)
+
+        names: tập chỉ báo mà đường tính điền vào TechnicalIndicators. Các đường chỉ tính
+        4 chỉ báo gốc và đường DAG tính đủ chỉ báo đăng ký có khóa khác nhau, nên kết quả
+        thiếu trường không được trả về cho đường cần đủ trường.
+        """
+        items = tuple(sorted(indicators_config.items()))
+        return hash((items, tuple(names))) if names is not None else hash(items)
+
+    @staticmethod
+    def stamp(buffer: CandleBuffer) -> tuple:
+        """Dấu phiên bản của series: thay đổi sau mỗi lần ghi nến"""
+        return buffer.last_timestamp(), buffer.version
+
+    def get(self, key: Tuple[str, str, Hashable], stamp: tuple) -> Optional[TechnicalIndicators]:
+        """Chỉ báo đã cache nếu series chưa thay đổi, ngược lại None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, str, Hashable], stamp: tuple, indicators: TechnicalIndicators):
+        with self._lock:
+            self._entries[key] = (stamp, indicators)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Số lần trúng/trượt cache, số mục bị loại và tỉ lệ trúng"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,153 @@
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+import logging
+
+from .candle_store import CandleBuffer, datetime_to_ms
+from .data_models import DataStore
+from .indicator_registry import IndicatorGraph
+
+# Số nến thay đổi tối đa được cập nhật nối tiếp; nhiều hơn thì tính lại cả chuỗi
+MAX_INCREMENTAL_ROWS = 64
+
+class IndicatorBuffer(CandleBuffer):
+    """Ring buffer dạng cột cho chuỗi chỉ báo, mỗi hàng ứng với thời gian mở của một nến
+
+    Dùng chung bố cục mirrored của CandleBuffer nên window()/between() trả về view.
+    Các hàng là trường đầu ra của DAG chỉ báo rồi đến trạng thái của các nút đệ quy;
+    vị trí chưa đủ dữ liệu là NaN.
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        self.FIELDS = tuple(fields)
+        super().__init__(capacity)
+
+class IndicatorHistory:
+    """Chuỗi chỉ báo đầy đủ cho từng (symbol, timeframe), căn theo nến trong DataStore
+
+    Mọi trường được tính bằng cùng IndicatorGraph với phân tích (không có bản sao
+    công thức). Lắng nghe nến được ghi để biết series thay đổi từ thời điểm nào; khi
+    được đọc, chỉ các hàng từ đó trở đi được tính lại qua IndicatorGraph.evaluate_tail
+    (rolling trên cửa sổ cuối, EMA/Wilder/tích lũy nối tiếp từ trạng thái lưu ở hàng
+    trước). Series mới hoặc thay đổi quá nhiều thì tính lại cả chuỗi. Khi buffer nến đầy
+    và bỏ nến cũ, trạng thái vẫn nối tiếp phần đã bị bỏ (như StreamingIndicatorEngine):
+    EMA/Wilder lệch không đáng kể so với tính lại trên buffer hiện tại, OBV lệch một hằng số.
+    """
+
+    def __init__(self, data_store: DataStore, graph: IndicatorGraph):
+        self.data_store = data_store
+        self.graph = graph
+        self.fields = tuple(graph.outputs)
+        self._columns = self.fields + tuple(f"_state{i}" for i in range(graph.state_size))
+        self.buffers: Dict[Tuple[str, str], IndicatorBuffer] = {}
+        self._changed_from: Dict[Tuple[str, str], int] = {}  # Thời gian mở nhỏ nhất đã thay đổi
+        self._lock = threading.Lock()
+
+        # Thống kê: số lần nối tiếp và số lần tính lại cả chuỗi
+        self.incremental_updates = 0
+        self.full_rebuilds = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self):
+        self.data_store.add_candle_listener(self.on_candles)
+
+    def detach(self):
+        self.data_store.remove_candle_listener(self.on_candles)
+        with self._lock:
+            self.buffers.clear()
+            self._changed_from.clear()
+
+    def on_candles(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray):
+        """Listener của DataStore: chỉ ghi nhận thời điểm thay đổi, tính khi được đọc"""
+        key = (symbol, timeframe)
+        if key not in self.buffers or not len(timestamps):
+            return
+        with self._lock:
+            first = int(timestamps[0])
+            self._changed_from[key] = min(first, self._changed_from.get(key, first))
+
+    def _write(self, history: IndicatorBuffer, timestamps: np.ndarray, start: int,
+               outputs: Dict[str, np.ndarray], states: np.ndarray):
+        rows = np.vstack([outputs[field] for field in self.fields] + [states])
+        history.upsert_block(timestamps[start:], rows)
+
+    def _rebuild(self, history: IndicatorBuffer, candles: CandleBuffer):
+        self.full_rebuilds += 1
+        history.clear()
+        columns = self.graph.buffer_columns(candles, self.graph.sources)
+        outputs, states = self.graph.evaluate_tail(columns, 0)
+        self._write(history, candles.timestamps(), 0, outputs, states)
+
+    def _extend(self, history: IndicatorBuffer, candles: CandleBuffer, start: int) -> bool:
+        """Tính lại các hàng từ vị trí start của buffer nến; False nếu không nối tiếp được"""
+        timestamps = candles.timestamps()
+        if start == 0 or len(timestamps) - start > MAX_INCREMENTAL_ROWS:
+            return False
+
+        # Các hàng trước phần thay đổi phải khớp với nến (cùng thời gian mở, cùng số hàng)
+        found = history.search(int(timestamps[0]), int(timestamps[start - 1]) + 1)
+        if found.stop - found.start != start:
+            return False
+        states = history.values()[len(self.fields):, found]
+
+        columns = self.graph.buffer_columns(candles, self.graph.sources)
+        outputs, new_states = self.graph.evaluate_tail(columns, start, states)
+        self._write(history, timestamps, start, outputs, new_states)
+        self.incremental_updates += 1
+        return True
+
+    def get_buffer(self, symbol: str, timeframe: str) -> Optional[IndicatorBuffer]:
+        """Buffer chỉ báo đã đồng bộ với nến hiện tại của series (gồm cả hàng trạng thái)"""
+        key = (symbol, timeframe)
+        candles = self.data_store.get_candle_buffer(symbol, timeframe)
+        if candles is None or not len(candles):
+            return None
+        with self._lock:
+            try:
+                history = self.buffers.get(key)
+                if history is None:
+                    history = self.buffers[key] = IndicatorBuffer(candles.capacity, self._columns)
+                    self._rebuild(history, candles)
+                elif key in self._changed_from:
+                    changed_from = self._changed_from.pop(key)
+                    if history.capacity != candles.capacity:
+                        history.resize(candles.capacity)
+                    start = candles.search(changed_from).start
+                    if not self._extend(history, candles, start):
+                        self._rebuild(history, candles)
+                return history
+            except Exception as e:
+                self.logger.error(f"Lỗi cập nhật chuỗi chỉ báo {symbol} {timeframe}: {e}")
+                self.buffers.pop(key, None)
+                self._changed_from.pop(key, None)
+                return None
+
+    def between(self, symbol: str, timeframe: str, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(timestamps, values) các hàng có start <= thời gian mở < end, là view không copy
+
+        values có shape (len(fields), n) theo thứ tự self.fields.
+        """
+        history = self.get_buffer(symbol, timeframe)
+        if history is None:
+            return None
+        timestamps, values = history.between(
+            datetime_to_ms(start) if start else None,
+            datetime_to_ms(end) if end else None
+        )
+        return timestamps, values[:len(self.fields)]
+
+    def to_dataframe(self, symbol: str, timeframe: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+        """DataFrame (copy) của chuỗi chỉ báo, cột timestamp giống get_market_data"""
+        history = self.get_buffer(symbol, timeframe)
+        if history is None:
+            return None
+        df = history.to_dataframe(
+            start=datetime_to_ms(start) if start else None,
+            end=datetime_to_ms(end) if end else None
+        )
+        return df[['timestamp', *self.fields]]
@@ -0,0 +1,215 @@
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Tuple
+
+try:
+    from numba import njit
+except ImportError:  # numba là tùy chọn, dùng kernel NumPy thuần nếu chưa cài
+    njit = None
+
+# Kernel chỉ báo trên mảng float64 liền mạch, kết quả giống pandas rolling/ewm.
+# Mảng trả về cùng độ dài với đầu vào, NaN ở các vị trí chưa đủ dữ liệu. Giá đầu vào
+# (close) không chứa NaN; riêng ema/ema_matrix chấp nhận NaN ở đầu chuỗi.
+
+# Số nến tối thiểu để tạo TechnicalIndicators, dùng chung cho mọi đường tính (DAG, batch, streaming)
+MIN_CANDLES = 50
+
+def _as_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def _rolling_sum(values: np.ndarray, period: int) -> np.ndarray:
+    """Tổng trượt period phần tử qua cumsum, NaN với period - 1 phần tử đầu"""
+    result = np.full(len(values), np.nan)
+    if period <= 0 or len(values) < period:
+        return result
+    cumulative = np.cumsum(values)
+    result[period - 1] = cumulative[period - 1]
+    result[period:] = cumulative[period:] - cumulative[:-period]
+    return result
+
+def sma(values, period: int) -> np.ndarray:
+    """Trung bình trượt (như Series.rolling(period).mean())"""
+    values = _as_array(values)
+    if not len(values):
+        return values.copy()
+    # Trừ giá đầu tiên để tổng tích lũy nhỏ, giảm sai số làm tròn
+    base = values[0]
+    return _rolling_sum(values - base, period) / period + base
+
+def rolling_std(values, period: int, ddof: int = 1) -> np.ndarray:
+    """Độ lệch chuẩn trượt (như Series.rolling(period).std()) qua cumsum của x và x²"""
+    values = _as_array(values)
+    if not len(values) or period <= ddof:
+        return np.full(len(values), np.nan)
+    centered = values - values[0]
+    total = _rolling_sum(centered, period)
+    squares = _rolling_sum(centered * centered, period)
+    variance = (squares - total * total / period) / (period - ddof)
+    np.maximum(variance, 0.0, out=variance)
+    return np.sqrt(variance)
+
+def ema_matrix(values: np.ndarray, span: int, block: int = None) -> np.ndarray:
+    """EMA theo từng hàng như pandas ewm(span, adjust=True), NaN ở đầu hàng được bỏ qua
+
+    Chuỗi được chia thành các khối block cột. Tử số trong mỗi khối là một phép nhân
+    với ma trận Toeplitz tam giác của decay^k (mọi khối cùng lúc); phần mang sang
+    giữa các khối cũng là một phép nhân Toeplitz trên số khối. Không có vòng lặp
+    Python theo nến. Mẫu số có dạng đóng (1 - decay^(k+1)) / (1 - decay).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    decay = 1 - 2 / (span + 1)
+    rows, width = values.shape
+    if width == 0:
+        return np.empty((rows, 0))
+    if block is None:
+        block = max(8, math.isqrt(width))
+    blocks = -(-width // block)
+    padding = blocks * block - width
+
+    valid = ~np.isnan(values)
+    # Đệm 0 ở đầu để chia đều thành khối (giá trị 0 không đóng góp vào tử số)
+    padded = np.zeros((rows, blocks * block))
+    padded[:, padding:] = np.where(valid, values, 0.0)
+    lags = np.arange(block)
+    toeplitz = np.triu(decay ** np.maximum(lags[None, :] - lags[:, None], 0))
+    numerator = padded.reshape(rows, blocks, block) @ toeplitz
+
+    # Giá trị cuối mỗi khối sau khi cộng phần mang sang: EMA (không chuẩn hóa) theo khối
+    block_lags = np.arange(blocks)
+    block_toeplitz = np.triu((decay ** block) ** np.maximum(block_lags[None, :] - block_lags[:, None], 0))
+    carry = numerator[:, :, -1] @ block_toeplitz
+    numerator[:, 1:] += carry[:, :-1, None] * (decay ** (lags + 1))
+    numerator = numerator.reshape(rows, -1)[:, padding:]
+
+    table = (1 - decay ** np.arange(1, width + 1)) / (1 - decay)
+    denominator = np.broadcast_to(table, values.shape)
+    first = width - valid.sum(axis=1)
+    if first.any():
+        denominator = np.zeros(values.shape)
+        for row, offset in enumerate(first.tolist()):
+            denominator[row, offset:] = table[:width - offset]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return numerator / denominator
+
+@lru_cache(maxsize=64)
+def _ema_tables(decay: float, width: int) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Bảng lũy thừa dùng chung cho _ema_cumsum (độ dài đoạn, decay^-i, decay^i, mẫu số)"""
+    chunk = max(1, min(width, int(100 * math.log(10) / -math.log(decay)) if decay > 0 else 1))
+    exponents = np.arange(chunk, dtype=np.float64)
+    denominator = (1 - decay ** np.arange(1, width + 1)) / (1 - decay)
+    return chunk, decay ** -exponents, decay ** exponents, denominator
+
+def _decayed_cumsum(filled: np.ndarray, decay: float) -> np.ndarray:
+    """Tử số EMA Σ x_i * decay^(t-i) tại mọi t bằng cumsum có co giãn: decay^t * Σ x_i * decay^-i,
+    chia thành đoạn để decay^-i không vượt quá 1e100
+    """
+    width = len(filled)
+    chunk, growth, shrink, _ = _ema_tables(decay, width)
+    numerator = np.empty(width)
+    carry = 0.0
+    for start in range(0, width, chunk):
+        count = min(chunk, width - start)
+        part = np.cumsum(filled[start:start + count] * growth[:count])
+        part *= shrink[:count]
+        if carry:
+            part += carry * decay * shrink[:count]
+        numerator[start:start + count] = part
+        carry = part[-1]
+    return numerator
+
+def decayed_sum(values, decay: float) -> np.ndarray:
+    """Σ x_i * decay^(t-i) tại mọi t (tử số của EMA adjust=True), NaN tính như 0"""
+    values = _as_array(values)
+    if not len(values):
+        return np.empty(0)
+    return _decayed_cumsum(np.where(np.isnan(values), 0.0, values), decay)
+
+def _ema_cumsum(values: np.ndarray, decay: float) -> np.ndarray:
+    """EMA adjust=True của chuỗi 1 chiều: tử số qua _decayed_cumsum, mẫu số dạng đóng"""
+    width = len(values)
+    if width == 0:
+        return np.empty(0)
+    table = _ema_tables(decay, width)[3]
+    valid = ~np.isnan(values)
+    numerator = _decayed_cumsum(np.where(valid, values, 0.0), decay)
+
+    if valid[0]:
+        denominator = table
+    else:
+        # NaN ở đầu chuỗi: mẫu số bắt đầu từ giá trị hợp lệ đầu tiên
+        first = int(np.argmax(valid)) if valid.any() else width
+        denominator = np.zeros(width)
+        denominator[first:] = table[:width - first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return numerator / denominator
+
+def _ema_loop(values: np.ndarray, decay: float, out: np.ndarray):
+    """EMA adjust=True bằng công thức đệ quy (được numba biên dịch nếu có)"""
+    numerator = 0.0
+    denominator = 0.0
+    for i in range(values.shape[0]):
+        x = values[i]
+        numerator *= decay
+        denominator *= decay
+        if not math.isnan(x):
+            numerator += x
+            denominator += 1.0
+        out[i] = numerator / denominator if denominator > 0 else math.nan
+
+if njit is not None:
+    _ema_loop = njit(cache=True, nogil=True)(_ema_loop)
+
+def ema(values, span: int) -> np.ndarray:
+    """Trung bình lũy thừa (như Series.ewm(span=span).mean())"""
+    values = _as_array(values)
+    if njit is None:
+        return _ema_cumsum(values, 1 - 2 / (span + 1))
+    out = np.empty(len(values))
+    _ema_loop(values, 1 - 2 / (span + 1), out)
+    return out
+
+def wilder(values, period: int) -> np.ndarray:
+    """Trung bình Wilder/RMA (như Series.ewm(alpha=1/period, adjust=False).mean())
+
+    Với y_f = x_f tại giá trị hợp lệ đầu tiên: y_t = alpha * Σ x_i * decay^(t-i) + decay^(t-f+1) * x_f,
+    nên dùng lại tử số của EMA. NaN chỉ được phép ở đầu chuỗi.
+    """
+    values = _as_array(values)
+    valid = ~np.isnan(values)
+    result = np.full(len(values), np.nan)
+    if not valid.any():
+        return result
+    first = int(np.argmax(valid))
+    tail = values[first:]
+    alpha = 1 / period
+    decay = 1 - alpha
+    numerator = _decayed_cumsum(tail, decay)
+    result[first:] = alpha * numerator + decay ** np.arange(1, len(tail) + 1) * tail[0]
+    return result
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """RSI theo trung bình cộng gain/loss (như TechnicalAnalyzer.calculate_rsi)"""
+    close = _as_array(close)
+    delta = np.diff(close, prepend=close[:1])  # Nến đầu tiên: delta = 0
+    gain = _rolling_sum(np.maximum(delta, 0.0), period)
+    loss = _rolling_sum(np.maximum(-delta, 0.0), period)
+    # Cửa sổ toàn 0 có thể ra số âm rất nhỏ qua cumsum: kẹp về 0 để RSI giữ ngữ nghĩa 0/0, x/0
+    np.maximum(gain, 0.0, out=gain)
+    np.maximum(loss, 0.0, out=loss)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line, histogram"""
+    close = _as_array(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+def bollinger(close, period: int = 20, std: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger Bands (upper, middle, lower) với độ lệch chuẩn mẫu"""
+    close = _as_array(close)
+    middle = sma(close, period)
+    band = rolling_std(close, period) * std
+    return middle + band, middle, middle - band
@@ -0,0 +1,453 @@
+import numpy as np
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import indicator_kernels as kernels
+
+# Cột nguồn của một series nến (timestamp là thời gian mở, ms UTC)
+SOURCES = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Số ms trong một ngày: VWAP được neo lại từ đầu mỗi ngày UTC (phiên của Binance Futures)
+DAY_MS = 86_400_000
+
+class Node(NamedTuple):
+    """Một nút của DAG: phép tính, các nút đầu vào và tham số
+
+    Hai nút cùng phép tính, cùng đầu vào và tham số là một (so sánh theo giá trị),
+    nên EMA(12) của close mà MACD và chỉ báo khác cùng khai báo chỉ được tính một lần.
+    """
+    op: str
+    inputs: Tuple['Node', ...] = ()
+    params: tuple = ()
+
+def source(name: str) -> Node:
+    return Node('source', (), (name,))
+
+def node(op: str, *inputs: Node, params: tuple = ()) -> Node:
+    return Node(op, inputs, tuple(params))
+
+CLOSE = source('close')
+HIGH = source('high')
+LOW = source('low')
+VOLUME = source('volume')
+TIMESTAMP = source('timestamp')
+
+# ---------------------------------------------------------------- phép tính
+
+_OPS: Dict[str, Callable[..., np.ndarray]] = {}
+_LOOKBACKS: Dict[str, Callable[..., int]] = {}
+_STEPS: Dict[str, Tuple[int, Callable]] = {}
+
+def register_op(name: str, lookback: Optional[Callable[..., int]] = None):
+    """Đăng ký phép tính của nút: hàm(*mảng đầu vào, *tham số) -> mảng cùng độ dài
+
+    lookback(*tham số): số hàng đầu vào trước một hàng cần để tính hàng đó (mặc định 0,
+    phép tính theo từng phần tử). evaluate_tail tính lại phần đuôi trên cửa sổ cuối dài
+    thêm lookback hàng.
+    """
+    def decorator(func):
+        _OPS[name] = func
+        if lookback is not None:
+            _LOOKBACKS[name] = lookback
+        return func
+    return decorator
+
+def register_step(name: str, state_size: int):
+    """Đăng ký dạng nối tiếp của phép tính đệ quy (EMA, Wilder, tích lũy)
+
+    step(state, *mảng đầu vào, *tham số) -> (đầu ra, trạng thái shape (state_size, n)):
+    state là trạng thái tại hàng ngay trước đầu vào, None ở đầu chuỗi. Phép tính chưa
+    đăng ký dạng cả chuỗi thì dùng step(None, ...).
+    """
+    def decorator(step):
+        _STEPS[name] = (state_size, step)
+        _OPS.setdefault(name, lambda *args: step(None, *args)[0])
+        return step
+    return decorator
+
+def _after_leading_nan(func, values: np.ndarray, period: int) -> np.ndarray:
+    """Áp kernel rolling từ giá trị hợp lệ đầu tiên (đầu vào là đầu ra của nút khác có NaN ở đầu)"""
+    valid = ~np.isnan(values)
+    if valid.all():
+        return func(values, period)
+    result = np.full(len(values), np.nan)
+    if valid.any():
+        first = int(np.argmax(valid))
+        result[first:] = func(values[first:], period)
+    return result
+
+def _period_lookback(period):
+    return period - 1
+
+@register_op('sma', _period_lookback)
+def _sma(values, period):
+    return _after_leading_nan(kernels.sma, values, period)
+
+@register_op('std', _period_lookback)
+def _std(values, period):
+    return _after_leading_nan(kernels.rolling_std, values, period)
+
+@register_op('ema')
+def _ema(values, span):
+    return kernels.ema(values, span)
+
+@register_step('ema', 2)
+def _ema_step(state, values, span):
+    # Trạng thái: tử số và mẫu số của EMA adjust=True (NaN ở đầu chuỗi không được tính)
+    decay = 1 - 2 / (span + 1)
+    numerator = kernels.decayed_sum(values, decay)
+    denominator = kernels.decayed_sum(~np.isnan(values), decay)
+    if state is not None:
+        carry = decay ** np.arange(1, len(values) + 1)
+        numerator += carry * state[0]
+        denominator += carry * state[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(denominator > 0, numerator / denominator, np.nan)
+    return result, np.vstack([numerator, denominator])
+
+@register_op('wilder')
+def _wilder(values, period):
+    return kernels.wilder(values, period)
+
+@register_step('wilder', 1)
+def _wilder_step(state, values, period):
+    # Giá trị trước làm phần tử đầu: kernel đặt y_0 = x_0 rồi nối tiếp y_t = decay * y_(t-1) + alpha * x_t
+    if state is None or np.isnan(state[0]):
+        result = kernels.wilder(values, period)
+    else:
+        result = kernels.wilder(np.concatenate([state, values]), period)[1:]
+    return result, result[None, :]
+
+def _rolling_extreme(values: np.ndarray, period: int, combine) -> np.ndarray:
+    """Max/min trượt bằng log2(period) phép so sánh cả mảng (cửa sổ tăng gấp đôi mỗi bước)"""
+    result = np.full(len(values), np.nan)
+    if len(values) < period:
+        return result
+    span, extreme = 1, values
+    while span * 2 <= period:
+        # extreme[i] là max/min của values[i:i + span]
+        extreme = combine(extreme[:-span], extreme[span:])
+        span *= 2
+    if span < period:
+        # Ghép hai cửa sổ span chồng nhau phủ đúng [i, i + period)
+        rest = period - span
+        extreme = combine(extreme[:len(extreme) - rest], extreme[rest:])
+    result[period - 1:] = extreme
+    return result
+
+@register_op('rolling_max', _period_lookback)
+def _rolling_max(values, period):
+    return _rolling_extreme(values, period, np.maximum)
+
+@register_op('rolling_min', _period_lookback)
+def _rolling_min(values, period):
+    return _rolling_extreme(values, period, np.minimum)
+
+@register_op('diff', lambda: 1)
+def _diff(values):
+    return np.diff(values, prepend=values[:1])  # Nến đầu tiên: delta = 0
+
+@register_op('gain')
+def _gain(delta):
+    return np.maximum(delta, 0.0)
+
+@register_op('loss')
+def _loss(delta):
+    return np.maximum(-delta, 0.0)
+
+@register_op('sub')
+def _sub(left, right):
+    return left - right
+
+@register_op('band')
+def _band(middle, deviation, multiplier):
+    return middle + deviation * multiplier
+
+@register_op('rsi')
+def _rsi(avg_gain, avg_loss):
+    # Cửa sổ toàn 0 có thể ra số âm rất nhỏ qua cumsum: kẹp về 0 để giữ ngữ nghĩa 0/0, x/0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + np.maximum(avg_gain, 0.0) / np.maximum(avg_loss, 0.0))
+
+@register_op('true_range', lambda: 1)
+def _true_range(high, low, close):
+    previous = np.concatenate([close[:1], close[:-1]])  # Nến đầu tiên: TR = high - low
+    return np.maximum(high, previous) - np.minimum(low, previous)
+
+@register_op('plus_dm')
+def _plus_dm(high_delta, low_delta):
+    up, down = high_delta, -low_delta
+    return np.where((up > down) & (up > 0), up, 0.0)
+
+@register_op('minus_dm')
+def _minus_dm(high_delta, low_delta):
+    up, down = high_delta, -low_delta
+    return np.where((down > up) & (down > 0), down, 0.0)
+
+@register_op('ratio100')
+def _ratio100(numerator, denominator):
+    """100 * a / b, bằng 0 khi b = 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, 100 * numerator / denominator, 0.0)
+
+@register_op('dx')
+def _dx(plus_di, minus_di):
+    total = plus_di + minus_di
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, 100 * np.abs(plus_di - minus_di) / total, 0.0)
+
+@register_op('stoch')
+def _stoch(close, highest, lowest):
+    # Cửa sổ phẳng (highest = lowest): %K = 50 để %D không bị NaN giữa chuỗi
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(spread > 0, 100 * (close - lowest) / spread, np.where(np.isnan(spread), np.nan, 50.0))
+
+@register_step('vwap', 3)
+def _vwap(state, timestamps, high, low, close, volume):
+    # Trạng thái: ngày UTC, tổng giá × khối lượng và tổng khối lượng từ đầu ngày
+    typical = (high + low + close) / 3
+    if not len(typical):
+        return typical, np.empty((3, 0))
+    day = timestamps.astype(np.int64) // DAY_MS
+    starts = np.flatnonzero(np.concatenate([[True], day[1:] != day[:-1]]))
+    lengths = np.diff(np.append(starts, len(day)))
+    cum_pv = np.cumsum(typical * volume)
+    cum_v = np.cumsum(volume)
+    if state is not None and day[0] == state[0]:
+        # Cùng ngày với hàng trước: nối tiếp tổng tích lũy (các ngày sau trừ lại ở dưới)
+        cum_pv += state[1]
+        cum_v += state[2]
+    # Trừ phần tích lũy trước đầu ngày để mỗi ngày bắt đầu lại từ 0
+    before = starts - 1
+    offset_pv = np.repeat(np.where(before >= 0, cum_pv[before], 0.0), lengths)
+    offset_v = np.repeat(np.where(before >= 0, cum_v[before], 0.0), lengths)
+    pv, v = cum_pv - offset_pv, cum_v - offset_v
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(v > 0, pv / v, typical)
+    return result, np.vstack([day.astype(np.float64), pv, v])
+
+@register_step('obv', 1)
+def _obv(state, delta, volume):
+    result = np.cumsum(np.sign(delta) * volume)
+    if state is not None:
+        result += state[0]
+    return result, result[None, :]
+
+# ---------------------------------------------------------------- chỉ báo
+
+class IndicatorSpec(NamedTuple):
+    name: str
+    fields: Tuple[str, ...]
+    build: Callable[[Dict], Dict[str, Node]]
+
+INDICATORS: Dict[str, IndicatorSpec] = {}
+
+def register_indicator(name: str, fields: Sequence[str]):
+    """Đăng ký chỉ báo: hàm build(config) trả về {tên trường: nút đầu ra}"""
+    def decorator(build):
+        INDICATORS[name] = IndicatorSpec(name, tuple(fields), build)
+        return build
+    return decorator
+
+def _ema_node(config: Dict, key: str, default: int) -> Node:
+    return node('ema', CLOSE, params=(config.get(key, default),))
+
+def _true_range() -> Node:
+    return node('true_range', HIGH, LOW, CLOSE)
+
+@register_indicator('rsi', ('rsi',))
+def _build_rsi(config):
+    period = config.get('rsi_period', 14)
+    delta = node('diff', CLOSE)
+    return {'rsi': node('rsi',
+                        node('sma', node('gain', delta), params=(period,)),
+                        node('sma', node('loss', delta), params=(period,)))}
+
+@register_indicator('ma', ('ma_fast', 'ma_slow'))
+def _build_ma(config):
+    return {
+        'ma_fast': node('sma', CLOSE, params=(config.get('ma_fast', 10),)),
+        'ma_slow': node('sma', CLOSE, params=(config.get('ma_slow', 20),)),
+    }
+
+@register_indicator('macd', ('macd', 'macd_signal', 'macd_histogram'))
+def _build_macd(config):
+    line = node('sub', _ema_node(config, 'macd_fast', 12), _ema_node(config, 'macd_slow', 26))
+    signal = node('ema', line, params=(config.get('macd_signal', 9),))
+    return {'macd': line, 'macd_signal': signal, 'macd_histogram': node('sub', line, signal)}
+
+@register_indicator('bollinger', ('bb_upper', 'bb_middle', 'bb_lower'))
+def _build_bollinger(config):
+    period = config.get('bb_period', 20)
+    width = config.get('bb_std', 2)
+    middle = node('sma', CLOSE, params=(period,))  # Trùng với ma_slow khi cùng chu kỳ
+    deviation = node('std', CLOSE, params=(period,))
+    return {
+        'bb_upper': node('band', middle, deviation, params=(width,)),
+        'bb_middle': middle,
+        'bb_lower': node('band', middle, deviation, params=(-width,)),
+    }
+
+@register_indicator('atr', ('atr',))
+def _build_atr(config):
+    return {'atr': node('wilder', _true_range(), params=(config.get('atr_period', 14),))}
+
+@register_indicator('adx', ('adx', 'plus_di', 'minus_di'))
+def _build_adx(config):
+    period = config.get('adx_period', 14)
+    atr = node('wilder', _true_range(), params=(period,))  # Trùng với ATR khi cùng chu kỳ
+    high_delta, low_delta = node('diff', HIGH), node('diff', LOW)
+    plus_di = node('ratio100', node('wilder', node('plus_dm', high_delta, low_delta), params=(period,)), atr)
+    minus_di = node('ratio100', node('wilder', node('minus_dm', high_delta, low_delta), params=(period,)), atr)
+    return {
+        'adx': node('wilder', node('dx', plus_di, minus_di), params=(period,)),
+        'plus_di': plus_di,
+        'minus_di': minus_di,
+    }
+
+@register_indicator('stochastic', ('stoch_k', 'stoch_d'))
+def _build_stochastic(config):
+    period = config.get('stoch_period', 14)
+    stoch_k = node('stoch', CLOSE,
+                   node('rolling_max', HIGH, params=(period,)),
+                   node('rolling_min', LOW, params=(period,)))
+    return {'stoch_k': stoch_k, 'stoch_d': node('sma', stoch_k, params=(config.get('stoch_smooth', 3),))}
+
+@register_indicator('vwap', ('vwap',))
+def _build_vwap(config):
+    return {'vwap': node('vwap', TIMESTAMP, HIGH, LOW, CLOSE, VOLUME)}
+
+@register_indicator('obv', ('obv',))
+def _build_obv(config):
+    return {'obv': node('obv', node('diff', CLOSE), VOLUME)}  # Dùng chung delta với RSI
+
+# Bốn chỉ báo có sẵn từ đầu (các trường gốc của TechnicalIndicators)
+BASE_INDICATORS = ('rsi', 'ma', 'macd', 'bollinger')
+
+# ---------------------------------------------------------------- DAG
+
+class IndicatorGraph:
+    """DAG các nút cần tính cho một tập chỉ báo với một cấu hình
+
+    Nút trùng nhau giữa các chỉ báo (EMA(n), SMA(n), true range...) được gộp lại và
+    sắp theo thứ tự topo một lần khi tạo; evaluate() tính mỗi nút đúng một lần cho
+    mỗi series.
+    """
+
+    def __init__(self, indicators_config: Dict, names: Optional[Iterable[str]] = None):
+        self.names = tuple(names) if names is not None else tuple(INDICATORS)
+        unknown = [name for name in self.names if name not in INDICATORS]
+        if unknown:
+            raise ValueError(f"Chỉ báo không hỗ trợ: {', '.join(unknown)}")
+
+        self.outputs: Dict[str, Node] = {}
+        for name in self.names:
+            self.outputs.update(INDICATORS[name].build(indicators_config))
+
+        # Số nút nếu mỗi chỉ báo tự tính phần trung gian của mình (để so sánh)
+        self.declared_nodes = 0
+        self.order: List[Node] = []
+        visited = set()
+        for name in self.names:
+            own = set()
+            for output in INDICATORS[name].build(indicators_config).values():
+                self._visit(output, own, [])
+            self.declared_nodes += sum(1 for item in own if item.op != 'source')
+        for output in self.outputs.values():
+            self._visit(output, visited, self.order)
+
+        self.sources = tuple(item.params[0] for item in self.order if item.op == 'source')
+
+        # Nút đệ quy (EMA, Wilder, tích lũy): trạng thái theo hàng của chúng, theo thứ tự self.order
+        self.stateful = [item for item in self.order if item.op in _STEPS]
+        self.state_size = sum(_STEPS[item.op][0] for item in self.stateful)
+
+        # Số hàng trước start mà mỗi nút cần có để tính lại đầu ra từ start (evaluate_tail)
+        self.depth: Dict[Node, int] = {output: 0 for output in self.outputs.values()}
+        for item in reversed(self.order):
+            need = self.depth[item] + self._lookback(item)
+            for child in item.inputs:
+                self.depth[child] = max(self.depth.get(child, need), need)
+
+    @staticmethod
+    def _visit(item: Node, visited: set, order: List[Node]):
+        """DFS hậu thứ tự: đầu vào được thêm trước nút dùng nó"""
+        if item in visited:
+            return
+        visited.add(item)
+        for child in item.inputs:
+            IndicatorGraph._visit(child, visited, order)
+        order.append(item)
+
+    @property
+    def node_count(self) -> int:
+        """Số nút tính toán thực sự (không kể cột nguồn)"""
+        return sum(1 for item in self.order if item.op != 'source')
+
+    def evaluate(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Chuỗi đầy đủ của mọi trường đầu ra; columns là các cột nguồn (float64, cùng độ dài)"""
+        values: Dict[Node, np.ndarray] = {}
+        for item in self.order:
+            if item.op == 'source':
+                values[item] = np.asarray(columns[item.params[0]], dtype=np.float64)
+            else:
+                values[item] = _OPS[item.op](*(values[child] for child in item.inputs), *item.params)
+        return {field: values[output] for field, output in self.outputs.items()}
+
+    def evaluate_tail(self, columns: Dict[str, np.ndarray], start: int,
+                      states: Optional[np.ndarray] = None) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Tính lại các hàng từ start, khi các hàng trước start không đổi so với lần tính trước
+
+        states: trạng thái (state_size, start) của các hàng trước start do lần tính trước
+        trả về (không cần khi start = 0). Nút rolling được tính trên cửa sổ cuối dài thêm
+        lookback hàng, nút đệ quy nối tiếp từ trạng thái của hàng trước. Trả về
+        (trường đầu ra -> start..n, trạng thái (state_size, n - start)).
+        """
+        # Hàng đầu tiên cần có của mỗi nút
+        first = {item: max(0, start - depth) for item, depth in self.depth.items()}
+
+        values: Dict[Node, np.ndarray] = {}
+        new_states = []
+        row = 0  # Hàng trạng thái đầu tiên của nút đệ quy đang tính
+        for item in self.order:
+            begin = first[item]
+            if item.op == 'source':
+                values[item] = np.asarray(columns[item.params[0]][begin:], dtype=np.float64)
+            elif item.op in _STEPS:
+                size, step = _STEPS[item.op]
+                inputs = (values[child][begin - first[child]:] for child in item.inputs)
+                previous = states[row:row + size, begin - 1] if begin > 0 else None
+                values[item], state = step(previous, *inputs, *item.params)
+                new_states.append(state[:, start - begin:])
+                row += size
+            else:
+                window = max(0, begin - self._lookback(item))
+                inputs = (values[child][window - first[child]:] for child in item.inputs)
+                values[item] = _OPS[item.op](*inputs, *item.params)[begin - window:]
+
+        outputs = {field: values[output][start - first[output]:] for field, output in self.outputs.items()}
+        length = len(columns[self.sources[0]]) - start
+        return outputs, np.vstack(new_states) if new_states else np.empty((0, length))
+
+    @staticmethod
+    def _lookback(item: Node) -> int:
+        if item.op == 'source' or item.op in _STEPS or item.op not in _LOOKBACKS:
+            return 0
+        return _LOOKBACKS[item.op](*item.params)
+
+    @staticmethod
+    def buffer_columns(buffer, names: Iterable[str], count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Cột nguồn của count nến cuối trong một CandleBuffer (view, không copy)"""
+        return {
+            name: buffer.timestamps(count) if name == 'timestamp' else buffer.column(name, count)
+            for name in names
+        }
+
+    def evaluate_buffer(self, buffer, count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """evaluate() trên count nến cuối của một CandleBuffer (view, không copy cột)"""
+        return self.evaluate(self.buffer_columns(buffer, self.sources, count))
+
+def fields_of(names: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Tên các trường đầu ra của tập chỉ báo (mặc định mọi chỉ báo đã đăng ký)"""
+    names = tuple(names) if names is not None else tuple(INDICATORS)
+    return tuple(field for name in names for field in INDICATORS[name].fields)
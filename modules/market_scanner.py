@@ -0,0 +1,153 @@
+import heapq
+import time
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .binance_connector import BinanceConnector
+from .data_models import DataStore, TradingSuggestion
+from .technical_analysis import TechnicalAnalyzer
+from .trading_strategy import MIN_CONFIDENCE, TradingStrategy
+from config.config import ConfigManager
+
+class TopSuggestions:
+    """Heap có giới hạn k đề xuất có độ tin cậy cao nhất
+
+    Gốc heap là đề xuất yếu nhất trong top; đề xuất mới chỉ vào được khi mạnh hơn
+    gốc. Cùng độ tin cậy thì đề xuất vào trước được giữ.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int, TradingSuggestion]] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    def threshold(self) -> float:
+        """Độ tin cậy đề xuất mới phải vượt để vào top (-inf khi heap chưa đầy)"""
+        return self._heap[0][0] if self.full() else float('-inf')
+
+    def push(self, suggestion: TradingSuggestion) -> bool:
+        """Thêm đề xuất, False nếu không vào được top"""
+        if self.k <= 0:
+            return False
+        self._count += 1
+        entry = (suggestion.confidence, -self._count, suggestion)
+        if not self.full():
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] <= self._heap[0][:2]:
+            return False
+        heapq.heapreplace(self._heap, entry)
+        return True
+
+    def ranked(self) -> List[TradingSuggestion]:
+        """Đề xuất theo độ tin cậy giảm dần"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+class MarketScanner:
+    """Quét toàn bộ hợp đồng perpetual USDT-M mỗi chu kỳ, giữ top-K đề xuất mạnh nhất
+
+    Danh sách symbol lấy từ exchangeInfo. Mỗi chu kỳ chỉ tính lại chỉ báo của các
+    series có nến mới (vector hóa theo timeframe trên ma trận giá đóng), chấm điểm
+    Scalp/Swing cho mọi symbol trên SignalMatrix, và chỉ dựng TradingSuggestion cho
+    các symbol có thể vào top-K.
+    """
+
+    def __init__(self, data_store: DataStore, connector: BinanceConnector, technical_analyzer: TechnicalAnalyzer,
+                 trading_strategy: TradingStrategy, config_manager: ConfigManager, top_k: int = 10,
+                 quote_asset: str = "USDT", max_symbols: Optional[int] = None):
+        self.data_store = data_store
+        self.connector = connector
+        self.technical_analyzer = technical_analyzer
+        self.trading_strategy = trading_strategy
+        self.config_manager = config_manager
+        self.top_k = top_k
+        self.quote_asset = quote_asset
+        self.max_symbols = max_symbols
+        self.symbols: List[str] = []
+        self.top: List[TradingSuggestion] = []
+
+        # Thống kê chu kỳ gần nhất
+        self.cycles = 0
+        self.last_cycle_cpu = 0.0
+        self.last_cycle_seconds = 0.0
+        self.last_analyzed = 0
+        self.last_candidates = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    async def discover(self) -> List[str]:
+        """Lấy danh sách perpetual từ exchangeInfo (giữ danh sách cũ nếu lỗi)"""
+        symbols = await self.connector.get_perpetual_symbols(self.quote_asset)
+        if symbols:
+            self.symbols = symbols[:self.max_symbols] if self.max_symbols else symbols
+            self.data_store.add_log(f"🔭 Scanner: {len(self.symbols)} hợp đồng perpetual {self.quote_asset}")
+        return self.symbols
+
+    def _analyze(self, trading_mode: str, timeframes: List[str]) -> int:
+        """Tính lại chỉ báo của các series đã thay đổi, gom theo timeframe; trả về số series đã tính"""
+        indicators_config = self.config_manager.get_indicators_config(trading_mode)
+        pending, _ = self.technical_analyzer.take_pending(self.symbols, timeframes, indicators_config)
+        by_timeframe: Dict[str, List[str]] = defaultdict(list)
+        for symbol, timeframe in pending:
+            by_timeframe[timeframe].append(symbol)
+        analyzed = 0
+        for timeframe, symbols in by_timeframe.items():
+            try:
+                analyzed += len(self.technical_analyzer.analyze_timeframe_vectorized(
+                    symbols, timeframe, indicators_config
+                ))
+            except Exception as e:
+                self.logger.error(f"Lỗi phân tích scanner {timeframe}: {e}")
+                self.technical_analyzer.mark_dirty((symbol, timeframe) for symbol in symbols)
+        return analyzed
+
+    def scan(self, trading_mode: str) -> List[TradingSuggestion]:
+        """Một chu kỳ quét: trả về top-K đề xuất theo độ tin cậy giảm dần"""
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        try:
+            timeframes = self.config_manager.get_timeframes_for_mode(trading_mode)
+            self.last_analyzed = self._analyze(trading_mode, timeframes)
+
+            # Chấm điểm mọi symbol trên ma trận tín hiệu
+            matrix = self.technical_analyzer.get_signal_matrix(self.symbols, timeframes, trading_mode)
+            is_scalp = trading_mode.lower() == "scalp"
+            strategy = self.trading_strategy
+            direction, confidence = strategy.scalp_decisions(matrix) if is_scalp else strategy.swing_decisions(matrix)
+            candidates = np.flatnonzero((direction != 0) & (confidence > MIN_CONFIDENCE))
+            self.last_candidates = len(candidates)
+
+            # Xét từ độ tin cậy cao xuống, dừng khi không còn ứng viên nào vượt được top-K
+            top = TopSuggestions(self.top_k)
+            config_dict = strategy.suggestion_config()
+            generate = strategy.generate_scalp_suggestion if is_scalp else strategy.generate_swing_suggestion
+            for row in candidates[np.argsort(-confidence[candidates], kind='stable')].tolist():
+                if confidence[row] <= top.threshold():
+                    break
+                suggestion = generate(matrix.symbols[row], matrix, config_dict)
+                if suggestion:
+                    top.push(suggestion)
+
+            self.top = top.ranked()
+            for suggestion in self.top:
+                self.data_store.add_suggestion(suggestion)
+            if self.top:
+                best = ", ".join(f"{s.symbol.replace('USDT', '')} {s.direction} {s.confidence:.0%}" for s in self.top[:3])
+                self.data_store.add_log(f"🔭 Top {len(self.top)}/{len(self.symbols)} {trading_mode}: {best}")
+            return self.top
+
+        except Exception as e:
+            self.logger.error(f"Lỗi chu kỳ scanner: {e}")
+            self.data_store.add_log(f"❌ Lỗi scanner: {str(e)}")
+            return self.top
+        finally:
+            self.cycles += 1
+            self.last_cycle_cpu = time.process_time() - cpu_start
+            self.last_cycle_seconds = time.perf_counter() - wall_start
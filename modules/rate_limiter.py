@@ -0,0 +1,118 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import logging
+
+# Weight của các endpoint Binance Futures đang dùng (khi có tham số symbol)
+ENDPOINT_WEIGHTS: Dict[str, int] = {
+    "/fapi/v1/ping": 1,
+    "/fapi/v1/ticker/price": 1,
+    "/fapi/v1/ticker/24hr": 1,
+    "/fapi/v1/exchangeInfo": 1,
+}
+
+# Weight khi gọi không có tham số symbol (trả về toàn bộ thị trường)
+BULK_ENDPOINT_WEIGHTS: Dict[str, int] = {
+    "/fapi/v1/ticker/price": 2,
+    "/fapi/v1/ticker/24hr": 40,
+}
+
+def klines_weight(limit: int) -> int:
+    """Weight của /fapi/v1/klines phụ thuộc vào limit"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+class WeightRateLimiter:
+    """Token bucket theo request weight của Binance
+
+    - Bucket được nạp lại đều theo weight_limit mỗi phút (có chừa safety_margin)
+    - Đồng bộ với header X-MBX-USED-WEIGHT-1m mà server trả về
+    - Giới hạn số request đồng thời
+    - Tạm dừng toàn bộ request khi nhận 429 (rate limit) hoặc 418 (IP bị ban)
+    """
+
+    def __init__(self, weight_limit: int = 2400, max_concurrency: int = 10, safety_margin: float = 0.9):
+        self.weight_limit = weight_limit
+        self.capacity = weight_limit * safety_margin
+        self.refill_rate = self.capacity / 60.0  # weight mỗi giây
+        self.max_concurrency = max_concurrency
+
+        self.tokens = self.capacity
+        self.used_weight = 0  # Giá trị X-MBX-USED-WEIGHT-1m gần nhất
+        self.blocked_until = 0.0
+        self.backoff_count = 0
+        self._last_refill = time.monotonic()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def _refill(self):
+        """Nạp lại token theo thời gian trôi qua"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    async def acquire(self, weight: int = 1):
+        """Chờ đến khi đủ weight để gửi request"""
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self._refill()
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return
+
+            await asyncio.sleep((weight - self.tokens) / self.refill_rate)
+
+    @asynccontextmanager
+    async def limit(self, weight: int = 1):
+        """Context manager: giới hạn đồng thời + trừ weight trước khi gửi request"""
+        # Tạo semaphore khi đã ở trong event loop (Python 3.8/3.9 gắn semaphore với loop lúc tạo)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            await self.acquire(weight)
+            yield
+
+    def update_from_headers(self, headers):
+        """Đồng bộ bucket với weight đã dùng mà server báo về"""
+        used = headers.get("X-MBX-USED-WEIGHT-1m") or headers.get("x-mbx-used-weight-1m")
+        if used is None:
+            return
+        try:
+            self.used_weight = int(used)
+        except ValueError:
+            return
+
+        self._refill()
+        self.tokens = min(self.tokens, self.capacity - self.used_weight)
+
+    def backoff(self, status: int, retry_after: Optional[str] = None) -> float:
+        """Tạm dừng gửi request sau khi nhận 429/418, trả về số giây chờ"""
+        self.backoff_count += 1
+        try:
+            delay = float(retry_after) if retry_after else 0.0
+        except ValueError:
+            delay = 0.0
+
+        if delay <= 0:
+            # 418 nghĩa là IP đã bị ban: chờ lâu hơn nhiều
+            delay = 120.0 if status == 418 else min(60.0, 2.0 ** self.backoff_count)
+
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.logger.warning(f"Binance trả về {status}, tạm dừng request {delay:.0f}s")
+        return delay
+
+    def reset_backoff(self):
+        """Đặt lại bộ đếm backoff sau request thành công"""
+        self.backoff_count = 0
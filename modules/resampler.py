@@ -0,0 +1,178 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from .candle_store import bucket_start, interval_to_ms
+from .data_models import DataStore
+
+class _FormingBar:
+    """Trạng thái nến lớn đang hình thành: phần đã chốt + nến nguồn mới nhất"""
+
+    __slots__ = ('open_time', 'source_time', 'open', 'high', 'low', 'volume', 'last', 'complete')
+
+    def __init__(self, open_time: int, source_time: int, last: np.ndarray, complete: bool = True):
+        self.open_time = open_time
+        self.source_time = source_time  # Thời gian mở của nến nguồn mới nhất
+        self.open: Optional[float] = None  # Giá mở của nến nguồn đầu tiên đã chốt
+        self.high = -np.inf
+        self.low = np.inf
+        self.volume = 0.0
+        self.last = last  # OHLCV của nến nguồn mới nhất (có thể còn thay đổi)
+        self.complete = complete  # False nếu thiếu nến nguồn đầu bucket: theo dõi nhưng không ghi
+
+    def seal_last(self):
+        """Chốt nến nguồn mới nhất vào phần đã chốt"""
+        o, h, l, _, v = self.last
+        if self.open is None:
+            self.open = float(o)
+        self.high = max(self.high, float(h))
+        self.low = min(self.low, float(l))
+        self.volume += float(v)
+
+    def bar(self) -> Tuple[float, float, float, float, float]:
+        o, h, l, c, v = (float(x) for x in self.last)
+        return (o if self.open is None else self.open, max(self.high, h), min(self.low, l), c, self.volume + v)
+
+class CandleResampler:
+    """Tạo nến khung lớn (5m, 15m, 1h, 4h, 1d...) từ nến 1m trong DataStore
+
+    Lắng nghe mọi lần ghi nến nguồn. Cập nhật nến nguồn đang hình thành hoặc nến
+    nguồn kế tiếp trong cùng bucket chỉ tốn O(1) cho mỗi khung đích. Khối nến
+    (tải lịch sử, đồng bộ lại) hoặc nến đến không theo thứ tự sẽ tính lại các
+    bucket bị ảnh hưởng từ buffer nguồn. Bucket căn theo Binance (bucket_start).
+    Bucket chưa có đủ nến nguồn từ đầu bucket sẽ không được ghi để không đè lên
+    nến đúng lấy từ sàn.
+    """
+
+    def __init__(self, data_store: DataStore, source_timeframe: str = "1m",
+                 target_timeframes: Sequence[str] = ("5m", "15m", "30m", "1h", "4h", "1d")):
+        source_ms = interval_to_ms(source_timeframe)
+        for timeframe in target_timeframes:
+            step = interval_to_ms(timeframe)
+            if step <= source_ms or step % source_ms:
+                raise ValueError(f"Không thể tạo {timeframe} từ {source_timeframe}")
+
+        self.data_store = data_store
+        self.source_timeframe = source_timeframe
+        self.source_ms = source_ms
+        self.target_timeframes = list(target_timeframes)
+        self._forming: Dict[Tuple[str, str], _FormingBar] = {}
+
+        # Thống kê: số lần cập nhật nhanh O(1) và số lần tính lại từ buffer
+        self.fast_updates = 0
+        self.rebuilds = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def derivable_timeframes(source_timeframe: str, timeframes: Sequence[str]) -> List[str]:
+        """Các timeframe trong danh sách có thể tạo từ source_timeframe"""
+        source_ms = interval_to_ms(source_timeframe)
+        return [
+            timeframe for timeframe in timeframes
+            if interval_to_ms(timeframe) > source_ms and interval_to_ms(timeframe) % source_ms == 0
+        ]
+
+    def source_lookback_days(self) -> float:
+        """Số ngày nến nguồn cần tải lúc khởi động để phủ từ đầu bucket lớn nhất
+
+        Bucket đang hình thành chỉ được ghi khi có đủ nến nguồn từ đầu bucket, nên
+        thiếu phần đầu thì nến khung lớn lấy từ sàn đứng yên đến bucket sau.
+        """
+        return max(interval_to_ms(timeframe) for timeframe in self.target_timeframes) / 86_400_000
+
+    def attach(self):
+        """Bắt đầu lắng nghe nến nguồn; buffer nguồn được nới đủ chứa bucket lớn nhất"""
+        largest = max(interval_to_ms(timeframe) for timeframe in self.target_timeframes)
+        self.data_store.ensure_capacity(self.source_timeframe, largest // self.source_ms + 1)
+        self.data_store.add_candle_listener(self.on_candles)
+
+    def detach(self):
+        self.data_store.remove_candle_listener(self.on_candles)
+        self._forming.clear()
+
+    def on_candles(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray):
+        """Listener của DataStore"""
+        if timeframe != self.source_timeframe or not len(timestamps):
+            return
+        try:
+            if len(timestamps) == 1:
+                for target in self.target_timeframes:
+                    self._update_one(symbol, target, int(timestamps[0]), values[:, 0])
+            else:
+                for target in self.target_timeframes:
+                    self.rebuild(symbol, target, int(timestamps[0]), int(timestamps[-1]))
+        except Exception as e:
+            self.logger.error(f"Lỗi resample {symbol} {timeframe}: {e}")
+
+    def _update_one(self, symbol: str, target: str, source_time: int, candle: np.ndarray):
+        key = (symbol, target)
+        open_time = int(bucket_start(source_time, target))
+        forming = self._forming.get(key)
+
+        if forming is not None and forming.open_time == open_time and source_time == forming.source_time:
+            # Nến nguồn đang hình thành được cập nhật
+            forming.last = candle.copy()
+        elif forming is not None and forming.open_time == open_time and \
+                source_time == forming.source_time + self.source_ms:
+            # Nến nguồn kế tiếp trong cùng bucket
+            forming.seal_last()
+            forming.source_time = source_time
+            forming.last = candle.copy()
+        elif source_time == open_time and (forming is None or forming.open_time < open_time):
+            # Nến nguồn đầu tiên của bucket mới
+            forming = self._forming[key] = _FormingBar(open_time, source_time, candle.copy())
+        else:
+            # Thiếu nến hoặc nến cũ được sửa: tính lại bucket từ buffer
+            self.rebuild(symbol, target, source_time, source_time)
+            return
+
+        self.fast_updates += 1
+        if forming.complete:
+            self.data_store.upsert_candle(symbol, target, open_time, *forming.bar())
+
+    def rebuild(self, symbol: str, target: str, start_time: int, end_time: int) -> int:
+        """Tính lại các bucket của target chứa nến nguồn trong [start_time, end_time], trả về số bucket đã ghi"""
+        self.rebuilds += 1
+        buffer = self.data_store.get_candle_buffer(symbol, self.source_timeframe)
+        if buffer is None or not len(buffer):
+            return 0
+
+        step = interval_to_ms(target)
+        first_bucket = int(bucket_start(start_time, target))
+        timestamps, values = buffer.between(first_bucket, int(bucket_start(end_time, target)) + step)
+        if not len(timestamps):
+            return 0
+
+        buckets = bucket_start(timestamps, target)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(timestamps)]
+        bars = np.vstack([
+            values[0, starts],
+            np.maximum.reduceat(values[1], starts),
+            np.minimum.reduceat(values[2], starts),
+            values[3, ends - 1],
+            np.add.reduceat(values[4], starts),
+        ])
+        open_times = buckets[starts]
+
+        # Chỉ ghi bucket có nến nguồn từ đầu bucket (buffer có thể đã bỏ bớt phần đầu)
+        complete = open_times >= buffer.timestamps()[0]
+        written = int(complete.sum())
+        if written:
+            self.data_store.add_candles_block(symbol, target, open_times[complete], bars[:, complete])
+
+        # Khôi phục trạng thái O(1) cho bucket mới nhất
+        last_start = int(starts[-1])
+        forming = _FormingBar(int(open_times[-1]), int(timestamps[-1]), values[:, -1].copy(), bool(complete[-1]))
+        sealed = values[:, last_start:-1]
+        if sealed.shape[1]:
+            forming.open = float(sealed[0, 0])
+            forming.high = float(sealed[1].max())
+            forming.low = float(sealed[2].min())
+            forming.volume = float(sealed[4].sum())
+        key = (symbol, target)
+        current = self._forming.get(key)
+        if current is None or current.open_time <= forming.open_time:
+            self._forming[key] = forming
+        return written
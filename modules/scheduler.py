@@ -0,0 +1,145 @@
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .candle_store import bucket_start, interval_to_ms
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+class TimingWheel:
+    """Timing wheel phân cấp: đặt lịch và lấy các mục đến hạn với chi phí O(1) mỗi mục
+
+    Wheel cấp 0 có wheel_sizes[0] ô, mỗi ô rộng tick_ms; mỗi ô của cấp k rộng bằng
+    cả vòng của cấp k-1. Mục ở cấp cao được hạ dần xuống khi kim của cấp thấp hơn
+    quay hết một vòng. Mặc định (500ms, 64^4 ô) phủ khoảng 97 ngày, xa hơn thì
+    nằm trong danh sách overflow.
+    """
+
+    def __init__(self, tick_ms: int = 500, wheel_sizes: Sequence[int] = (64, 64, 64, 64),
+                 now_ms: Optional[int] = None):
+        self.tick_ms = tick_ms
+        self.sizes = list(wheel_sizes)
+        self.spans = [1]
+        for size in self.sizes[:-1]:
+            self.spans.append(self.spans[-1] * size)
+        self.wheels: List[List[List[Tuple[int, Any]]]] = [[[] for _ in range(size)] for size in self.sizes]
+        self.overflow: List[Tuple[int, Any]] = []
+        self._ready: List[Any] = []
+        self._count = 0
+        self.current_tick = (_now_ms() if now_ms is None else now_ms) // tick_ms
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, deadline_ms: int, item: Any):
+        """Đặt item đến hạn tại deadline_ms (làm tròn lên theo tick)"""
+        self._count += 1
+        self._insert(-(-deadline_ms // self.tick_ms), item)
+
+    def _insert(self, tick: int, item: Any):
+        if tick <= self.current_tick:
+            self._ready.append(item)
+            return
+        for level, (size, span) in enumerate(zip(self.sizes, self.spans)):
+            if tick // span - self.current_tick // span < size:
+                self.wheels[level][(tick // span) % size].append((tick, item))
+                return
+        self.overflow.append((tick, item))
+
+    def _cascade(self, level: int):
+        """Hạ các mục trong ô hiện tại của level xuống cấp thấp hơn"""
+        slot = self.wheels[level][(self.current_tick // self.spans[level]) % self.sizes[level]]
+        if slot:
+            entries = slot[:]
+            slot.clear()
+            for tick, item in entries:
+                self._insert(tick, item)
+
+    def advance(self, now_ms: Optional[int] = None) -> List[Any]:
+        """Quay kim tới now_ms, trả về các mục đã đến hạn"""
+        target = (_now_ms() if now_ms is None else now_ms) // self.tick_ms
+        due, self._ready = self._ready, []
+        top_span = self.spans[-1] * self.sizes[-1]
+
+        while self.current_tick < target:
+            self.current_tick += 1
+            tick = self.current_tick
+
+            if tick % top_span == 0 and self.overflow:
+                entries, self.overflow = self.overflow, []
+                for entry_tick, item in entries:
+                    self._insert(entry_tick, item)
+            for level in range(len(self.sizes) - 1, 0, -1):
+                if tick % self.spans[level] == 0:
+                    self._cascade(level)
+
+            slot = self.wheels[0][tick % self.sizes[0]]
+            if slot:
+                due.extend(item for _, item in slot)
+                slot.clear()
+            if self._ready:
+                due.extend(self._ready)
+                self._ready = []
+
+        self._count -= len(due)
+        return due
+
+class CandleCloseScheduler:
+    """Lịch làm mới nến theo thời điểm đóng nến của từng (symbol, timeframe)
+
+    Mỗi key đến hạn ngay sau khi nến hiện tại đóng cộng settle_ms (chờ sàn chốt nến),
+    rồi tự đặt lịch cho lần đóng nến kế tiếp. Key bị bỏ khỏi danh sách được hủy lười:
+    mục cũ trong wheel bị bỏ qua khi đến hạn.
+    """
+
+    def __init__(self, settle_ms: int = 1500, tick_ms: int = 500, now_ms: Optional[int] = None):
+        self.settle_ms = settle_ms
+        self.wheel = TimingWheel(tick_ms, now_ms=now_ms)
+        self._keys: Dict[Hashable, int] = {}  # key -> thế hệ đang hiệu lực
+        self._generation = 0
+
+    @property
+    def tick_ms(self) -> int:
+        return self.wheel.tick_ms
+
+    @property
+    def keys(self) -> List[Hashable]:
+        return list(self._keys)
+
+    def next_fire(self, timeframe: str, now_ms: int) -> int:
+        """Thời điểm làm mới kế tiếp: lần đóng nến sau now_ms + settle_ms"""
+        return int(bucket_start(now_ms, timeframe)) + interval_to_ms(timeframe) + self.settle_ms
+
+    def _schedule(self, key: Tuple[str, str], now_ms: int):
+        self.wheel.schedule(self.next_fire(key[1], now_ms), (key, self._keys[key]))
+
+    def add(self, key: Tuple[str, str], now_ms: Optional[int] = None):
+        """Thêm key (symbol, timeframe), bỏ qua nếu đã có"""
+        if key in self._keys:
+            return
+        self._generation += 1
+        self._keys[key] = self._generation
+        self._schedule(key, _now_ms() if now_ms is None else now_ms)
+
+    def remove(self, key: Tuple[str, str]):
+        self._keys.pop(key, None)
+
+    def set_keys(self, keys: Iterable[Tuple[str, str]], now_ms: Optional[int] = None):
+        """Đồng bộ danh sách key: thêm key mới, hủy key không còn trong danh sách"""
+        now_ms = _now_ms() if now_ms is None else now_ms
+        wanted = set(keys)
+        for key in [key for key in self._keys if key not in wanted]:
+            self.remove(key)
+        for key in wanted:
+            self.add(key, now_ms)
+
+    def pop_due(self, now_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Các key vừa đến hạn làm mới (đã tự đặt lịch lần kế tiếp)"""
+        now_ms = _now_ms() if now_ms is None else now_ms
+        due = []
+        for key, generation in self.wheel.advance(now_ms):
+            if self._keys.get(key) != generation:
+                continue
+            due.append(key)
+            self._schedule(key, now_ms)
+        return due
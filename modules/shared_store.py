@@ -0,0 +1,414 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .candle_store import CandleBuffer, CANDLE_FIELDS, ms_to_datetime_index
+from .data_models import DataStore
+
+# Header của mỗi segment nến: 8 số int64
+_MAGIC = 0x43414E444C45  # "CANDLE"
+_H_MAGIC, _H_SEQ, _H_CAPACITY, _H_END, _H_SIZE, _H_MOVED, _H_OWNER = range(7)
+_HEADER_SLOTS = 8
+_HEADER_BYTES = _HEADER_SLOTS * 8
+
+# Segment index: [seq, độ dài JSON, PID tiến trình ghi] + JSON {"SYMBOL/timeframe": tên segment}
+_INDEX_BYTES = 256 * 1024
+_INDEX_HEADER_SLOTS = 3
+_INDEX_HEADER_BYTES = 24
+_I_SEQ, _I_LENGTH, _I_OWNER = range(_INDEX_HEADER_SLOTS)
+
+def _segment_size(capacity: int) -> int:
+    return _HEADER_BYTES + 2 * capacity * 8 * (1 + len(CANDLE_FIELDS))
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Gắn vào segment có sẵn mà không để resource_tracker của tiến trình đọc xóa nó khi thoát"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 không có tham số track: tạm tắt việc đăng ký
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def _process_alive(pid: int) -> bool:
+    """Tiến trình pid còn chạy (PID 0: segment chưa có chủ)"""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Tiến trình của user khác
+    return True
+
+def _unlink(name: str):
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+def _claim_stale(name: str):
+    """Xóa segment name sót lại từ tiến trình ghi đã thoát; lỗi nếu chủ của nó vẫn đang chạy"""
+    try:
+        stale = _attach(name)
+    except FileNotFoundError:
+        return
+    try:
+        owner = int(np.ndarray((1,), dtype=np.int64, buffer=stale.buf, offset=_H_OWNER * 8)[0]) \
+            if stale.size >= _HEADER_BYTES else 0
+        if owner != os.getpid() and _process_alive(owner):
+            raise FileExistsError(f"Shared memory {name} đang được tiến trình {owner} sử dụng")
+    finally:
+        stale.close()
+    _unlink(name)
+
+def _claim_index(name: str):
+    """Xóa index sót lại của tiến trình ghi đã thoát; lỗi nếu tiến trình ghi vẫn đang chạy"""
+    index = _attach(name)
+    try:
+        owner = int(np.ndarray((1,), dtype=np.int64, buffer=index.buf, offset=_I_OWNER * 8)[0]) \
+            if index.size >= _INDEX_HEADER_BYTES else 0
+    finally:
+        index.close()
+    if owner != os.getpid() and _process_alive(owner):
+        raise FileExistsError(f"Prefix shared memory {name} đang được tiến trình {owner} sử dụng")
+    _unlink(name)
+
+def _map_columns(buf, capacity: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Tạo view header/timestamps/values trên vùng nhớ segment"""
+    header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=buf)
+    timestamps = np.ndarray((2 * capacity,), dtype=np.int64, buffer=buf, offset=_HEADER_BYTES)
+    values = np.ndarray(
+        (len(CANDLE_FIELDS), 2 * capacity), dtype=np.float64, buffer=buf,
+        offset=_HEADER_BYTES + 2 * capacity * 8
+    )
+    return header, timestamps, values
+
+class SharedCandleBuffer(CandleBuffer):
+    """CandleBuffer đặt trong multiprocessing.shared_memory, ghi theo kiểu seqlock
+
+    Header lưu seq, capacity, vị trí ghi và số nến. Mỗi lần ghi, seq tăng lên số lẻ
+    trước khi sửa dữ liệu và về số chẵn sau khi xong; tiến trình đọc chỉ chấp nhận
+    bản đọc khi seq chẵn và không đổi trong suốt lúc đọc.
+    """
+
+    def __init__(self, name: str, capacity: int = 1000, on_remap=None):
+        self.base_name = name
+        self.generation = 0
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.on_remap = on_remap  # callback(buffer) khi segment được tạo lại (resize)
+        self._depth = 0
+        super().__init__(capacity)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def _allocate(self, capacity: int):
+        name = f"{self.base_name}_{self.generation}"
+        _claim_stale(name)  # Segment sót lại từ lần chạy trước (thoát không sạch)
+
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_segment_size(capacity))
+        self.capacity = capacity
+        self._header, self._timestamps, self._values = _map_columns(self.shm.buf, capacity)
+        self._header[:] = 0
+        self._header[_H_CAPACITY] = capacity
+        self._header[_H_OWNER] = os.getpid()
+        self._header[_H_MAGIC] = _MAGIC
+
+    # Vị trí ghi và số nến nằm trong header để tiến trình đọc nhìn thấy
+    @property
+    def _end(self) -> int:
+        return int(self._header[_H_END])
+
+    @_end.setter
+    def _end(self, value: int):
+        self._header[_H_END] = value
+
+    @property
+    def _size(self) -> int:
+        return int(self._header[_H_SIZE])
+
+    @_size.setter
+    def _size(self, value: int):
+        self._header[_H_SIZE] = value
+
+    @contextmanager
+    def _writing(self):
+        """Đánh dấu vùng ghi seqlock (lồng nhau chỉ tăng seq ở lớp ngoài cùng)"""
+        if self._depth == 0:
+            self._header[_H_SEQ] += 1  # Lẻ: đang ghi
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._header[_H_SEQ] += 1  # Chẵn: ổn định
+
+    def append(self, *args):
+        with self._writing():
+            super().append(*args)
+
+    def append_block(self, timestamps: np.ndarray, values: np.ndarray):
+        with self._writing():
+            super().append_block(timestamps, values)
+
+    def upsert(self, *args) -> bool:
+        with self._writing():
+            return super().upsert(*args)
+
+    def upsert_block(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        with self._writing():
+            return super().upsert_block(timestamps, values)
+
+    def clear(self):
+        with self._writing():
+            super().clear()
+
+    def resize(self, capacity: int):
+        """Tạo segment mới với capacity mới, đánh dấu segment cũ đã chuyển"""
+        if capacity == self.capacity:
+            return
+        old_shm, old_header = self.shm, self._header
+        timestamps, values = self.window()
+        timestamps, values = timestamps.copy(), values.copy()
+
+        self.generation += 1
+        self._allocate(capacity)
+        self.append_block(timestamps, values)
+
+        old_header[_H_MOVED] = 1
+        del old_header
+        try:
+            old_shm.close()
+        except BufferError:
+            pass  # Còn view đang được dùng, mapping sẽ được giải phóng khi GC
+        old_shm.unlink()
+
+        if self.on_remap:
+            self.on_remap(self)
+
+    def release(self):
+        """Đóng và xóa segment"""
+        if self.shm is None:
+            return
+        self._header = self._timestamps = self._values = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+class SharedCandleWriter:
+    """Tiến trình ghi duy nhất: đặt toàn bộ buffer nến của DataStore vào shared memory
+
+    Index ghi PID của tiến trình ghi: prefix đang được một tiến trình còn chạy sử dụng thì
+    báo lỗi FileExistsError thay vì ghi đè; segment của tiến trình đã thoát được dọn lại.
+    """
+
+    def __init__(self, prefix: str = "binance_bot"):
+        self.prefix = prefix
+        self.buffers: Dict[str, SharedCandleBuffer] = {}  # "SYMBOL/timeframe" -> buffer
+        self.logger = logging.getLogger(__name__)
+        name = f"{prefix}_index"
+        try:
+            self._index = shared_memory.SharedMemory(name=name, create=True, size=_INDEX_BYTES)
+        except FileExistsError:
+            _claim_index(name)
+            self._index = shared_memory.SharedMemory(name=name, create=True, size=_INDEX_BYTES)
+        self._index_header = np.ndarray((_INDEX_HEADER_SLOTS,), dtype=np.int64, buffer=self._index.buf)
+        self._index_header[:] = 0
+        self._index_header[_I_OWNER] = os.getpid()
+
+    def create_buffer(self, symbol: str, timeframe: str, capacity: int) -> SharedCandleBuffer:
+        """buffer_factory cho DataStore"""
+        key = f"{symbol}/{timeframe}"
+        buffer = SharedCandleBuffer(f"{self.prefix}_{symbol}_{timeframe}", capacity, on_remap=self._on_remap)
+        self.buffers[key] = buffer
+        self._publish_index()
+        return buffer
+
+    def attach(self, data_store: DataStore):
+        """Cho DataStore tạo buffer trong shared memory, chuyển các buffer đã có sang"""
+        data_store.buffer_factory = self.create_buffer
+        for symbol, buffers in data_store.market_data.items():
+            for timeframe, buffer in list(buffers.items()):
+                if isinstance(buffer, SharedCandleBuffer):
+                    continue
+                shared = self.create_buffer(symbol, timeframe, buffer.capacity)
+                shared.append_block(*buffer.window())
+                buffers[timeframe] = shared
+
+    def _on_remap(self, buffer: SharedCandleBuffer):
+        self._publish_index()
+
+    def _publish_index(self):
+        """Ghi index (seqlock) để tiến trình đọc tìm segment theo (symbol, timeframe)"""
+        payload = json.dumps({key: buffer.name for key, buffer in self.buffers.items()}).encode()
+        if len(payload) > _INDEX_BYTES - _INDEX_HEADER_BYTES:
+            self.logger.error("Index shared memory đầy, không thể công bố thêm series")
+            return
+        self._index_header[_I_SEQ] += 1
+        self._index.buf[_INDEX_HEADER_BYTES:_INDEX_HEADER_BYTES + len(payload)] = payload
+        self._index_header[_I_LENGTH] = len(payload)
+        self._index_header[_I_SEQ] += 1
+
+    def detach(self, data_store: DataStore):
+        """Chuyển các buffer của DataStore về bộ nhớ thường rồi xóa toàn bộ segment"""
+        data_store.buffer_factory = lambda symbol, timeframe, capacity: CandleBuffer(capacity)
+        for buffers in data_store.market_data.values():
+            for timeframe, buffer in list(buffers.items()):
+                if isinstance(buffer, SharedCandleBuffer) and buffer.shm is not None:
+                    local = CandleBuffer(buffer.capacity)
+                    local.append_block(*buffer.window())
+                    buffers[timeframe] = local
+        self.close()
+
+    def close(self):
+        """Xóa toàn bộ segment (gọi nhiều lần không lỗi)"""
+        if self._index is None:
+            return
+        for buffer in self.buffers.values():
+            buffer.release()
+        self.buffers.clear()
+        self._index_header = None
+        self._index.close()
+        try:
+            self._index.unlink()
+        except FileNotFoundError:
+            pass
+        self._index = None
+
+class SharedCandleReader:
+    """Tiến trình đọc: map segment nến không copy, đọc nhất quán bằng seqlock"""
+
+    def __init__(self, prefix: str = "binance_bot", max_retries: int = 1000):
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self._index = _attach(f"{prefix}_index")
+        self._index_header = np.ndarray((_INDEX_HEADER_SLOTS,), dtype=np.int64, buffer=self._index.buf)
+        self._names: Dict[str, str] = {}
+        self._segments: Dict[str, tuple] = {}  # key -> (shm, header, timestamps, values)
+
+    def _read_index(self) -> Dict[str, str]:
+        for _ in range(self.max_retries):
+            seq = int(self._index_header[_I_SEQ])
+            if seq % 2 == 0:
+                length = int(self._index_header[_I_LENGTH])
+                payload = bytes(self._index.buf[_INDEX_HEADER_BYTES:_INDEX_HEADER_BYTES + length])
+                if int(self._index_header[_I_SEQ]) == seq:
+                    return json.loads(payload) if payload else {}
+            time.sleep(0)
+        raise RuntimeError("Không đọc được index shared memory")
+
+    def series(self) -> List[Tuple[str, str]]:
+        """Danh sách (symbol, timeframe) đang được công bố"""
+        self._names = self._read_index()
+        return [tuple(key.split('/', 1)) for key in self._names]
+
+    def _segment(self, symbol: str, timeframe: str, refresh: bool = False) -> tuple:
+        key = f"{symbol}/{timeframe}"
+        segment = self._segments.get(key)
+        if segment is not None and not refresh and not segment[1][_H_MOVED]:
+            return segment
+
+        if segment is not None:
+            self._close_segment(key)
+        self._names = self._read_index()
+        if key not in self._names:
+            raise KeyError(f"Không có dữ liệu shared memory cho {key}")
+
+        shm = _attach(self._names[key])
+        capacity = int(np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)[_H_CAPACITY])
+        segment = (shm,) + _map_columns(shm.buf, capacity)
+        self._segments[key] = segment
+        return segment
+
+    def _read(self, symbol: str, timeframe: str, count: Optional[int], copy: bool) -> Tuple[int, np.ndarray, np.ndarray]:
+        for _ in range(self.max_retries):
+            _, header, timestamps, values = self._segment(symbol, timeframe)
+            seq = int(header[_H_SEQ])
+            if seq % 2 or header[_H_MOVED]:
+                time.sleep(0)
+                continue
+
+            capacity = int(header[_H_CAPACITY])
+            size = int(header[_H_SIZE])
+            end = int(header[_H_END])
+            n = size if count is None or count > size else count
+            start = end - n
+            if start < 0:
+                start += capacity
+            window = slice(start, start + n)
+
+            result_timestamps, result_values = timestamps[window], values[:, window]
+            if copy:
+                result_timestamps, result_values = result_timestamps.copy(), result_values.copy()
+            if int(header[_H_SEQ]) == seq:
+                return seq, result_timestamps, result_values
+
+        raise RuntimeError(f"Không đọc được dữ liệu nhất quán {symbol} {timeframe}")
+
+    def read(self, symbol: str, timeframe: str, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Đọc bản sao nhất quán của count nến gần nhất: (timestamps, values shape (5, n))"""
+        _, timestamps, values = self._read(symbol, timeframe, count, copy=True)
+        return timestamps, values
+
+    def read_view(self, symbol: str, timeframe: str, count: Optional[int] = None) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Trả về (seq, timestamps, values) là view trực tiếp trên shared memory (không copy)
+
+        Sau khi tính toán trên view, gọi is_stable(symbol, timeframe, seq) để chắc chắn
+        dữ liệu không bị ghi đè trong lúc đọc.
+        """
+        return self._read(symbol, timeframe, count, copy=False)
+
+    def sequence(self, symbol: str, timeframe: str) -> int:
+        """Seq hiện tại của series (thay đổi sau mỗi lần ghi)"""
+        return int(self._segment(symbol, timeframe)[1][_H_SEQ])
+
+    def is_stable(self, symbol: str, timeframe: str, seq: int) -> bool:
+        """Kiểm tra series không bị ghi kể từ seq (dùng cho read(copy=False))"""
+        header = self._segment(symbol, timeframe)[1]
+        return not header[_H_MOVED] and int(header[_H_SEQ]) == seq
+
+    def get_market_data(self, symbol: str, timeframe: str, count: Optional[int] = None) -> pd.DataFrame:
+        """Tạo DataFrame giống DataStore.get_market_data"""
+        timestamps, values = self.read(symbol, timeframe, count)
+        data = {'timestamp': ms_to_datetime_index(timestamps)}
+        for i, name in enumerate(CANDLE_FIELDS):
+            data[name] = values[i]
+        return pd.DataFrame(data)
+
+    def _close_segment(self, key: str):
+        segment = self._segments.pop(key, None)
+        if segment is not None:
+            shm = segment[0]
+            del segment
+            try:
+                shm.close()
+            except BufferError:
+                pass  # Vẫn còn view đang được dùng, để GC đóng sau
+
+    def close(self):
+        """Đóng toàn bộ mapping"""
+        for key in list(self._segments):
+            self._close_segment(key)
+        self._index_header = None
+        try:
+            self._index.close()
+        except BufferError:
+            pass
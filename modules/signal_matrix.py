@@ -0,0 +1,187 @@
+import numpy as np
+from enum import IntEnum
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .data_models import DataStore
+
+# Loại tín hiệu (trục cuối của ma trận), cùng tên khóa với dict của get_multi_timeframe_analysis
+SIGNAL_TYPES = ('trend', 'rsi_signal', 'macd_signal', 'bb_signal')
+TREND, RSI, MACD, BOLLINGER = range(len(SIGNAL_TYPES))
+
+# Các bit của mã tín hiệu: một phép AND thay cho phép so chuỗi 'BULLISH' in signal
+PRESENT = 1   # Có tín hiệu (đủ dữ liệu)
+BULL = 2      # Thiên tăng: BULLISH, BULLISH_CROSS, OVERSOLD
+BEAR = 4      # Thiên giảm: BEARISH, BEARISH_CROSS, OVERBOUGHT
+CROSS = 8     # MACD cắt đường signal
+EXTREME = 16  # Quá mua/quá bán
+FLAT = 32     # MA nhanh bằng MA chậm
+
+class Signal(IntEnum):
+    """Mã tín hiệu uint8, tên trùng với chuỗi tín hiệu cũ"""
+    NONE = 0
+    NEUTRAL = PRESENT
+    SIDEWAYS = PRESENT | FLAT
+    BULLISH = PRESENT | BULL
+    BEARISH = PRESENT | BEAR
+    BULLISH_CROSS = PRESENT | BULL | CROSS
+    BEARISH_CROSS = PRESENT | BEAR | CROSS
+    OVERSOLD = PRESENT | BULL | EXTREME
+    OVERBOUGHT = PRESENT | BEAR | EXTREME
+
+# Tên theo mã (None cho NONE) để dựng dict view
+_NAMES: Dict[int, Optional[str]] = {int(signal): signal.name for signal in Signal}
+_NAMES[Signal.NONE] = None
+
+def signal_name(code: int) -> Optional[str]:
+    """Chuỗi tín hiệu của mã (None nếu không có tín hiệu)"""
+    return _NAMES[int(code)]
+
+# Ngưỡng RSI (quá mua, quá bán, tăng, giảm): scalp nhạy hơn, swing bảo thủ hơn
+RSI_LEVELS = {
+    'scalp': (70, 30, 60, 40),
+    'swing': (80, 20, 65, 35),
+}
+
+# Sentiment tổng thể khi tỉ lệ tín hiệu một chiều vượt ngưỡng này
+SENTIMENT_THRESHOLD = 0.6
+
+# Trường của TechnicalIndicators dùng để phân loại, theo thứ tự đầu vào của classify()
+SIGNAL_FIELDS = ('ma_fast', 'ma_slow', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+           'bb_upper', 'bb_middle', 'bb_lower')
+_read_fields = attrgetter(*SIGNAL_FIELDS)
+
+def _select(conditions, signals, valid) -> np.ndarray:
+    """Mã của điều kiện đúng đầu tiên, NEUTRAL nếu không điều kiện nào đúng, NONE nếu thiếu dữ liệu"""
+    return np.where(valid, np.select(conditions, signals, Signal.NEUTRAL), Signal.NONE)
+
+def classify(values: np.ndarray, prices: np.ndarray, mode: str = "scalp") -> np.ndarray:
+    """Mã tín hiệu (S, T, len(SIGNAL_TYPES)) từ chỉ báo (len(SIGNAL_FIELDS), S, T) và giá hiện tại (S,)
+
+    Giá trị thiếu là NaN; so sánh với NaN luôn sai nên không cần xử lý riêng.
+    """
+    ma_fast, ma_slow, rsi, macd, macd_signal, histogram, bb_upper, bb_middle, bb_lower = values
+    price = prices[:, None]
+
+    trend = _select(
+        [ma_fast > ma_slow, ma_fast < ma_slow],
+        [Signal.BULLISH, Signal.BEARISH],
+        ~np.isnan(ma_fast) & ~np.isnan(ma_slow)
+    )
+    trend = np.where(trend == Signal.NEUTRAL, Signal.SIDEWAYS, trend)
+
+    overbought, oversold, bullish, bearish = RSI_LEVELS['scalp' if mode.lower() == 'scalp' else 'swing']
+    rsi_code = _select(
+        [rsi > overbought, rsi < oversold, rsi > bullish, rsi < bearish],
+        [Signal.OVERBOUGHT, Signal.OVERSOLD, Signal.BULLISH, Signal.BEARISH],
+        ~np.isnan(rsi)
+    )
+
+    macd_code = _select(
+        [(macd > macd_signal) & (histogram > 0), (macd < macd_signal) & (histogram < 0),
+         (macd > 0) & (macd_signal > 0), (macd < 0) & (macd_signal < 0)],
+        [Signal.BULLISH_CROSS, Signal.BEARISH_CROSS, Signal.BULLISH, Signal.BEARISH],
+        ~np.isnan(macd) & ~np.isnan(macd_signal)
+    )
+
+    # Thiếu dải giữa chỉ làm mất tín hiệu khi giá nằm trong dải
+    bands = ~np.isnan(bb_upper) & ~np.isnan(bb_lower) & ~np.isnan(price)
+    outside = (price >= bb_upper) | (price <= bb_lower)
+    bb_code = _select(
+        [price >= bb_upper, price <= bb_lower, price > bb_middle, price < bb_middle],
+        [Signal.OVERBOUGHT, Signal.OVERSOLD, Signal.BULLISH, Signal.BEARISH],
+        bands & (outside | ~np.isnan(bb_middle))
+    )
+
+    return np.stack([trend, rsi_code, macd_code, bb_code], axis=-1).astype(np.uint8)
+
+class SignalMatrix:
+    """Tín hiệu đa khung thời gian của nhiều symbol: mảng uint8 (symbols × timeframes × loại tín hiệu)
+
+    Dựng trong một lượt đọc chỉ báo từ DataStore; đếm tín hiệu và sentiment là các phép
+    rút gọn NumPy. analysis() cho dict giống get_multi_timeframe_analysis để hiển thị.
+    """
+
+    def __init__(self, symbols: Sequence[str], timeframes: Sequence[str], codes: np.ndarray,
+                 mode: str = "scalp"):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.codes = codes
+        self.mode = mode
+        self._rows: Optional[Dict[str, int]] = None  # Tạo khi cần (ma trận backtest có thể rất dài)
+
+    @classmethod
+    def from_store(cls, data_store: DataStore, symbols: Sequence[str], timeframes: Sequence[str],
+                   mode: str = "scalp") -> 'SignalMatrix':
+        """Đọc chỉ báo và giá hiện tại của mọi (symbol, timeframe) một lần rồi phân loại"""
+        values = np.full((len(SIGNAL_FIELDS), len(symbols), len(timeframes)), np.nan)
+        prices = np.full(len(symbols), np.nan)
+        for row, symbol in enumerate(symbols):
+            price = data_store.get_price(symbol)
+            if price is not None and price.price:
+                prices[row] = price.price
+            for column, timeframe in enumerate(timeframes):
+                indicators = data_store.get_indicators(symbol, timeframe)
+                if indicators is not None:
+                    values[:, row, column] = [np.nan if value is None else value
+                                              for value in _read_fields(indicators)]
+        return cls(symbols, timeframes, classify(values, prices, mode), mode)
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict) -> 'SignalMatrix':
+        """Ma trận một hàng từ dict của get_multi_timeframe_analysis"""
+        timeframes = list(analysis['timeframes'])
+        codes = np.zeros((1, len(timeframes), len(SIGNAL_TYPES)), dtype=np.uint8)
+        for column, timeframe in enumerate(timeframes):
+            for kind, name in enumerate(SIGNAL_TYPES):
+                signal = analysis['timeframes'][timeframe].get(name)
+                codes[0, column, kind] = Signal[signal] if signal else Signal.NONE
+        return cls([analysis['symbol']], timeframes, codes, analysis.get('mode', 'scalp'))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def index(self, symbol: str) -> int:
+        """Chỉ số hàng của symbol"""
+        if self._rows is None:
+            self._rows = {name: row for row, name in enumerate(self.symbols)}
+        return self._rows[symbol]
+
+    def row(self, symbol: str) -> 'SignalMatrix':
+        """Ma trận một hàng của symbol (view)"""
+        index = self.index(symbol)
+        return SignalMatrix([symbol], self.timeframes, self.codes[index:index + 1], self.mode)
+
+    def columns(self, timeframes: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """Các timeframe (theo thứ tự đã cho) có trong ma trận và chỉ số cột của chúng"""
+        index = {timeframe: column for column, timeframe in enumerate(self.timeframes)}
+        present = [timeframe for timeframe in timeframes if timeframe in index]
+        return present, [index[timeframe] for timeframe in present]
+
+    def sentiment(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(Signal BULLISH/BEARISH/NEUTRAL, độ mạnh) của mỗi symbol từ tỉ lệ tín hiệu tăng/giảm"""
+        codes = self.codes.reshape(len(self.symbols), -1)
+        total = np.count_nonzero(codes, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bullish = np.count_nonzero(codes & BULL, axis=1) / total
+            bearish = np.count_nonzero(codes & BEAR, axis=1) / total
+        is_bullish = bullish > SENTIMENT_THRESHOLD
+        is_bearish = ~is_bullish & (bearish > SENTIMENT_THRESHOLD)
+        sentiment = np.select([is_bullish, is_bearish], [Signal.BULLISH, Signal.BEARISH], Signal.NEUTRAL)
+        strength = np.select([is_bullish, is_bearish, total > 0], [bullish, bearish, 0.5], 0.0)
+        return sentiment, strength
+
+    def analysis(self, symbol: str) -> Dict:
+        """Dict view của một symbol (giống get_multi_timeframe_analysis)"""
+        index = self.index(symbol)
+        sentiment, strength = self.row(symbol).sentiment()
+        return {
+            'symbol': symbol,
+            'mode': self.mode,
+            'timeframes': {
+                timeframe: {name: signal_name(code) for name, code in zip(SIGNAL_TYPES, self.codes[index, column])}
+                for column, timeframe in enumerate(self.timeframes)
+            },
+            'overall_sentiment': Signal(int(sentiment[0])).name,
+            'strength': float(strength[0])
+        }
@@ -0,0 +1,329 @@
+import math
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+import logging
+
+from .data_models import DataStore, MarketData, TechnicalIndicators, datetime_to_ms
+from .indicator_kernels import MIN_CANDLES
+
+class RollingWindow:
+    """Cửa sổ trượt cố định với trung bình và phương sai Welford, O(1) mỗi lần thêm/sửa
+
+    Tổng được tính lại từ đầu định kỳ để sai số làm tròn không tích lũy. Cửa sổ toàn
+    giá trị bằng nhau có trung bình đúng bằng giá trị đó và phương sai đúng bằng 0
+    (giống pandas rolling; RSI cần phân biệt 0/0 với x/0).
+    """
+
+    __slots__ = ('size', 'values', 'count', 'index', 'mean', 'm2', 'run', '_previous_run', '_writes', '_resync_every')
+
+    def __init__(self, size: int, resync_every: int = 4096):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.index = 0  # Vị trí ghi tiếp theo
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run = 0  # Số giá trị bằng nhau liên tiếp ở cuối cửa sổ
+        self._previous_run = 0
+        self._writes = 0
+        self._resync_every = resync_every
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def push(self, x: float):
+        previous = self.values[(self.index - 1) % self.size]
+        self._previous_run = self.run
+        self.run = self.run + 1 if self.count and x == previous else 1
+        if self.count < self.size:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+            self.values[self.index] = x
+        else:
+            self._replace(self.index, x)
+        self.index = (self.index + 1) % self.size
+        self._after_write(x)
+
+    def replace_last(self, x: float):
+        """Sửa giá trị vừa thêm gần nhất"""
+        previous = self.values[(self.index - 2) % self.size]
+        self.run = self._previous_run + 1 if self.count > 1 and x == previous else 1
+        self._replace((self.index - 1) % self.size, x)
+        self._after_write(x)
+
+    def _replace(self, position: int, x: float):
+        old = self.values[position]
+        mean = self.mean + (x - old) / self.count
+        self.m2 += (x - old) * (x - mean + old - self.mean)
+        self.mean = mean
+        self.values[position] = x
+
+    def _after_write(self, x: float):
+        if self.run >= self.count:
+            self.mean = x
+            self.m2 = 0.0
+        self._writes += 1
+        if self._writes >= self._resync_every:
+            self._writes = 0
+            window = self.values if self.full else self.values[:self.count]
+            self.mean = math.fsum(window) / self.count
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in window)
+
+    def std(self) -> float:
+        """Độ lệch chuẩn mẫu (ddof=1, giống pandas rolling().std())"""
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+class StreamingSMA:
+    """SMA(period) cập nhật O(1)"""
+
+    def __init__(self, period: int):
+        self.window = RollingWindow(period)
+
+    def update(self, value: float):
+        self.window.push(value)
+
+    def revise_last(self, value: float):
+        self.window.replace_last(value)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.window.mean if self.window.full else None
+
+class StreamingEMA:
+    """EMA(span) cập nhật O(1), cùng công thức với pandas ewm(span=span, adjust=True)"""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self._numerator = 0.0
+        self._denominator = 0.0
+        self._previous = (0.0, 0.0)
+
+    def update(self, value: float):
+        self._previous = (self._numerator, self._denominator)
+        self._apply(value)
+
+    def revise_last(self, value: float):
+        self._numerator, self._denominator = self._previous
+        self._apply(value)
+
+    def _apply(self, value: float):
+        self._numerator = value + self.decay * self._numerator
+        self._denominator = 1 + self.decay * self._denominator
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._numerator / self._denominator if self._denominator else None
+
+class StreamingRSI:
+    """RSI(period) theo trung bình cộng gain/loss (giống TechnicalAnalyzer.calculate_rsi)"""
+
+    def __init__(self, period: int = 14):
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self._last_close: Optional[float] = None
+        self._previous_close: Optional[float] = None  # Giá đóng của nến trước nến cuối
+
+    @staticmethod
+    def _split(delta: float) -> Tuple[float, float]:
+        return (delta, 0.0) if delta > 0 else (0.0, -delta if delta < 0 else 0.0)
+
+    def update(self, close: float):
+        # Nến đầu tiên không có delta: gain = loss = 0 như đường batch
+        gain, loss = self._split(close - self._last_close) if self._last_close is not None else (0.0, 0.0)
+        self.gains.push(gain)
+        self.losses.push(loss)
+        self._previous_close, self._last_close = self._last_close, close
+
+    def revise_last(self, close: float):
+        gain, loss = self._split(close - self._previous_close) if self._previous_close is not None else (0.0, 0.0)
+        self.gains.replace_last(gain)
+        self.losses.replace_last(loss)
+        self._last_close = close
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.gains.full:
+            return None
+        avg_gain, avg_loss = self.gains.mean, self.losses.mean
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else None
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+class StreamingMACD:
+    """MACD(fast, slow, signal) từ ba EMA cập nhật O(1)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close: float):
+        self.fast.update(close)
+        self.slow.update(close)
+        self.signal.update(self.fast.value - self.slow.value)
+
+    def revise_last(self, close: float):
+        self.fast.revise_last(close)
+        self.slow.revise_last(close)
+        self.signal.revise_last(self.fast.value - self.slow.value)
+
+    @property
+    def value(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        if self.fast.value is None:
+            return None, None, None
+        macd = self.fast.value - self.slow.value
+        return macd, self.signal.value, macd - self.signal.value
+
+class StreamingBollinger:
+    """Bollinger Bands(period, std) với trung bình/phương sai Welford trên cửa sổ trượt"""
+
+    def __init__(self, period: int = 20, std: float = 2):
+        self.window = RollingWindow(period)
+        self.std = std
+
+    def update(self, close: float):
+        self.window.push(close)
+
+    def revise_last(self, close: float):
+        self.window.replace_last(close)
+
+    @property
+    def value(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        if not self.window.full:
+            return None, None, None
+        middle = self.window.mean
+        band = self.window.std() * self.std
+        return middle + band, middle, middle - band
+
+class StreamingIndicatorSet:
+    """Toàn bộ chỉ báo của một (symbol, timeframe), mỗi nến mới hoặc nến sửa tốn O(1)
+
+    update(candle) cho nến mới, revise_last(candle) khi nến cuối (đang hình thành)
+    thay đổi. Cấu hình giống indicators_config của TechnicalAnalyzer.
+    """
+
+    def __init__(self, symbol: str, timeframe: str, indicators_config: Dict):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.rsi = StreamingRSI(indicators_config.get('rsi_period', 14))
+        self.ma_fast = StreamingSMA(indicators_config.get('ma_fast', 10))
+        self.ma_slow = StreamingSMA(indicators_config.get('ma_slow', 20))
+        self.macd = StreamingMACD(
+            indicators_config.get('macd_fast', 12),
+            indicators_config.get('macd_slow', 26),
+            indicators_config.get('macd_signal', 9)
+        )
+        self.bollinger = StreamingBollinger(indicators_config.get('bb_period', 20), indicators_config.get('bb_std', 2))
+        self._parts = (self.rsi, self.ma_fast, self.ma_slow, self.macd, self.bollinger)
+        self.count = 0
+        self.last_open_time: Optional[int] = None
+
+    def update(self, candle: MarketData):
+        self.push(datetime_to_ms(candle.timestamp), candle.close)
+
+    def revise_last(self, candle: MarketData):
+        self.push(datetime_to_ms(candle.timestamp), candle.close, revise=True)
+
+    def push(self, open_time: int, close: float, revise: bool = False):
+        """Thêm nến mới (revise=False) hoặc sửa nến cuối (revise=True) theo thời gian mở và giá đóng"""
+        if revise and self.count:
+            for part in self._parts:
+                part.revise_last(close)
+        else:
+            for part in self._parts:
+                part.update(close)
+            self.count += 1
+        self.last_open_time = open_time
+
+    def indicators(self) -> Optional[TechnicalIndicators]:
+        """Chỉ báo tại nến cuối (None nếu chưa đủ MIN_CANDLES nến, giống đường batch)"""
+        if self.count < MIN_CANDLES:
+            return None
+        macd, macd_signal, macd_histogram = self.macd.value
+        bb_upper, bb_middle, bb_lower = self.bollinger.value
+        return TechnicalIndicators(
+            symbol=self.symbol,
+            timeframe=self.timeframe,
+            # Giờ địa phương naive như ms_to_datetime_index, không tạo DatetimeIndex cho một giá trị
+            timestamp=pd.Timestamp(datetime.fromtimestamp(self.last_open_time // 1000)
+                                   + timedelta(milliseconds=self.last_open_time % 1000)),
+            rsi=self.rsi.value,
+            ma_fast=self.ma_fast.value,
+            ma_slow=self.ma_slow.value,
+            macd=macd,
+            macd_signal=macd_signal,
+            macd_histogram=macd_histogram,
+            bb_upper=bb_upper,
+            bb_middle=bb_middle,
+            bb_lower=bb_lower
+        )
+
+class StreamingIndicatorEngine:
+    """Duy trì StreamingIndicatorSet cho các series trong DataStore qua candle listener
+
+    Series được nạp lại từ buffer ở lần đầu được hỏi tới, sau đó mỗi nến mới/sửa
+    chỉ tốn O(1). Nến cũ hơn nến cuối bị sửa (đồng bộ lại) sẽ nạp lại series.
+    EMA nhớ toàn bộ lịch sử đã thấy nên có thể lệch rất nhỏ so với đường batch
+    khi buffer đã bỏ bớt nến cũ.
+    """
+
+    def __init__(self, data_store: DataStore, indicators_config: Dict):
+        self.data_store = data_store
+        self.config = dict(indicators_config)
+        self.sets: Dict[Tuple[str, str], StreamingIndicatorSet] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self):
+        self.data_store.add_candle_listener(self.on_candles)
+
+    def detach(self):
+        self.data_store.remove_candle_listener(self.on_candles)
+        with self._lock:
+            self.sets.clear()
+
+    def _seed(self, symbol: str, timeframe: str) -> Optional[StreamingIndicatorSet]:
+        """Tạo lại trạng thái của series từ toàn bộ buffer"""
+        buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+        if buffer is None or not len(buffer):
+            self.sets.pop((symbol, timeframe), None)
+            return None
+        indicator_set = StreamingIndicatorSet(symbol, timeframe, self.config)
+        timestamps = buffer.timestamps()
+        for open_time, close in zip(timestamps.tolist(), buffer.column('close').tolist()):
+            indicator_set.push(open_time, close)
+        self.sets[(symbol, timeframe)] = indicator_set
+        return indicator_set
+
+    def on_candles(self, symbol: str, timeframe: str, timestamps: np.ndarray, values: np.ndarray):
+        """Listener của DataStore: chỉ cập nhật series đã được theo dõi"""
+        with self._lock:
+            indicator_set = self.sets.get((symbol, timeframe))
+            if indicator_set is None:
+                return
+            try:
+                for open_time, close in zip(timestamps.tolist(), values[3].tolist()):
+                    if open_time == indicator_set.last_open_time:
+                        indicator_set.push(open_time, close, revise=True)
+                    elif open_time > indicator_set.last_open_time:
+                        indicator_set.push(open_time, close)
+                    else:
+                        self._seed(symbol, timeframe)
+                        return
+            except Exception as e:
+                self.logger.error(f"Lỗi cập nhật chỉ báo {symbol} {timeframe}: {e}")
+                self.sets.pop((symbol, timeframe), None)
+
+    def get_indicators(self, symbol: str, timeframe: str) -> Optional[TechnicalIndicators]:
+        """Chỉ báo mới nhất của series (nạp series nếu chưa theo dõi)"""
+        with self._lock:
+            indicator_set = self.sets.get((symbol, timeframe)) or self._seed(symbol, timeframe)
+            return indicator_set.indicators() if indicator_set else None
@@ -1,21 +1,60 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, Hashable, List, Optional, Set, Tuple
 from datetime import datetime
 import logging
 
 from .data_models import TechnicalIndicators, DataStore
+from .event_bus import EventType
+from .streaming_indicators import StreamingIndicatorEngine
+from .batch_indicators import latest_indicators, stack_closes
+from .candle_store import ms_to_datetime_index
+from .indicator_cache import IndicatorCache
+from . import indicator_kernels as kernels
+from .indicator_kernels import MIN_CANDLES
+from .indicator_history import IndicatorHistory
+from .indicator_registry import BASE_INDICATORS, INDICATORS, IndicatorGraph
+from .signal_matrix import BOLLINGER, MACD, RSI, SIGNAL_TYPES, TREND, SignalMatrix, signal_name
 
 class TechnicalAnalyzer:
     """Phân tích kỹ thuật"""
     
-    def __init__(self, data_store: DataStore):
+    def __init__(self, data_store: DataStore, use_streaming: bool = True, use_kernels: bool = True,
+                 indicator_names: Optional[List[str]] = None):
         self.data_store = data_store
         self.logger = logging.getLogger(__name__)
+        
+        # Series có nến đóng/cập nhật kể từ lần phân tích trước (qua event bus của DataStore)
+        self.changes = data_store.event_bus.subscribe(
+            "technical_analyzer", (EventType.CANDLE_CLOSED, EventType.CANDLE_UPDATED)
+        )
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._analysis_config: Optional[tuple] = None
+        
+        # Chỉ báo tăng dần O(1) mỗi nến cho analyze_changed (False: tính lại cả series bằng pandas)
+        self.use_streaming = use_streaming
+        self.streaming: Optional[StreamingIndicatorEngine] = None
+        
+        # Chỉ báo đã tính theo phiên bản series và cấu hình (series không đổi thì không tính lại)
+        self.cache = IndicatorCache()
+        
+        # Tính chỉ báo bằng kernel NumPy (indicator_kernels); False: dùng pandas rolling/ewm
+        self.use_kernels = use_kernels
+        
+        # Chỉ báo tính bằng DAG của indicator_registry (None: mọi chỉ báo đã đăng ký),
+        # mỗi cấu hình có một DAG dựng sẵn
+        self.indicator_names = tuple(indicator_names) if indicator_names is not None else None
+        self._graphs: Dict[Hashable, IndicatorGraph] = {}
+        
+        # Chuỗi chỉ báo đầy đủ theo từng nến (biểu đồ, backtest), tạo khi được đọc lần đầu
+        self.history: Optional[IndicatorHistory] = None
     
     def calculate_rsi(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
         """Tính RSI"""
         try:
+            if self.use_kernels:
+                return pd.Series(kernels.rsi(df['close'].to_numpy(), period), index=df.index)
+            
             close = df['close']
             delta = close.diff()
             
@@ -36,6 +75,11 @@ class TechnicalAnalyzer:
     def calculate_moving_averages(self, df: pd.DataFrame, fast_period: int = 10, slow_period: int = 20) -> tuple:
         """Tính Moving Averages"""
         try:
+            if self.use_kernels:
+                close = df['close'].to_numpy()
+                return (pd.Series(kernels.sma(close, fast_period), index=df.index),
+                        pd.Series(kernels.sma(close, slow_period), index=df.index))
+            
             close = df['close']
             ma_fast = close.rolling(window=fast_period).mean()
             ma_slow = close.rolling(window=slow_period).mean()
@@ -46,6 +90,8 @@ class TechnicalAnalyzer:
     
     def calculate_ema(self, series: pd.Series, period: int) -> pd.Series:
         """Tính Exponential Moving Average"""
+        if self.use_kernels:
+            return pd.Series(kernels.ema(series.to_numpy(), period), index=series.index)
         return series.ewm(span=period).mean()
     
     def calculate_macd(self, df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
@@ -77,6 +123,10 @@ class TechnicalAnalyzer:
     def calculate_bollinger_bands(self, df: pd.DataFrame, period: int = 20, std: float = 2) -> tuple:
         """Tính Bollinger Bands"""
         try:
+            if self.use_kernels:
+                bands = kernels.bollinger(df['close'].to_numpy(), period, std)
+                return tuple(pd.Series(band, index=df.index) for band in bands)
+            
             close = df['close']
             
             # Middle band (SMA)
@@ -97,17 +147,53 @@ class TechnicalAnalyzer:
                    pd.Series([np.nan] * len(df)), 
                    pd.Series([np.nan] * len(df)))
     
+    @property
+    def computed_indicators(self) -> Tuple[str, ...]:
+        """Chỉ báo mà analyze_symbol_timeframe điền vào (DAG: mọi chỉ báo đã chọn; pandas: 4 chỉ báo gốc)
+        
+        Đường vector hóa và streaming chỉ tính BASE_INDICATORS, các trường bổ sung để None.
+        """
+        if not self.use_kernels:
+            return BASE_INDICATORS
+        return self.indicator_names if self.indicator_names is not None else tuple(INDICATORS)
+    
+    def _cached(self, symbol: str, timeframe: str, indicators_config: Dict,
+                compute, names: Tuple[str, ...]) -> Optional[TechnicalIndicators]:
+        """Lấy chỉ báo từ cache nếu series chưa đổi, ngược lại gọi compute() và lưu kết quả
+        
+        names là tập chỉ báo compute() điền vào, là một phần của khóa cache.
+        """
+        buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+        if buffer is None:
+            return None
+        key = (symbol, timeframe, IndicatorCache.config_key(indicators_config, names))
+        stamp = IndicatorCache.stamp(buffer)
+        indicators = self.cache.get(key, stamp)
+        if indicators is None:
+            indicators = compute()
+            if indicators is not None:
+                self.cache.put(key, stamp, indicators)
+        return indicators
+    
     def analyze_symbol_timeframe(self, symbol: str, timeframe: str, indicators_config: Dict) -> Optional[TechnicalIndicators]:
-        """Phân tích một symbol và timeframe"""
+        """Phân tích một symbol và timeframe (dùng cache nếu series chưa thay đổi)"""
+        return self._cached(
+            symbol, timeframe, indicators_config,
+            lambda: self.calculate_indicators(symbol, timeframe, indicators_config),
+            self.computed_indicators
+        )
+    
+    def calculate_indicators(self, symbol: str, timeframe: str, indicators_config: Dict) -> Optional[TechnicalIndicators]:
+        """Tính toàn bộ chỉ báo của một symbol và timeframe (không qua cache)"""
+        if self.use_kernels:
+            return self._calculate_with_kernels(symbol, timeframe, indicators_config)
         try:
             # Lấy dữ liệu thị trường
             df = self.data_store.get_market_data(symbol, timeframe)
-            if df is None or len(df) < 50:  # Cần ít nhất 50 nến để tính chỉ báo
+            if df is None or len(df) < MIN_CANDLES:  # Cần đủ nến để tính chỉ báo
                 return None
             
-            # Đảm bảo dữ liệu được sắp xếp theo thời gian
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
+            # DataStore luôn giữ nến duy nhất theo thời gian mở, đã sắp xếp
             # Tính các chỉ báo
             rsi = self.calculate_rsi(df, indicators_config.get('rsi_period', 14))
             ma_fast, ma_slow = self.calculate_moving_averages(
@@ -121,7 +207,11 @@ class TechnicalAnalyzer:
                 indicators_config.get('macd_slow', 26),
                 indicators_config.get('macd_signal', 9)
             )
-            bb_upper, bb_middle, bb_lower = self.calculate_bollinger_bands(df)
+            bb_upper, bb_middle, bb_lower = self.calculate_bollinger_bands(
+                df,
+                indicators_config.get('bb_period', 20),
+                indicators_config.get('bb_std', 2)
+            )
             
             # Lấy giá trị mới nhất
             latest_idx = len(df) - 1
@@ -149,116 +239,104 @@ class TechnicalAnalyzer:
             self.logger.error(f"Lỗi phân tích {symbol} {timeframe}: {e}")
             return None
     
-    def get_trend_direction(self, symbol: str, timeframe: str) -> Optional[str]:
-        """Xác định hướng xu hướng dựa trên MA"""
-        try:
-            indicators = self.data_store.get_indicators(symbol, timeframe)
-            if not indicators or indicators.ma_fast is None or indicators.ma_slow is None:
-                return None
-            
-            if indicators.ma_fast > indicators.ma_slow:
-                return "BULLISH"
-            elif indicators.ma_fast < indicators.ma_slow:
-                return "BEARISH"
-            else:
-                return "SIDEWAYS"
-                
-        except Exception as e:
-            self.logger.error(f"Lỗi xác định xu hướng {symbol} {timeframe}: {e}")
-            return None
+    def get_graph(self, indicators_config: Dict) -> IndicatorGraph:
+        """DAG chỉ báo của cấu hình (dựng một lần, dùng lại cho mọi series)"""
+        key = IndicatorCache.config_key(indicators_config)
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = self._graphs[key] = IndicatorGraph(indicators_config, self.indicator_names)
+        return graph
     
-    def get_rsi_signal(self, symbol: str, timeframe: str, mode: str = "scalp") -> Optional[str]:
-        """Xác định tín hiệu RSI"""
+    def _calculate_with_kernels(self, symbol: str, timeframe: str, indicators_config: Dict) -> Optional[TechnicalIndicators]:
+        """Tính chỉ báo qua DAG trên các cột của buffer, không tạo DataFrame"""
         try:
-            indicators = self.data_store.get_indicators(symbol, timeframe)
-            if not indicators or indicators.rsi is None:
+            buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+            if buffer is None or len(buffer) < MIN_CANDLES:  # Cần đủ nến để tính chỉ báo
                 return None
             
-            rsi = indicators.rsi
-            
-            if mode.lower() == "scalp":
-                # Scalp: Tín hiệu nhạy hơn
-                if rsi > 70:
-                    return "OVERBOUGHT"
-                elif rsi < 30:
-                    return "OVERSOLD"
-                elif rsi > 60:
-                    return "BULLISH"
-                elif rsi < 40:
-                    return "BEARISH"
-            else:  # swing
-                # Swing: Tín hiệu bảo thủ hơn
-                if rsi > 80:
-                    return "OVERBOUGHT"
-                elif rsi < 20:
-                    return "OVERSOLD"
-                elif rsi > 65:
-                    return "BULLISH"
-                elif rsi < 35:
-                    return "BEARISH"
+            series = self.get_graph(indicators_config).evaluate_buffer(buffer)
+            latest = {}
+            for field, values in series.items():
+                value = float(values[-1])
+                latest[field] = None if np.isnan(value) else value
             
-            return "NEUTRAL"
+            return TechnicalIndicators(
+                symbol=symbol,
+                timeframe=timeframe,
+                timestamp=ms_to_datetime_index(buffer.timestamps(1))[0],
+                **latest
+            )
             
         except Exception as e:
-            self.logger.error(f"Lỗi tín hiệu RSI {symbol} {timeframe}: {e}")
+            self.logger.error(f"Lỗi phân tích {symbol} {timeframe}: {e}")
             return None
     
-    def get_macd_signal(self, symbol: str, timeframe: str) -> Optional[str]:
-        """Xác định tín hiệu MACD"""
+    def _history_for(self, indicators_config: Dict) -> IndicatorHistory:
+        """IndicatorHistory dùng chung DAG của cấu hình (đổi cấu hình thì tạo lại)"""
+        graph = self.get_graph(indicators_config)
+        if self.history is None or self.history.graph is not graph:
+            if self.history is not None:
+                self.history.detach()
+            self.history = IndicatorHistory(self.data_store, graph)
+            self.history.attach()
+        return self.history
+    
+    def get_indicator_history(self, symbol: str, timeframe: str, indicators_config: Dict,
+                              start: Optional[datetime] = None,
+                              end: Optional[datetime] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Chuỗi chỉ báo (timestamps, values theo history.fields) trong [start, end), view không copy
+        
+        get_indicators của DataStore vẫn là cách đọc nhanh hàng mới nhất.
+        """
+        return self._history_for(indicators_config).between(symbol, timeframe, start, end)
+    
+    def get_indicator_dataframe(self, symbol: str, timeframe: str, indicators_config: Dict,
+                                start: Optional[datetime] = None,
+                                end: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+        """Chuỗi chỉ báo dạng DataFrame (copy) cho biểu đồ, cột timestamp giống get_market_data"""
+        return self._history_for(indicators_config).to_dataframe(symbol, timeframe, start, end)
+    
+    def get_signal_matrix(self, symbols: List[str], timeframes: List[str], mode: str = "scalp") -> SignalMatrix:
+        """Tín hiệu của mọi (symbol, timeframe) dạng mã uint8, đọc chỉ báo từ DataStore một lần"""
+        return SignalMatrix.from_store(self.data_store, symbols, timeframes, mode)
+    
+    def _signal(self, symbol: str, timeframe: str, kind: int, mode: str = "scalp") -> Optional[str]:
         try:
-            indicators = self.data_store.get_indicators(symbol, timeframe)
-            if not indicators or indicators.macd is None or indicators.macd_signal is None:
-                return None
-            
-            macd = indicators.macd
-            macd_signal = indicators.macd_signal
-            macd_histogram = indicators.macd_histogram
-            
-            # MACD cross over signal line
-            if macd > macd_signal and macd_histogram and macd_histogram > 0:
-                return "BULLISH_CROSS"
-            elif macd < macd_signal and macd_histogram and macd_histogram < 0:
-                return "BEARISH_CROSS"
-            elif macd > 0 and macd_signal > 0:
-                return "BULLISH"
-            elif macd < 0 and macd_signal < 0:
-                return "BEARISH"
-            else:
-                return "NEUTRAL"
-                
+            return signal_name(self.get_signal_matrix([symbol], [timeframe], mode).codes[0, 0, kind])
         except Exception as e:
-            self.logger.error(f"Lỗi tín hiệu MACD {symbol} {timeframe}: {e}")
+            self.logger.error(f"Lỗi tín hiệu {SIGNAL_TYPES[kind]} {symbol} {timeframe}: {e}")
             return None
     
+    def get_trend_direction(self, symbol: str, timeframe: str) -> Optional[str]:
+        """Xác định hướng xu hướng dựa trên MA"""
+        return self._signal(symbol, timeframe, TREND)
+    
+    def get_rsi_signal(self, symbol: str, timeframe: str, mode: str = "scalp") -> Optional[str]:
+        """Xác định tín hiệu RSI (ngưỡng theo mode, xem RSI_LEVELS)"""
+        return self._signal(symbol, timeframe, RSI, mode)
+    
+    def get_macd_signal(self, symbol: str, timeframe: str) -> Optional[str]:
+        """Xác định tín hiệu MACD"""
+        return self._signal(symbol, timeframe, MACD)
+    
     def get_bollinger_signal(self, symbol: str, timeframe: str) -> Optional[str]:
         """Xác định tín hiệu Bollinger Bands"""
-        try:
-            indicators = self.data_store.get_indicators(symbol, timeframe)
-            current_price = self.data_store.get_price(symbol)
-            
-            if (not indicators or indicators.bb_upper is None or 
-                indicators.bb_lower is None or not current_price):
-                return None
-            
-            price = current_price.price
-            
-            if price >= indicators.bb_upper:
-                return "OVERBOUGHT"
-            elif price <= indicators.bb_lower:
-                return "OVERSOLD"
-            elif price > indicators.bb_middle:
-                return "BULLISH"
-            elif price < indicators.bb_middle:
-                return "BEARISH"
-            else:
-                return "NEUTRAL"
-                
-        except Exception as e:
-            self.logger.error(f"Lỗi tín hiệu Bollinger {symbol} {timeframe}: {e}")
-            return None
+        return self._signal(symbol, timeframe, BOLLINGER)
     
-    def analyze_all_symbols(self, symbols: List[str], timeframes: List[str], indicators_config: Dict):
-        """Phân tích tất cả symbols và timeframes"""
+    def analyze_all_symbols(self, symbols: List[str], timeframes: List[str], indicators_config: Dict,
+                            vectorized: bool = True):
+        """Phân tích tất cả symbols và timeframes
+        
+        vectorized=True tính mỗi timeframe cho mọi symbol trong một lượt trên ma trận giá đóng.
+        """
+        if vectorized:
+            for timeframe in timeframes:
+                try:
+                    self.analyze_timeframe_vectorized(symbols, timeframe, indicators_config)
+                except Exception as e:
+                    self.logger.error(f"Lỗi phân tích vector hóa {timeframe}: {e}")
+            return
+        
         for symbol in symbols:
             for timeframe in timeframes:
                 try:
@@ -268,56 +346,111 @@ class TechnicalAnalyzer:
                 except Exception as e:
                     self.logger.error(f"Lỗi phân tích {symbol} {timeframe}: {e}")
     
-    def get_multi_timeframe_analysis(self, symbol: str, timeframes: List[str], mode: str = "scalp") -> Dict:
-        """Phân tích đa khung thời gian"""
-        analysis = {
-            'symbol': symbol,
-            'mode': mode,
-            'timeframes': {},
-            'overall_sentiment': 'NEUTRAL',
-            'strength': 0.0
-        }
+    def analyze_timeframe_vectorized(self, symbols: List[str], timeframe: str,
+                                     indicators_config: Dict) -> List[TechnicalIndicators]:
+        """Tính chỉ báo của tất cả symbols trên một timeframe từ ma trận (symbols × thời gian)
+        
+        Chỉ tính BASE_INDICATORS (giống analyze_symbol_timeframe ở các trường này); symbol chưa
+        đủ nến bị bỏ qua, series chưa thay đổi lấy từ cache.
+        """
+        config_key = IndicatorCache.config_key(indicators_config, BASE_INDICATORS)
+        results = []
+        pending, stamps = [], {}
+        for symbol in symbols:
+            buffer = self.data_store.get_candle_buffer(symbol, timeframe)
+            if buffer is None:
+                continue
+            stamps[symbol] = IndicatorCache.stamp(buffer)
+            cached = self.cache.get((symbol, timeframe, config_key), stamps[symbol])
+            if cached is None:
+                pending.append(symbol)
+            else:
+                self.data_store.add_indicators(cached)
+                results.append(cached)
         
-        bullish_signals = 0
-        bearish_signals = 0
-        total_signals = 0
+        # Chỉ xếp vào ma trận các series đã thay đổi
+        names, closes, counts, last_times = stack_closes(self.data_store, pending, timeframe)
+        ready = counts >= MIN_CANDLES
+        if not ready.any():
+            return results
         
-        for timeframe in timeframes:
-            try:
-                tf_analysis = {
-                    'trend': self.get_trend_direction(symbol, timeframe),
-                    'rsi_signal': self.get_rsi_signal(symbol, timeframe, mode),
-                    'macd_signal': self.get_macd_signal(symbol, timeframe),
-                    'bb_signal': self.get_bollinger_signal(symbol, timeframe)
-                }
-                
-                analysis['timeframes'][timeframe] = tf_analysis
-                
-                # Đếm tín hiệu
-                for signal in tf_analysis.values():
-                    if signal:
-                        total_signals += 1
-                        if 'BULLISH' in signal or signal == 'OVERSOLD':
-                            bullish_signals += 1
-                        elif 'BEARISH' in signal or signal == 'OVERBOUGHT':
-                            bearish_signals += 1
-                            
-            except Exception as e:
-                self.logger.error(f"Lỗi phân tích đa khung thời gian {symbol} {timeframe}: {e}")
+        names = [name for name, ok in zip(names, ready) if ok]
+        values = latest_indicators(closes[ready], counts[ready], indicators_config)
+        timestamps = ms_to_datetime_index(last_times[ready]).tolist()
+        columns = {field: [None if np.isnan(x) else x for x in column.tolist()]
+                   for field, column in values.items()}
         
-        # Xác định sentiment tổng thể
-        if total_signals > 0:
-            bullish_ratio = bullish_signals / total_signals
-            bearish_ratio = bearish_signals / total_signals
-            
-            if bullish_ratio > 0.6:
-                analysis['overall_sentiment'] = 'BULLISH'
-                analysis['strength'] = bullish_ratio
-            elif bearish_ratio > 0.6:
-                analysis['overall_sentiment'] = 'BEARISH'
-                analysis['strength'] = bearish_ratio
-            else:
-                analysis['overall_sentiment'] = 'NEUTRAL'
-                analysis['strength'] = 0.5
+        for row, symbol in enumerate(names):
+            indicators = TechnicalIndicators(
+                symbol=symbol,
+                timeframe=timeframe,
+                timestamp=timestamps[row],
+                **{field: column[row] for field, column in columns.items()}
+            )
+            self.data_store.add_indicators(indicators)
+            self.cache.put((symbol, timeframe, config_key), stamps[symbol], indicators)
+            results.append(indicators)
+        return results
+    
+    def take_pending(self, symbols: List[str], timeframes: List[str],
+                     indicators_config: Dict) -> Tuple[List[Tuple[str, str]], bool]:
+        """Các (symbol, timeframe) cần phân tích lại và cấu hình chỉ báo có đổi hay không
+        
+        Series đã thay đổi kể từ lần trước, chưa có chỉ báo, hoặc mọi series khi cấu hình
+        chỉ báo thay đổi. Các series trả về được xem như đã xử lý; dùng mark_dirty nếu
+        phân tích thất bại.
+        """
+        self._dirty.update(self.changes.drain())
+        config_key = tuple(sorted(indicators_config.items()))
+        config_changed = config_key != self._analysis_config
+        self._analysis_config = config_key
         
-        return analysis 
\ No newline at end of file
+        pending = []
+        for symbol in symbols:
+            for timeframe in timeframes:
+                key = (symbol, timeframe)
+                if not (config_changed or key in self._dirty or
+                        self.data_store.get_indicators(symbol, timeframe) is None):
+                    continue
+                self._dirty.discard(key)
+                pending.append(key)
+        return pending, config_changed
+    
+    def mark_dirty(self, keys):
+        """Đánh dấu lại các series cần phân tích ở lượt sau"""
+        self._dirty.update(keys)
+    
+    def analyze_changed(self, symbols: List[str], timeframes: List[str],
+                        indicators_config: Dict) -> Set[Tuple[str, str]]:
+        """Chỉ phân tích các series đã thay đổi kể từ lần trước, trả về các (symbol, timeframe) đã phân tích
+        
+        Series chưa có chỉ báo hoặc khi cấu hình chỉ báo thay đổi luôn được phân tích.
+        """
+        pending, config_changed = self.take_pending(symbols, timeframes, indicators_config)
+        if self.use_streaming and (config_changed or self.streaming is None):
+            if self.streaming is not None:
+                self.streaming.detach()
+            self.streaming = StreamingIndicatorEngine(self.data_store, indicators_config)
+            self.streaming.attach()
+        
+        analyzed = set()
+        for symbol, timeframe in pending:
+            try:
+                if self.streaming is not None:
+                    indicators = self._cached(
+                        symbol, timeframe, indicators_config,
+                        lambda: self.streaming.get_indicators(symbol, timeframe),
+                        BASE_INDICATORS
+                    )
+                else:
+                    indicators = self.analyze_symbol_timeframe(symbol, timeframe, indicators_config)
+                if indicators:
+                    self.data_store.add_indicators(indicators)
+                    analyzed.add((symbol, timeframe))
+            except Exception as e:
+                self.logger.error(f"Lỗi phân tích {symbol} {timeframe}: {e}")
+        return analyzed
+    
+    def get_multi_timeframe_analysis(self, symbol: str, timeframes: List[str], mode: str = "scalp") -> Dict:
+        """Phân tích đa khung thời gian (dict view của SignalMatrix cho UI)"""
+        return self.get_signal_matrix([symbol], timeframes, mode).analysis(symbol)
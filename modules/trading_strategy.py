@@ -1,19 +1,38 @@
 import math
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
 import logging
 
 from .data_models import TradingSuggestion, DataStore
 from .technical_analysis import TechnicalAnalyzer
+from .signal_matrix import BEAR, BULL, CROSS, EXTREME, MACD, RSI, TREND, Signal, SignalMatrix, signal_name
 from config.config import ConfigManager
 
+# Độ tin cậy tối thiểu để tạo đề xuất
+MIN_CONFIDENCE = 0.6
+
+# Stop loss / take profit (%) và đòn bẩy tối đa của từng chế độ
+SCALP_STOP_LOSS_PCT = 0.3
+SCALP_TAKE_PROFIT_PCT = 0.6
+SCALP_MAX_LEVERAGE = 20
+SWING_STOP_LOSS_PCT = 1.5
+SWING_TAKE_PROFIT_PCT = 3.0
+SWING_MAX_LEVERAGE = 15
+
+# Trọng số khung thời gian cho Swing (1d > 4h > 1h)
+SWING_TIMEFRAME_WEIGHTS = {"1d": 3, "4h": 2, "1h": 1}
+
 class TradingStrategy:
     """Chiến lược giao dịch"""
     
-    def __init__(self, data_store: DataStore, config_manager: ConfigManager, technical_analyzer: TechnicalAnalyzer):
+    def __init__(self, data_store: DataStore, config_manager: ConfigManager, technical_analyzer: TechnicalAnalyzer,
+                 analysis_executor=None):
         self.data_store = data_store
         self.config_manager = config_manager
         self.technical_analyzer = technical_analyzer
+        # ProcessAnalysisExecutor (tùy chọn): phân tích trên nhiều tiến trình, không chặn luồng gọi
+        self.analysis_executor = analysis_executor
         self.logger = logging.getLogger(__name__)
         
     def calculate_position_size(self, capital: float, risk_per_trade: float, entry_price: float, stop_loss: float) -> float:
@@ -99,7 +118,89 @@ class TradingStrategy:
             self.logger.error(f"Lỗi tính SL swing: {e}")
             return entry_price
     
-    def generate_scalp_suggestion(self, symbol: str, analysis: Dict, config: Dict) -> Optional[TradingSuggestion]:
+    def _signal_matrix(self, symbol: str, analysis: Union[Dict, SignalMatrix]) -> SignalMatrix:
+        """Hàng tín hiệu của symbol từ SignalMatrix hoặc dict của get_multi_timeframe_analysis"""
+        if isinstance(analysis, SignalMatrix):
+            return analysis.row(symbol)
+        return SignalMatrix.from_analysis(analysis)
+    
+    @staticmethod
+    def _decide(bullish: np.ndarray, bearish: np.ndarray, total: np.ndarray, enough: np.ndarray,
+                long_ok: np.ndarray, short_ok: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Hướng (1 LONG, -1 SHORT, 0 không vào lệnh) và độ tin cậy của mỗi symbol"""
+        direction = np.select([enough & long_ok, enough & short_ok], [1, -1], 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = np.select([direction > 0, direction < 0], [bullish / total, bearish / total], 0.0)
+        return direction, confidence
+    
+    def scalp_decisions(self, matrix: SignalMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Quyết định Scalp cho mọi symbol của ma trận: RSI, MACD cắt nhau và xu hướng MA, mỗi tín hiệu 1 điểm"""
+        _, columns = matrix.columns(self.config_manager.get_timeframes_for_mode("scalp"))
+        codes = matrix.codes[:, columns]
+        macd = codes[..., MACD]
+        signals = np.stack([codes[..., RSI], np.where(macd & CROSS, macd, 0), codes[..., TREND]], axis=-1)
+        signals = signals.reshape(len(matrix), -1)
+        
+        total = np.count_nonzero(signals, axis=1)
+        bullish = np.count_nonzero(signals & BULL, axis=1)
+        bearish = np.count_nonzero(signals & BEAR, axis=1)
+        return self._decide(
+            bullish, bearish, total,
+            total >= 2,  # Cần ít nhất 2 tín hiệu
+            (bullish >= 2) & (bullish > bearish),
+            (bearish >= 2) & (bearish > bullish)
+        )
+    
+    def swing_decisions(self, matrix: SignalMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Quyết định Swing cho mọi symbol: xu hướng (x2), RSI và MACD, nhân trọng số khung 1d > 4h > 1h"""
+        timeframes, columns = matrix.columns(self.config_manager.get_timeframes_for_mode("swing"))
+        codes = matrix.codes[:, columns]
+        weights = np.array([SWING_TIMEFRAME_WEIGHTS.get(tf, 1) for tf in timeframes], dtype=np.float64)
+        trend, rsi, macd = codes[..., TREND], codes[..., RSI], codes[..., MACD]
+        
+        total = ((trend != 0) * 2 + (rsi != 0) + (macd != 0)) @ weights
+        bullish = ((trend == Signal.BULLISH) * 2
+                   + (rsi == Signal.OVERSOLD) + (rsi == Signal.BULLISH) * 0.5
+                   + ((macd & BULL) != 0)) @ weights
+        bearish = ((trend == Signal.BEARISH) * 2
+                   + (rsi == Signal.OVERBOUGHT) + (rsi == Signal.BEARISH) * 0.5
+                   + ((macd & BEAR) != 0)) @ weights
+        return self._decide(
+            bullish, bearish, total,
+            total >= 3,  # Cần tín hiệu mạnh
+            (bullish >= 4) & (bullish > bearish * 1.5),
+            (bearish >= 4) & (bearish > bullish * 1.5)
+        )
+    
+    def _scalp_reasons(self, matrix: SignalMatrix) -> List[str]:
+        """Lý do của đề xuất Scalp (hàng đầu tiên của ma trận)"""
+        reasons = []
+        timeframes, columns = matrix.columns(self.config_manager.get_timeframes_for_mode("scalp"))
+        for tf, column in zip(timeframes, columns):
+            trend, rsi, macd = (int(code) for code in matrix.codes[0, column, [TREND, RSI, MACD]])
+            if rsi & (BULL | BEAR):
+                reasons.append(f"RSI({tf}): {signal_name(rsi)}")
+            if macd & CROSS:
+                reasons.append(f"MACD({tf}): Cross {'Up' if macd & BULL else 'Down'}")
+            if trend in (Signal.BULLISH, Signal.BEARISH):
+                reasons.append(f"Trend({tf}): {'Up' if trend == Signal.BULLISH else 'Down'}")
+        return reasons
+    
+    def _swing_reasons(self, matrix: SignalMatrix) -> List[str]:
+        """Lý do của đề xuất Swing (hàng đầu tiên của ma trận)"""
+        reasons = []
+        timeframes, columns = matrix.columns(self.config_manager.get_timeframes_for_mode("swing"))
+        for tf, column in zip(timeframes, columns):
+            trend, rsi, macd = (int(code) for code in matrix.codes[0, column, [TREND, RSI, MACD]])
+            if trend in (Signal.BULLISH, Signal.BEARISH):
+                reasons.append(f"Trend({tf}): {'Bullish' if trend == Signal.BULLISH else 'Bearish'}")
+            if rsi & EXTREME:
+                reasons.append(f"RSI({tf}): {'Oversold' if rsi == Signal.OVERSOLD else 'Overbought'}")
+            if macd & (BULL | BEAR):
+                reasons.append(f"MACD({tf}): {'Bullish' if macd & BULL else 'Bearish'}")
+        return reasons
+    
+    def generate_scalp_suggestion(self, symbol: str, analysis: Union[Dict, SignalMatrix], config: Dict) -> Optional[TradingSuggestion]:
         """Tạo đề xuất giao dịch Scalp"""
         try:
             # Lấy giá hiện tại
@@ -109,64 +210,13 @@ class TradingStrategy:
             
             current_price = current_price_data.price
             
-            # Phân tích tín hiệu trên khung thời gian ngắn (1m, 5m, 15m)
-            scalp_timeframes = self.config_manager.get_timeframes_for_mode("scalp")
-            
-            # Đếm tín hiệu bullish/bearish
-            bullish_signals = 0
-            bearish_signals = 0
-            total_signals = 0
-            reasons = []
-            
-            for tf in scalp_timeframes:
-                if tf in analysis['timeframes']:
-                    tf_data = analysis['timeframes'][tf]
-                    
-                    # RSI signal
-                    if tf_data['rsi_signal']:
-                        total_signals += 1
-                        if 'BULLISH' in tf_data['rsi_signal'] or tf_data['rsi_signal'] == 'OVERSOLD':
-                            bullish_signals += 1
-                            reasons.append(f"RSI({tf}): {tf_data['rsi_signal']}")
-                        elif 'BEARISH' in tf_data['rsi_signal'] or tf_data['rsi_signal'] == 'OVERBOUGHT':
-                            bearish_signals += 1
-                            reasons.append(f"RSI({tf}): {tf_data['rsi_signal']}")
-                    
-                    # MACD signal
-                    if tf_data['macd_signal'] and 'CROSS' in tf_data['macd_signal']:
-                        total_signals += 1
-                        if 'BULLISH' in tf_data['macd_signal']:
-                            bullish_signals += 1
-                            reasons.append(f"MACD({tf}): Cross Up")
-                        elif 'BEARISH' in tf_data['macd_signal']:
-                            bearish_signals += 1
-                            reasons.append(f"MACD({tf}): Cross Down")
-                    
-                    # Trend signal
-                    if tf_data['trend']:
-                        total_signals += 1
-                        if tf_data['trend'] == 'BULLISH':
-                            bullish_signals += 1
-                            reasons.append(f"Trend({tf}): Up")
-                        elif tf_data['trend'] == 'BEARISH':
-                            bearish_signals += 1
-                            reasons.append(f"Trend({tf}): Down")
-            
-            # Quyết định hướng giao dịch
-            if total_signals < 2:  # Cần ít nhất 2 tín hiệu
-                return None
-            
-            direction = None
-            confidence = 0
-            
-            if bullish_signals >= 2 and bullish_signals > bearish_signals:
-                direction = "LONG"
-                confidence = bullish_signals / total_signals
-            elif bearish_signals >= 2 and bearish_signals > bullish_signals:
-                direction = "SHORT"
-                confidence = bearish_signals / total_signals
-            else:
-                return None  # Tín hiệu không rõ ràng
+            # Tín hiệu trên khung thời gian ngắn (1m, 5m, 15m)
+            matrix = self._signal_matrix(symbol, analysis)
+            direction, confidence = self.scalp_decisions(matrix)
+            if not direction[0]:
+                return None  # Không đủ tín hiệu hoặc tín hiệu không rõ ràng
+            direction, confidence = ("LONG" if direction[0] > 0 else "SHORT"), float(confidence[0])
+            reasons = self._scalp_reasons(matrix)
             
             # Tính toán entry, SL, TP cho Scalp
             capital = config.get('available_capital', 10000)
@@ -176,8 +226,8 @@ class TradingStrategy:
             entry_price = current_price
             
             # Tính SL và TP theo phần trăm cho Scalp (nhỏ hơn nhiều)
-            stop_loss = self.calculate_stop_loss_scalp(entry_price, direction, 0.3)  # 0.3% SL
-            take_profit = self.calculate_take_profit_scalp(entry_price, direction, 0.6)  # 0.6% TP
+            stop_loss = self.calculate_stop_loss_scalp(entry_price, direction, SCALP_STOP_LOSS_PCT)
+            take_profit = self.calculate_take_profit_scalp(entry_price, direction, SCALP_TAKE_PROFIT_PCT)
             
             # Tính position size dựa trên risk management
             position_size = self.calculate_position_size(capital, risk_config.get('risk_per_trade', 0.02), entry_price, stop_loss)
@@ -186,7 +236,7 @@ class TradingStrategy:
                 return None
             
             # Tính leverage (thường cao hơn cho scalp)
-            leverage = min(self.calculate_leverage(capital, position_size, entry_price, risk_config.get('max_leverage', 20)), 20)
+            leverage = min(self.calculate_leverage(capital, position_size, entry_price, risk_config.get('max_leverage', 20)), SCALP_MAX_LEVERAGE)
             
             # Tạo suggestion
             suggestion = TradingSuggestion(
@@ -208,7 +258,7 @@ class TradingStrategy:
             self.logger.error(f"Lỗi tạo đề xuất scalp {symbol}: {e}")
             return None
     
-    def generate_swing_suggestion(self, symbol: str, analysis: Dict, config: Dict) -> Optional[TradingSuggestion]:
+    def generate_swing_suggestion(self, symbol: str, analysis: Union[Dict, SignalMatrix], config: Dict) -> Optional[TradingSuggestion]:
         """Tạo đề xuất giao dịch Swing"""
         try:
             # Lấy giá hiện tại
@@ -218,72 +268,13 @@ class TradingStrategy:
             
             current_price = current_price_data.price
             
-            # Phân tích tín hiệu trên khung thời gian dài (1h, 4h, 1d)
-            swing_timeframes = self.config_manager.get_timeframes_for_mode("swing")
-            
-            # Đếm tín hiệu bullish/bearish với trọng số khác nhau
-            bullish_score = 0
-            bearish_score = 0
-            total_score = 0
-            reasons = []
-            
-            # Trọng số cho các khung thời gian (1d > 4h > 1h)
-            timeframe_weights = {"1d": 3, "4h": 2, "1h": 1}
-            
-            for tf in swing_timeframes:
-                if tf in analysis['timeframes']:
-                    tf_data = analysis['timeframes'][tf]
-                    weight = timeframe_weights.get(tf, 1)
-                    
-                    # Trend signal (quan trọng nhất cho swing)
-                    if tf_data['trend']:
-                        total_score += weight * 2
-                        if tf_data['trend'] == 'BULLISH':
-                            bullish_score += weight * 2
-                            reasons.append(f"Trend({tf}): Bullish")
-                        elif tf_data['trend'] == 'BEARISH':
-                            bearish_score += weight * 2
-                            reasons.append(f"Trend({tf}): Bearish")
-                    
-                    # RSI signal (với ngưỡng swing)
-                    if tf_data['rsi_signal']:
-                        total_score += weight
-                        if tf_data['rsi_signal'] == 'OVERSOLD':
-                            bullish_score += weight
-                            reasons.append(f"RSI({tf}): Oversold")
-                        elif tf_data['rsi_signal'] == 'OVERBOUGHT':
-                            bearish_score += weight
-                            reasons.append(f"RSI({tf}): Overbought")
-                        elif 'BULLISH' in tf_data['rsi_signal']:
-                            bullish_score += weight * 0.5
-                        elif 'BEARISH' in tf_data['rsi_signal']:
-                            bearish_score += weight * 0.5
-                    
-                    # MACD signal
-                    if tf_data['macd_signal']:
-                        total_score += weight
-                        if 'BULLISH' in tf_data['macd_signal']:
-                            bullish_score += weight
-                            reasons.append(f"MACD({tf}): Bullish")
-                        elif 'BEARISH' in tf_data['macd_signal']:
-                            bearish_score += weight
-                            reasons.append(f"MACD({tf}): Bearish")
-            
-            # Quyết định hướng giao dịch (cần tín hiệu mạnh hơn cho swing)
-            if total_score < 3:  # Cần tín hiệu mạnh
-                return None
-            
-            direction = None
-            confidence = 0
-            
-            if bullish_score >= 4 and bullish_score > bearish_score * 1.5:
-                direction = "LONG"
-                confidence = bullish_score / total_score
-            elif bearish_score >= 4 and bearish_score > bullish_score * 1.5:
-                direction = "SHORT"
-                confidence = bearish_score / total_score
-            else:
+            # Tín hiệu trên khung thời gian dài (1h, 4h, 1d), có trọng số theo khung
+            matrix = self._signal_matrix(symbol, analysis)
+            direction, confidence = self.swing_decisions(matrix)
+            if not direction[0]:
                 return None  # Tín hiệu không đủ mạnh
+            direction, confidence = ("LONG" if direction[0] > 0 else "SHORT"), float(confidence[0])
+            reasons = self._swing_reasons(matrix)
             
             # Tính toán entry, SL, TP cho Swing
             capital = config.get('available_capital', 10000)
@@ -293,8 +284,8 @@ class TradingStrategy:
             entry_price = current_price
             
             # Tính SL và TP theo phần trăm cho Swing (lớn hơn Scalp)
-            stop_loss = self.calculate_stop_loss_swing(entry_price, direction, 1.5)  # 1.5% SL
-            take_profit = self.calculate_take_profit_swing(entry_price, direction, 3.0)  # 3% TP
+            stop_loss = self.calculate_stop_loss_swing(entry_price, direction, SWING_STOP_LOSS_PCT)
+            take_profit = self.calculate_take_profit_swing(entry_price, direction, SWING_TAKE_PROFIT_PCT)
             
             # Tính position size dựa trên risk management
             position_size = self.calculate_position_size(capital, risk_config.get('risk_per_trade', 0.02), entry_price, stop_loss)
@@ -303,7 +294,7 @@ class TradingStrategy:
                 return None
             
             # Leverage thấp hơn cho swing
-            leverage = min(self.calculate_leverage(capital, position_size, entry_price, risk_config.get('max_leverage', 20)), 15)
+            leverage = min(self.calculate_leverage(capital, position_size, entry_price, risk_config.get('max_leverage', 20)), SWING_MAX_LEVERAGE)
             
             # Tạo suggestion
             suggestion = TradingSuggestion(
@@ -325,35 +316,41 @@ class TradingStrategy:
             self.logger.error(f"Lỗi tạo đề xuất swing {symbol}: {e}")
             return None
     
+    def suggestion_config(self) -> Dict:
+        """Cấu hình vốn dùng khi tạo đề xuất"""
+        trading_config = self.config_manager.get_trading_config()
+        return {
+            'available_capital': trading_config.available_capital,
+            'target_profit_per_trade': trading_config.target_profit_per_trade,
+            'max_loss_per_trade': trading_config.max_loss_per_trade
+        }
+    
     def generate_suggestions(self, symbols: List[str], trading_mode: str) -> List[TradingSuggestion]:
         """Tạo đề xuất giao dịch cho tất cả symbols"""
         suggestions = []
         
         try:
             # Lấy cấu hình
-            trading_config = self.config_manager.get_trading_config()
-            config_dict = {
-                'available_capital': trading_config.available_capital,
-                'target_profit_per_trade': trading_config.target_profit_per_trade,
-                'max_loss_per_trade': trading_config.max_loss_per_trade
-            }
+            config_dict = self.suggestion_config()
             
             # Lấy timeframes phù hợp với mode
             timeframes = self.config_manager.get_timeframes_for_mode(trading_mode)
             
-            for symbol in symbols:
+            # Tín hiệu của mọi symbol trong một lượt, chấm điểm vector hóa
+            matrix = self.technical_analyzer.get_signal_matrix(symbols, timeframes, trading_mode)
+            is_scalp = trading_mode.lower() == "scalp"
+            direction, confidence = self.scalp_decisions(matrix) if is_scalp else self.swing_decisions(matrix)
+            
+            # Chỉ dựng đề xuất cho symbol có hướng rõ ràng và độ tin cậy cao
+            for row in np.flatnonzero((direction != 0) & (confidence > MIN_CONFIDENCE)).tolist():
+                symbol = matrix.symbols[row]
                 try:
-                    # Phân tích đa khung thời gian
-                    analysis = self.technical_analyzer.get_multi_timeframe_analysis(symbol, timeframes, trading_mode)
-                    
-                    # Tạo đề xuất dựa trên mode
-                    suggestion = None
-                    if trading_mode.lower() == "scalp":
-                        suggestion = self.generate_scalp_suggestion(symbol, analysis, config_dict)
+                    if is_scalp:
+                        suggestion = self.generate_scalp_suggestion(symbol, matrix, config_dict)
                     else:  # swing
-                        suggestion = self.generate_swing_suggestion(symbol, analysis, config_dict)
+                        suggestion = self.generate_swing_suggestion(symbol, matrix, config_dict)
                     
-                    if suggestion and suggestion.confidence > 0.6:  # Chỉ lấy đề xuất có độ tin cậy cao
+                    if suggestion and suggestion.confidence > MIN_CONFIDENCE:  # Chỉ lấy đề xuất có độ tin cậy cao
                         suggestions.append(suggestion)
                         self.data_store.add_suggestion(suggestion)
                         self.data_store.add_log(f"Tạo đề xuất {suggestion.direction} {suggestion.symbol.replace('USDT', '')} ({suggestion.mode})")
@@ -380,11 +377,23 @@ class TradingStrategy:
             timeframes = self.config_manager.get_timeframes_for_mode(trading_mode)
             self.data_store.add_log(f"📊 Timeframes cho {trading_mode}: {timeframes}")
             
-            # Phân tích kỹ thuật
-            self.technical_analyzer.analyze_all_symbols(symbols, timeframes, indicators_config)
+            # Phân tích kỹ thuật: chỉ các series có dữ liệu mới kể từ lần trước
+            if self.analysis_executor is not None:
+                # Lấy kết quả lượt trước (nếu xong) và bắt đầu lượt mới trên worker
+                analyzed = self.analysis_executor.collect()
+                if not self.analysis_executor.submit(symbols, timeframes, indicators_config) \
+                        and self.analysis_executor.busy():
+                    self.data_store.add_log("⏳ Lượt phân tích trước chưa xong, dồn thay đổi sang lượt sau")
+            else:
+                analyzed = self.technical_analyzer.analyze_changed(symbols, timeframes, indicators_config)
+            changed_symbols = [symbol for symbol in symbols if any((symbol, tf) in analyzed for tf in timeframes)]
+            if not changed_symbols:
+                self.data_store.add_log("ℹ️ Không có dữ liệu mới kể từ lần phân tích trước")
+                return
+            self.data_store.add_log(f"🔄 Phân tích lại {len(analyzed)} series của {len(changed_symbols)} symbol")
             
             # Tạo đề xuất
-            suggestions = self.generate_suggestions(symbols, trading_mode)
+            suggestions = self.generate_suggestions(changed_symbols, trading_mode)
             
             if suggestions:
                 self.data_store.add_log(f"✅ Đã tạo {len(suggestions)} đề xuất {trading_mode}")
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
 from modules.data_models import TradingSuggestion, TokenPrice
@@ -199,8 +199,11 @@ def render_logs(logs: List[str]):
         for log in reversed(logs[-10:]):  # Chỉ hiển thị 10 log gần nhất
             st.text(log)
 
-def render_price_chart(symbol: str, df: pd.DataFrame):
-    """Render biểu đồ giá với chỉ báo"""
+def render_price_chart(symbol: str, df: pd.DataFrame, indicators: Optional[pd.DataFrame] = None):
+    """Render biểu đồ giá với chỉ báo
+    
+    indicators: chuỗi chỉ báo theo từng nến (TechnicalAnalyzer.get_indicator_dataframe), vẽ MA, Bollinger Bands và VWAP.
+    """
     if df is None or len(df) == 0:
         st.info(f"Không có dữ liệu biểu đồ cho {symbol}")
         return
@@ -227,6 +230,22 @@ def render_price_chart(symbol: str, df: pd.DataFrame):
         row=1, col=1
     )
     
+    # Đường MA và Bollinger Bands từ chuỗi chỉ báo đã lưu (không tính lại)
+    if indicators is not None and len(indicators) > 0:
+        for column, label, style in (
+            ('ma_fast', 'MA Fast', dict(width=1)),
+            ('ma_slow', 'MA Slow', dict(width=1)),
+            ('bb_upper', 'BB Upper', dict(width=1, dash='dot')),
+            ('bb_lower', 'BB Lower', dict(width=1, dash='dot')),
+            ('vwap', 'VWAP', dict(width=1, dash='dash')),
+        ):
+            if column not in indicators:
+                continue
+            fig.add_trace(
+                go.Scatter(x=indicators['timestamp'], y=indicators[column], name=label, line=style),
+                row=1, col=1
+            )
+    
     # Volume chart
     fig.add_trace(
         go.Bar(
@@ -249,6 +268,39 @@ def render_price_chart(symbol: str, df: pd.DataFrame):
     
     st.plotly_chart(fig, use_container_width=True)
 
+def render_chart_controls(symbols: List[str], timeframes: List[str]) -> Tuple[str, str]:
+    """Render lựa chọn symbol và timeframe cho biểu đồ"""
+    st.subheader("📈 Biểu đồ giá")
+    col1, col2 = st.columns(2)
+    with col1:
+        symbol = st.selectbox("Token:", symbols, key="chart_symbol")
+    with col2:
+        timeframe = st.selectbox("Khung thời gian:", timeframes, key="chart_timeframe")
+    return symbol, timeframe
+
+def render_indicator_panel(indicators: Optional[pd.DataFrame]):
+    """Render giá trị mới nhất của các chỉ báo bổ sung (ATR, ADX, Stochastic, OBV)"""
+    if indicators is None or len(indicators) == 0:
+        return
+    
+    latest = indicators.iloc[-1]
+    
+    def value(column: str, fmt: str) -> str:
+        if column not in indicators or pd.isna(latest[column]):
+            return "N/A"
+        return format(latest[column], fmt)
+    
+    cols = st.columns(4)
+    with cols[0]:
+        st.metric("ATR", value('atr', ',.2f'))
+    with cols[1]:
+        st.metric("ADX", value('adx', '.1f'),
+                  help=f"+DI {value('plus_di', '.1f')} / -DI {value('minus_di', '.1f')}")
+    with cols[2]:
+        st.metric("Stoch %K / %D", f"{value('stoch_k', '.1f')} / {value('stoch_d', '.1f')}")
+    with cols[3]:
+        st.metric("OBV", value('obv', ',.0f'))
+
 def render_sidebar_controls():
     """Render các điều khiển trong sidebar"""
     st.sidebar.header("🎛️ Điều khiển Bot")
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Server giả lập Binance Futures (REST + WebSocket) để chạy thử và đo tải offline
+
+Chạy độc lập:
+    python -m utils.binance_mock_server --port 8765 --symbols 100 --latency 0.02
+
+Rồi trỏ BinanceConnector(base_url="http://127.0.0.1:8765", stream_url="ws://127.0.0.1:8765").
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+from modules.candle_store import bucket_start, interval_to_ms, klines_to_columns
+from modules.rate_limiter import ENDPOINT_WEIGHTS, BULK_ENDPOINT_WEIGHTS, klines_weight
+
+# Các symbol thật được đặt đầu danh sách, phần còn lại sinh tự động
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+
+def make_symbols(count: int) -> List[str]:
+    """Danh sách count symbol: BTC/ETH/SOL trước, sau đó SYM0003USDT, SYM0004USDT..."""
+    symbols = DEFAULT_SYMBOLS[:count]
+    symbols += [f"SYM{i:04d}USDT" for i in range(len(symbols), count)]
+    return symbols
+
+class MockBinanceServer:
+    """Server aiohttp giả lập các endpoint Binance Futures mà bot đang dùng
+
+    - REST: /fapi/v1/ping, /time, /exchangeInfo, /ticker/price, /ticker/24hr, /klines
+    - WebSocket: /stream?streams=... và /ws/<stream> cho <symbol>@kline_<tf> và <symbol>@markPrice
+    - Giá sinh tất định theo (symbol, thời gian) hoặc lấy từ dữ liệu ghi sẵn
+    - Độ trễ cấu hình được, header X-MBX-USED-WEIGHT-1m, trả 429 khi vượt weight
+      hoặc theo tỉ lệ/chu kỳ chèn lỗi
+    """
+
+    def __init__(self, symbol_count: int = 10, symbols: Optional[List[str]] = None,
+                 host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 weight_limit: int = 2400, error_rate: float = 0.0, fail_every: int = 0,
+                 retry_after: int = 1, stream_interval: float = 1.0, seed: int = 42):
+        self.symbols = symbols or make_symbols(symbol_count)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.weight_limit = weight_limit
+        self.error_rate = error_rate
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.stream_interval = stream_interval
+
+        self.recorded: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._symbol_set = set(self.symbols)
+        self._random = random.Random(seed)
+        self._weight_minute = 0
+        self._weight_used = 0
+
+        # Thống kê
+        self.requests = 0
+        self.rejected = 0
+        self.ws_connections = 0
+        self.ws_messages = 0
+
+        self.runner: Optional[web.AppRunner] = None
+        self.logger = logging.getLogger(__name__)
+
+    # ---- Dữ liệu ----
+
+    def add_recorded_klines(self, symbol: str, interval: str, klines: List):
+        """Phục vụ klines ghi sẵn (định dạng response /fapi/v1/klines) thay cho dữ liệu sinh"""
+        self.add_recorded_columns(symbol, interval, *klines_to_columns(klines))
+
+    def add_recorded_columns(self, symbol: str, interval: str, timestamps: np.ndarray, values: np.ndarray):
+        """Phục vụ nến dạng cột (ví dụ đọc từ CandleDiskCache.read_series)"""
+        if symbol not in self._symbol_set:
+            self.symbols.append(symbol)
+            self._symbol_set.add(symbol)
+        self.recorded[(symbol, interval)] = (np.asarray(timestamps, dtype=np.int64), np.asarray(values))
+
+    def price_at(self, symbol: str, timestamps) -> np.ndarray:
+        """Giá sinh tất định cho symbol tại các thời điểm (epoch ms)"""
+        seed = zlib.crc32(symbol.encode())
+        base = 1.0 + seed % 50_000
+        phase = (seed % 1000) / 1000 * 2 * math.pi
+        minutes = np.asarray(timestamps, dtype=np.float64) / 60_000
+        wave = (0.03 * np.sin(minutes / 720 + phase)
+                + 0.01 * np.sin(minutes / 37 + 2 * phase)
+                + 0.002 * np.sin(minutes / 3 + 3 * phase))
+        return base * (1 + wave)
+
+    def synthetic_columns(self, symbol: str, interval: str, open_times: np.ndarray,
+                          now: int) -> np.ndarray:
+        """OHLCV shape (5, n) cho các nến sinh tự động; nến đang hình thành đóng tại now"""
+        step = interval_to_ms(interval)
+        close_times = np.minimum(open_times + step, now)
+        opens = self.price_at(symbol, open_times)
+        closes = self.price_at(symbol, close_times)
+        middle = self.price_at(symbol, (open_times + close_times) // 2)
+        highs = np.maximum(np.maximum(opens, closes), middle) * 1.001
+        lows = np.minimum(np.minimum(opens, closes), middle) * 0.999
+        volumes = (close_times - open_times) / 60_000 * (50 + (open_times // step) % 50)
+        return np.vstack([opens, highs, lows, closes, volumes])
+
+    def kline_columns(self, symbol: str, interval: str, limit: int, start_time: Optional[int],
+                      end_time: Optional[int], now: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Chọn nến theo ngữ nghĩa startTime/endTime/limit của Binance"""
+        recorded = self.recorded.get((symbol, interval))
+        if recorded is not None:
+            timestamps, values = recorded
+            lo = 0 if start_time is None else int(np.searchsorted(timestamps, start_time))
+            hi = len(timestamps) if end_time is None else int(np.searchsorted(timestamps, end_time, side='right'))
+            if start_time is None:
+                lo = max(lo, hi - limit)
+            hi = min(hi, lo + limit)
+            return timestamps[lo:hi], values[:, lo:hi]
+
+        step = interval_to_ms(interval)
+        last = bucket_start(min(end_time, now) if end_time is not None else now, interval)
+        if start_time is not None:
+            first = bucket_start(start_time, interval)
+            if first < start_time:
+                first += step
+            last = min(last, first + (limit - 1) * step)
+        else:
+            first = last - (limit - 1) * step
+        if last < first:
+            return np.empty(0, dtype=np.int64), np.empty((5, 0))
+        open_times = np.arange(first, last + 1, step, dtype=np.int64)
+        return open_times, self.synthetic_columns(symbol, interval, open_times, now)
+
+    def ticker_24h(self, symbol: str, now: int) -> Dict:
+        last_price, open_price = self.price_at(symbol, [now, now - 86_400_000])
+        return {
+            "symbol": symbol,
+            "priceChange": f"{last_price - open_price:.8f}",
+            "priceChangePercent": f"{(last_price / open_price - 1) * 100:.3f}",
+            "lastPrice": f"{last_price:.8f}",
+            "openPrice": f"{open_price:.8f}",
+            "highPrice": f"{max(last_price, open_price) * 1.01:.8f}",
+            "lowPrice": f"{min(last_price, open_price) * 0.99:.8f}",
+            "volume": "100000.000",
+            "quoteVolume": f"{100000 * last_price:.2f}",
+            "openTime": now - 86_400_000,
+            "closeTime": now,
+            "count": 100000,
+        }
+
+    # ---- HTTP ----
+
+    def _now_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    async def _admit(self, weight: int) -> Optional[web.Response]:
+        """Độ trễ giả lập + kiểm tra weight; trả về response lỗi nếu request bị từ chối"""
+        delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self.requests += 1
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute, self._weight_used = minute, 0
+
+        injected = (self.fail_every and self.requests % self.fail_every == 0) or \
+                   (self.error_rate and self._random.random() < self.error_rate)
+        if injected or self._weight_used + weight > self.weight_limit:
+            self.rejected += 1
+            return web.json_response(
+                {"code": -1003, "msg": "Too many requests."},
+                status=429,
+                headers={"Retry-After": str(self.retry_after),
+                         "X-MBX-USED-WEIGHT-1m": str(self._weight_used)}
+            )
+
+        self._weight_used += weight
+        return None
+
+    def _json(self, data, status: int = 200) -> web.Response:
+        return web.Response(
+            body=json.dumps(data, separators=(',', ':')).encode(),
+            status=status,
+            content_type="application/json",
+            headers={"X-MBX-USED-WEIGHT-1m": str(self._weight_used)}
+        )
+
+    def _invalid_symbol(self) -> web.Response:
+        return self._json({"code": -1121, "msg": "Invalid symbol."}, status=400)
+
+    async def handle_ping(self, request: web.Request) -> web.Response:
+        return await self._admit(ENDPOINT_WEIGHTS["/fapi/v1/ping"]) or self._json({})
+
+    async def handle_time(self, request: web.Request) -> web.Response:
+        return await self._admit(1) or self._json({"serverTime": self._now_ms()})
+
+    async def handle_exchange_info(self, request: web.Request) -> web.Response:
+        rejected = await self._admit(ENDPOINT_WEIGHTS["/fapi/v1/exchangeInfo"])
+        if rejected:
+            return rejected
+        return self._json({
+            "timezone": "UTC",
+            "serverTime": self._now_ms(),
+            "symbols": [
+                {"symbol": symbol, "pair": symbol, "contractType": "PERPETUAL", "status": "TRADING",
+                 "baseAsset": symbol[:-4], "quoteAsset": "USDT"}
+                for symbol in self.symbols
+            ]
+        })
+
+    async def handle_ticker_price(self, request: web.Request) -> web.Response:
+        path = "/fapi/v1/ticker/price"
+        symbol = request.query.get("symbol")
+        rejected = await self._admit(ENDPOINT_WEIGHTS[path] if symbol else BULK_ENDPOINT_WEIGHTS[path])
+        if rejected:
+            return rejected
+        now = self._now_ms()
+        if symbol:
+            if symbol not in self._symbol_set:
+                return self._invalid_symbol()
+            return self._json({"symbol": symbol, "price": f"{self.price_at(symbol, now):.8f}", "time": now})
+        return self._json([
+            {"symbol": s, "price": f"{self.price_at(s, now):.8f}", "time": now} for s in self.symbols
+        ])
+
+    async def handle_ticker_24h(self, request: web.Request) -> web.Response:
+        path = "/fapi/v1/ticker/24hr"
+        symbol = request.query.get("symbol")
+        rejected = await self._admit(ENDPOINT_WEIGHTS[path] if symbol else BULK_ENDPOINT_WEIGHTS[path])
+        if rejected:
+            return rejected
+        now = self._now_ms()
+        if symbol:
+            if symbol not in self._symbol_set:
+                return self._invalid_symbol()
+            return self._json(self.ticker_24h(symbol, now))
+        return self._json([self.ticker_24h(s, now) for s in self.symbols])
+
+    async def handle_klines(self, request: web.Request) -> web.Response:
+        query = request.query
+        try:
+            limit = min(1500, int(query.get("limit", 500)))
+            start_time = int(query["startTime"]) if "startTime" in query else None
+            end_time = int(query["endTime"]) if "endTime" in query else None
+            symbol, interval = query["symbol"], query["interval"]
+            step = interval_to_ms(interval)
+        except (KeyError, ValueError):
+            return self._json({"code": -1102, "msg": "Mandatory parameter was not sent or malformed."}, status=400)
+
+        rejected = await self._admit(klines_weight(limit))
+        if rejected:
+            return rejected
+        if symbol not in self._symbol_set:
+            return self._invalid_symbol()
+
+        timestamps, values = self.kline_columns(symbol, interval, limit, start_time, end_time, self._now_ms())
+        rows = [
+            [t, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.3f}", t + step - 1, f"{v * c:.4f}",
+             100, f"{v / 2:.3f}", f"{v * c / 2:.4f}", "0"]
+            for t, o, h, l, c, v in zip(timestamps.tolist(), *values.tolist())
+        ]
+        return self._json(rows)
+
+    # ---- WebSocket ----
+
+    def _kline_event(self, symbol: str, interval: str, open_time: int, now: int, closed: bool) -> Dict:
+        step = interval_to_ms(interval)
+        recorded = self.recorded.get((symbol, interval))
+        index = int(np.searchsorted(recorded[0], open_time)) if recorded is not None else -1
+        if recorded is not None and index < len(recorded[0]) and recorded[0][index] == open_time:
+            o, h, l, c, v = recorded[1][:, index]
+        else:
+            o, h, l, c, v = self.synthetic_columns(symbol, interval, np.array([open_time]), now)[:, 0]
+        return {
+            "e": "kline", "E": now, "s": symbol,
+            "k": {"t": open_time, "T": open_time + step - 1, "s": symbol, "i": interval,
+                  "o": f"{o:.8f}", "h": f"{h:.8f}", "l": f"{l:.8f}", "c": f"{c:.8f}", "v": f"{v:.3f}",
+                  "x": closed}
+        }
+
+    def _mark_price_event(self, symbol: str, now: int) -> Dict:
+        price = self.price_at(symbol, now)
+        return {"e": "markPriceUpdate", "E": now, "s": symbol, "p": f"{price:.8f}", "i": f"{price:.8f}",
+                "r": "0.00010000", "T": now // 28_800_000 * 28_800_000 + 28_800_000}
+
+    async def _serve_streams(self, request: web.Request, streams: List[str], combined: bool) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.ws_connections += 1
+
+        subscriptions = []
+        for stream in streams:
+            name, _, kind = stream.partition('@')
+            symbol = name.upper()
+            if symbol not in self._symbol_set:
+                continue
+            if kind.startswith('kline_'):
+                subscriptions.append((stream, symbol, kind[len('kline_'):]))
+            elif kind.startswith('markPrice'):
+                subscriptions.append((stream, symbol, None))
+
+        last_open: Dict[str, int] = {}
+        reader = asyncio.ensure_future(ws.receive())
+        try:
+            while not ws.closed:
+                now = self._now_ms()
+                for stream, symbol, interval in subscriptions:
+                    events = []
+                    if interval is None:
+                        events.append(self._mark_price_event(symbol, now))
+                    else:
+                        open_time = bucket_start(now, interval)
+                        previous = last_open.get(stream)
+                        if previous is not None and previous != open_time:
+                            # Vừa qua ranh giới nến: gửi giá trị cuối của nến đã đóng
+                            events.append(self._kline_event(symbol, interval, previous, now, True))
+                        last_open[stream] = open_time
+                        events.append(self._kline_event(symbol, interval, open_time, now, False))
+
+                    for event in events:
+                        payload = {"stream": stream, "data": event} if combined else event
+                        await ws.send_str(json.dumps(payload, separators=(',', ':')))
+                        self.ws_messages += 1
+
+                # Chờ tới lượt gửi tiếp theo, thoát sớm nếu client đóng kết nối
+                done, _ = await asyncio.wait([reader], timeout=self.stream_interval)
+                if done:
+                    message = reader.result()
+                    if message.type in (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED, WSMsgType.ERROR):
+                        break
+                    reader = asyncio.ensure_future(ws.receive())
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            reader.cancel()
+            await ws.close()
+        return ws
+
+    async def handle_combined_stream(self, request: web.Request) -> web.WebSocketResponse:
+        streams = [s for s in request.query.get("streams", "").split('/') if s]
+        return await self._serve_streams(request, streams, combined=True)
+
+    async def handle_raw_stream(self, request: web.Request) -> web.WebSocketResponse:
+        return await self._serve_streams(request, [request.match_info["stream"]], combined=False)
+
+    # ---- Vòng đời ----
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/fapi/v1/ping", self.handle_ping)
+        app.router.add_get("/fapi/v1/time", self.handle_time)
+        app.router.add_get("/fapi/v1/exchangeInfo", self.handle_exchange_info)
+        app.router.add_get("/fapi/v1/ticker/price", self.handle_ticker_price)
+        app.router.add_get("/fapi/v1/ticker/24hr", self.handle_ticker_24h)
+        app.router.add_get("/fapi/v1/klines", self.handle_klines)
+        app.router.add_get("/stream", self.handle_combined_stream)
+        app.router.add_get("/ws/{stream}", self.handle_raw_stream)
+        return app
+
+    async def start(self) -> str:
+        """Khởi động server, trả về base_url (port=0 sẽ chọn port trống)"""
+        self.runner = web.AppRunner(self.build_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Mock Binance đang chạy tại {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def __aenter__(self) -> "MockBinanceServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def stream_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Server giả lập Binance Futures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", type=int, default=10, help="Số symbol giả lập")
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ mỗi request (giây)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Độ trễ ngẫu nhiên thêm (giây)")
+    parser.add_argument("--weight-limit", type=int, default=2400, help="Weight tối đa mỗi phút")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ request bị trả 429")
+    parser.add_argument("--fail-every", type=int, default=0, help="Trả 429 cho mỗi request thứ N")
+    parser.add_argument("--stream-interval", type=float, default=1.0, help="Chu kỳ đẩy WebSocket (giây)")
+    parser.add_argument("--cache-dir", help="Phục vụ nến ghi sẵn từ thư mục CandleDiskCache")
+    args = parser.parse_args()
+
+    server = MockBinanceServer(
+        symbol_count=args.symbols, host=args.host, port=args.port,
+        latency=args.latency, latency_jitter=args.jitter, weight_limit=args.weight_limit,
+        error_rate=args.error_rate, fail_every=args.fail_every, stream_interval=args.stream_interval
+    )
+
+    if args.cache_dir:
+        import os
+        from modules.candle_cache import CandleDiskCache
+        cache = CandleDiskCache(args.cache_dir)
+        for symbol in sorted(os.listdir(args.cache_dir)):
+            for interval in sorted(os.listdir(os.path.join(args.cache_dir, symbol))):
+                timestamps, values = cache.read_series(symbol, interval)
+                if len(timestamps):
+                    server.add_recorded_columns(symbol, interval, timestamps, values)
+
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(server.build_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()